@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Measures how fast "timers list" reduces time entries to one row per
+workspace, project and description.
+
+The "before" numbers come from a copy of the original reduce, which filtered
+the whole list again for every workspace, project and description; the
+"after" numbers come from TimeEntries.reduce_on_description.
+
+    python benchmarks/bench_aggregators.py [sizes...]
+"""
+import functools
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+# Run from a checkout, without the package installed.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from togglcmder.toggl.aggregators.time_entries import TimeEntries as TimeEntryAggregator
+from togglcmder.toggl.builders.time_entry_builder import TimeEntryBuilder
+from togglcmder.toggl.filters.time_entries import TimeEntries as TimeEntryFilter
+from togglcmder.toggl.types.project import Project
+from togglcmder.toggl.types.time_entry import TimeEntry
+from togglcmder.toggl.types.workspace import Workspace
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# The original reduce is quadratic; past this it is not worth waiting for.
+LEGACY_LIMIT = 20000
+
+
+def make_data(count: int) -> Tuple[List[TimeEntry], List[Workspace], List[Project]]:
+    generator = random.Random(1)
+    workspaces = [Workspace(name=f'Workspace {index}', identifier=index) for index in range(1, 6)]
+    projects = [Project(name=f'Project {index}', identifier=index, workspace_identifier=index % 5 + 1)
+                for index in range(1, 51)]
+
+    start = datetime(2020, 6, 1, tzinfo=timezone.utc)
+    time_entries = []
+    for index in range(count):
+        project = generator.choice(projects + [None])
+        time_entries.append(TimeEntry(
+            identifier=index,
+            description=f'Task {generator.randrange(500)}',
+            start_time=start + timedelta(minutes=index),
+            stop_time=start + timedelta(minutes=index + 30),
+            duration=generator.randrange(60, 3600),
+            project_identifier=project.identifier if project else None,
+            workspace_identifier=project.workspace_identifier if project else generator.randrange(1, 6),
+            tags=[],
+            last_updated=start + timedelta(minutes=index)))
+    return time_entries, workspaces, projects
+
+
+def legacy_reduce(time_entries: List[TimeEntry], workspaces: List[Workspace], projects: List[Project]) -> list:
+    result = []
+    for workspace in workspaces:
+        workspace_entries = TimeEntryFilter.filter_on_workspace(time_entries, workspace)
+        if not workspace_entries:
+            continue
+        for project in projects:
+            project_entries = TimeEntryFilter.filter_on_project(workspace_entries, project)
+            if not project_entries:
+                continue
+            for description in dict.fromkeys(entry.description for entry in project_entries):
+                description_entries = sorted(
+                    TimeEntryFilter.filter_on_description(project_entries, description),
+                    key=lambda entry: entry.last_updated,
+                    reverse=True)
+                result.append((functools.reduce(
+                    lambda x, y: TimeEntryBuilder(x).duration(x.duration + y.duration).build(),
+                    description_entries), project, workspace))
+        for entry in workspace_entries:
+            if entry.project_identifier is None:
+                result.append((entry, None, workspace))
+    return result
+
+
+def run(count: int) -> None:
+    time_entries, workspaces, projects = make_data(count)
+
+    legacy = None
+    if count <= LEGACY_LIMIT:
+        began = time.perf_counter()
+        legacy_reduce(time_entries, workspaces, projects)
+        legacy = time.perf_counter() - began
+
+    began = time.perf_counter()
+    TimeEntryAggregator.reduce_on_description(time_entries, workspaces, projects)
+    reduced = time.perf_counter() - began
+
+    print('{:>7,} entries  reduce: before {} after {:>9.3f}s'.format(
+        count, '{:>9.3f}s'.format(legacy) if legacy is not None else '{:>10}'.format('-'), reduced))
+
+
+if __name__ == '__main__':
+    # The filters warn about every empty project, which would drown the numbers.
+    logging.disable(logging.WARNING)
+    for size in [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES:
+        run(size)
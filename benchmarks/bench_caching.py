@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Measures how fast time entries can be written to the local cache.
+
+The "before" numbers come from the original row-by-row
+INSERT/IntegrityError/UPDATE loop; the "after" numbers come from
+Caching.update_time_entry_cache. Both do the same work: the before loop
+also reads the tag cache, brings each entry's tags up to date (one entry
+at a time, as it always did) and keeps track of the running timer, and
+both run on an on-disk database opened with the cache's connection
+settings, so commit costs are included.
+
+    python benchmarks/bench_caching.py [sizes...]
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlite3 import IntegrityError
+from typing import List
+
+# Run from a checkout, without the package installed.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tzlocal import get_localzone
+
+from togglcmder.toggl.caching import Caching
+from togglcmder.toggl.types.workspace import Workspace
+from togglcmder.toggl.types.tag import Tag
+from togglcmder.toggl.types.time_entry import TimeEntry
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+TAGS = [Tag(name='Tag {}'.format(index), identifier=index + 1, workspace_identifier=1) for index in range(3)]
+
+
+def make_time_entries(count: int, *, generation: int = 0) -> List[TimeEntry]:
+    # Most entries have a tag, which changes from one generation to the next.
+    start = get_localzone().localize(datetime(2020, 1, 1))
+    return [
+        TimeEntry(
+            description='Entry {} ({})'.format(index % 50, generation),
+            start_time=start + timedelta(minutes=index),
+            stop_time=start + timedelta(minutes=index + 1),
+            duration=60,
+            identifier=index + 1,
+            workspace_identifier=1,
+            tags=[TAGS[(index + generation) % len(TAGS)].name] if index % 4 else [],
+            last_updated=start + timedelta(minutes=index, seconds=generation))
+        for index in range(count)
+    ]
+
+
+def connect(path: str) -> sqlite3.Connection:
+    # The same settings the cache opens its connection with.
+    connection = sqlite3.connect(path, timeout=Caching.CONNECTION_PROFILE['busy_timeout'] / 1000)
+    for name, value in Caching.CONNECTION_PROFILE.items():
+        connection.execute('PRAGMA {} = {}'.format(name, value))
+    connection.execute('PRAGMA foreign_keys = 1')
+    return connection
+
+
+def legacy_update_time_entry_cache(connection: sqlite3.Connection, time_entries: List[TimeEntry]) -> None:
+    insert_sql = '''
+        INSERT INTO time_entries
+        (description, start_time, stop_time, duration, identifier,
+         project_identifier, workspace_identifier, last_updated) VALUES
+        (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    update_sql = '''
+        UPDATE time_entries
+        SET description=?, start_time=?, stop_time=?, duration=?,
+            project_identifier=?, workspace_identifier=?, last_updated=?
+        WHERE identifier=?
+    '''
+    cursor = connection.cursor()
+
+    cursor.execute('SELECT name, identifier, workspace_identifier FROM tags')
+    tag_rows = cursor.fetchall()
+
+    for time_entry in time_entries:
+        stop_time = time_entry.stop_time.timestamp() if time_entry.stop_time else None
+        try:
+            cursor.execute(insert_sql, (time_entry.description,
+                                        time_entry.start_time.timestamp(),
+                                        stop_time,
+                                        time_entry.duration,
+                                        time_entry.identifier,
+                                        time_entry.project_identifier,
+                                        time_entry.workspace_identifier,
+                                        time_entry.last_updated.timestamp()))
+        except IntegrityError:
+            cursor.execute(update_sql, (time_entry.description,
+                                        time_entry.start_time.timestamp(),
+                                        stop_time,
+                                        time_entry.duration,
+                                        time_entry.project_identifier,
+                                        time_entry.workspace_identifier,
+                                        time_entry.last_updated.timestamp(),
+                                        time_entry.identifier))
+
+        wanted = set()
+        for tag in time_entry.tags or []:
+            for name, identifier, _ in tag_rows:
+                if tag == name:
+                    wanted.add(identifier)
+                    break
+        cursor.execute('SELECT tag_identifier FROM time_entry_tags WHERE time_entry_identifier=?',
+                       (time_entry.identifier,))
+        existing = {row[0] for row in cursor.fetchall()}
+        for tag_identifier in wanted - existing:
+            cursor.execute('INSERT INTO time_entry_tags (time_entry_identifier, tag_identifier) VALUES (?, ?)',
+                           (time_entry.identifier, tag_identifier))
+        for tag_identifier in existing - wanted:
+            cursor.execute('DELETE FROM time_entry_tags WHERE time_entry_identifier=? AND tag_identifier=?',
+                           (time_entry.identifier, tag_identifier))
+
+    running = [time_entry for time_entry in time_entries if time_entry.stop_time is None]
+    if running:
+        latest = max(running, key=lambda time_entry: time_entry.start_time)
+        cursor.execute('INSERT OR REPLACE INTO running_time_entry (singleton, identifier, start_time) '
+                       'VALUES (0, ?, ?)', (latest.identifier, latest.start_time.timestamp()))
+    else:
+        cursor.execute('SELECT identifier FROM running_time_entry')
+        tracked = cursor.fetchone()
+        if tracked and tracked[0] in {time_entry.identifier for time_entry in time_entries}:
+            cursor.execute('DELETE FROM running_time_entry')
+    connection.commit()
+
+
+def rate(count: int, seconds: float) -> str:
+    return '{:>12,.0f} rows/s'.format(count / seconds if seconds else float('inf'))
+
+
+def run(count: int) -> None:
+    workspace = Workspace(name='Benchmark', identifier=1,
+                          last_updated=get_localzone().localize(datetime.now()))
+    first_pass = make_time_entries(count)
+    second_pass = make_time_entries(count, generation=1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, 'legacy.db')
+        legacy_caching = Caching(cache_name=legacy_path)
+        legacy_caching.update_workspace_cache([workspace])
+        legacy_caching.update_tag_cache(TAGS)
+        del legacy_caching
+        connection = connect(legacy_path)
+
+        began = time.perf_counter()
+        legacy_update_time_entry_cache(connection, first_pass)
+        legacy_insert = time.perf_counter() - began
+
+        began = time.perf_counter()
+        legacy_update_time_entry_cache(connection, second_pass)
+        legacy_update = time.perf_counter() - began
+        connection.close()
+
+        caching = Caching(cache_name=os.path.join(directory, 'bulk.db'))
+        caching.update_workspace_cache([workspace])
+        caching.update_tag_cache(TAGS)
+
+        began = time.perf_counter()
+        caching.update_time_entry_cache(first_pass)
+        bulk_insert = time.perf_counter() - began
+
+        began = time.perf_counter()
+        caching.update_time_entry_cache(second_pass)
+        bulk_update = time.perf_counter() - began
+        del caching
+
+    print('{:>7,} entries  insert: before {} after {}'.format(
+        count, rate(count, legacy_insert), rate(count, bulk_insert)))
+    print('{:>7}          update: before {} after {}'.format(
+        '', rate(count, legacy_update), rate(count, bulk_update)))
+
+
+if __name__ == '__main__':
+    for size in [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES:
+        run(size)
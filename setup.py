@@ -26,7 +26,7 @@ setup(
     ],
     entry_points={
       'console_scripts': [
-          'togglcmder = togglcmder.__main__:main'
+          'togglcmder = togglcmder.__main__:run'
       ]
     },
     python_requires='>=3.6'
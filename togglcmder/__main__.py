@@ -4,24 +4,35 @@ import os
 import click
 import json
 import logging
-import logging.handlers
 import sys
 
 from typing import Optional, List
 
 from togglcmder.version import __version__
 
-from togglcmder.toggl.cli.workspaces import workspaces as workspace_cli
-from togglcmder.toggl.cli.projects import projects as project_cli
-from togglcmder.toggl.cli.tags import tags as tag_cli
-from togglcmder.toggl.cli.time_entries import timers as timer_cli
-
-from togglcmder.toggl.caching import Caching
-from togglcmder.toggl.downloader import Downloader
-from togglcmder.toggl.commands import Commands
-
-
-@click.group(invoke_without_command=True)
+from togglcmder.toggl.cli.lazy_group import LazyGroup
+
+
+# The subcommands, and everything they import (requests, tabulate, tzlocal,
+# ...), are only loaded once one of them runs, so --help and --version return
+# without importing any of it.
+SUBCOMMANDS = {
+    'workspaces': ('togglcmder.toggl.cli.workspaces:workspaces',
+                   'List the currently available workspaces.'),
+    'projects': ('togglcmder.toggl.cli.projects:projects',
+                 'Add, update, delete, and list projects.'),
+    'tags': ('togglcmder.toggl.cli.tags:tags',
+             'Add, update, delete, and list tags.'),
+    'timers': ('togglcmder.toggl.cli.time_entries:timers',
+               'Add, update, delete, start, stop, and list timers.'),
+    'sync': ('togglcmder.toggl.cli.sync:sync',
+             'Bring the local cache up to date with Toggl.'),
+    'daemon': ('togglcmder.toggl.cli.daemon:daemon',
+               'Keep a warm togglcmder running in the background.')
+}
+
+
+@click.group(cls=LazyGroup, lazy_subcommands=SUBCOMMANDS, invoke_without_command=True)
 @click.option(
     '--api-key',
     help='Your API key for the Toggl API',
@@ -84,7 +95,8 @@ from togglcmder.toggl.commands import Commands
 )
 @click.option(
     '--sync',
-    help='Download from remote Toggl servers before attempting item lookups.',
+    help='Download from remote Toggl servers before attempting item lookups, however '
+         'recently the local cache was synced.',
     is_flag=True,
     default=False,
     show_default=True
@@ -95,6 +107,12 @@ from togglcmder.toggl.commands import Commands
     is_flag=True,
     default=False
 )
+@click.option(
+    '--trace-filters',
+    help='Show how many items each filter is given and returns, and how long it takes.',
+    is_flag=True,
+    default=False
+)
 @click.pass_context
 def main(context: click.Context,
          api_key: str,
@@ -106,7 +124,27 @@ def main(context: click.Context,
          default_time_entry_stop_days: int,
          verbosity: int,
          sync: bool,
-         show_config: bool):
+         show_config: bool,
+         trace_filters: bool):
+
+    # Deferred until a command actually runs; see SUBCOMMANDS above.
+    import logging.handlers
+
+    from togglcmder.toggl.cli.helpers import LazyData
+    from togglcmder.toggl.cli.helpers import enable_filter_trace
+
+    from togglcmder.toggl.caching import Caching
+    from togglcmder.toggl.downloader import Downloader
+    from togglcmder.toggl.commands import Commands
+    from togglcmder.toggl.synchronizer import Synchronizer
+    from togglcmder.toggl.scheduler import Scheduler
+    from togglcmder.toggl.transport import Transport
+    from togglcmder.toggl.refresher import Refresher
+    from togglcmder.toggl.freshness import FreshnessPolicy, Revalidator
+
+    # Inside the daemon, what it keeps warm between commands is handed in here
+    # and reused instead of being set up again; it is None otherwise.
+    warm = context.obj.get('warm') if context.obj else None
 
     # This object (context object provided by Click for sharing data between the
     # various command chains) contains configuration, defaults, and the objects we
@@ -120,20 +158,32 @@ def main(context: click.Context,
             'default_project': Optional[str],
             'default_tags': Optional[List[str]],
             'default_time_entry_window_start_days': 5,
-            'default_time_entry_window_stop_days': 0
+            'default_time_entry_window_stop_days': 0,
+            'cache': dict(Caching.CONNECTION_PROFILE),
+            'transport': dict(Transport.SETTINGS),
+            'rate_limit': dict(Scheduler.SETTINGS),
+            'download_workers': Synchronizer.WORKERS,
+            'time_entry_window': 'week',
+            'refresh': dict(Refresher.SETTINGS),
+            'freshness': {resource: dict(settings) for resource, settings in FreshnessPolicy.SETTINGS.items()}
         },
+        'warm': warm,
         'cache': Optional[Caching],
+        'transport': Optional[Transport],
         'downloader': Optional[Downloader],
         'commands': Optional[Commands],
+        'synchronizer': Optional[Synchronizer],
+        'freshness': Optional[FreshnessPolicy],
+        'revalidator': Optional[Revalidator],
         'sync': sync,
-        'data': {
+        'data': LazyData({
             'workspaces': [],
             'workspace': None,
             'projects': [],
             'project': None,
             'tags': [],
             'time_entries': []
-        }
+        })
     }
     context.obj['config']['api_key'] = None
     context.obj['config']['default_workspace'] = 'Everything'
@@ -150,12 +200,14 @@ def main(context: click.Context,
         os.mkdir(app_dir)
 
     if not os.path.exists(config):
+        config_text = json.dumps(context.obj['config'], sort_keys=True, indent=4)
         with open(config, 'w') as handle:
-            json.dump(context.obj['config'], handle, sort_keys=True, indent=4)
+            handle.write(config_text)
     else:
         with open(config, 'r') as handle:
-            # Merge the defaults in with the actual configuration.
-            context.obj['config'] = {**context.obj['config'], **json.load(handle)}
+            config_text = handle.read()
+        # Merge the defaults in with the actual configuration.
+        context.obj['config'] = {**context.obj['config'], **json.loads(config_text)}
 
     # If the user provides the API key, we overwrite the key from the configuration
     # file and use that for all future requests.
@@ -169,23 +221,44 @@ def main(context: click.Context,
 
     # Logs to the app directory instead of where the script is run from.
     log_path = os.path.join(app_dir, 'toggl.log')
-    log_file_handle = logging.handlers.RotatingFileHandler(log_path)
 
-    # TODO: is this formatted string sufficient for logging? Too much?
-    formatter = logging.Formatter(
-        "%(asctime)s: %(levelname)s: %(name)s: %(lineno)d: %(message)s",
-        "%Y-%m-%dT%H:%M:%S")
+    # The daemon runs many commands in one process; they all share one handler.
+    if not any(isinstance(handler, logging.FileHandler) and handler.baseFilename == os.path.abspath(log_path)
+               for handler in logger.handlers):
+        log_file_handle = logging.handlers.RotatingFileHandler(log_path)
+
+        # TODO: is this formatted string sufficient for logging? Too much?
+        formatter = logging.Formatter(
+            "%(asctime)s: %(levelname)s: %(name)s: %(lineno)d: %(message)s",
+            "%Y-%m-%dT%H:%M:%S")
 
-    log_file_handle.setFormatter(formatter)
+        log_file_handle.setFormatter(formatter)
 
-    logger.addHandler(log_file_handle)
+        logger.addHandler(log_file_handle)
 
     # The way logger handles the debug levels is a bit odd, so we need to do
     # this to allow the the user to change the levels as expected. e.g. -vvv
     # allows more verbosity than just -v.
     logger.setLevel(60 - ((3 + verbosity) * 10))
 
-    cache = Caching(cache_name=os.path.join(app_dir, 'cache.db'))
+    if trace_filters:
+        enable_filter_trace(context)
+
+    if warm is not None and 'cache' in warm:
+        cache = warm['cache']
+    else:
+        cache = Caching(cache_name=os.path.join(app_dir, 'cache.db'),
+                        profile=context.obj['config']['cache'])
+        if warm is not None:
+            warm['cache'] = cache
+
+        # A cache that had to be recreated is empty, so repopulate it from the
+        # server instead of showing the user nothing.
+        if cache.rebuilt:
+            click.echo(click.style('WARNING', fg='yellow') +
+                       ': the local cache could not be upgraded and was rebuilt;'
+                       ' downloading everything from the server again.')
+            context.obj['sync'] = True
     context.obj['cache'] = cache
 
     if api_key:
@@ -198,12 +271,18 @@ def main(context: click.Context,
                    "more information.")
         return
 
+    # Every request to the Toggl API is paced through this, and the lock file
+    # shares the rate limit with any other togglcmder running at the same time.
+    scheduler = Scheduler(state_path=os.path.join(app_dir, 'rate_limit.lock'),
+                          settings=context.obj['config']['rate_limit'])
+
     # The API key can be reset and is automatically updated in both the file and
     # the running instance of the script.
     if reset_api_key:
         try:
             context.obj['config']['api_key'] = Commands(
-                context.obj['config']['api_key']).reset_api_token().strip('"')
+                Transport(context.obj['config']['api_key'],
+                          scheduler=scheduler)).reset_api_token().strip('"')
             click.echo(click.style("SUCCESS", fg="green") +
                        "API key successfully reset!")
         except Exception as e:
@@ -238,16 +317,62 @@ def main(context: click.Context,
     if default_time_entry_stop_days:
         context.obj['config']['default_time_entry_window_stop_days'] = default_time_entry_stop_days
 
-    # We've updated the configuration internally, now update it on disk.
-    with open(config, 'w') as handle:
-        json.dump(context.obj['config'], handle, sort_keys=True, indent=4)
+    # If we've updated the configuration internally, now update it on disk.
+    updated_config_text = json.dumps(context.obj['config'], sort_keys=True, indent=4)
+    if updated_config_text != config_text:
+        with open(config, 'w') as handle:
+            handle.write(updated_config_text)
 
     if show_config:
         click.echo(context.obj['config'])
 
-    # Set up the command and downloader objects with the API key.
-    context.obj['commands'] = Commands(context.obj['config']['api_key'])
-    context.obj['downloader'] = Downloader(context.obj['config']['api_key'])
+    # Set up the command and downloader objects with the API key. They share
+    # one pooled connection to the Toggl servers for the whole invocation, or
+    # inside the daemon for as long as the key and settings stay the same.
+    transport_key = json.dumps([context.obj['config'][key] for key in ('api_key', 'transport', 'rate_limit')],
+                               sort_keys=True)
+    if warm is not None and warm.get('transport_key') == transport_key:
+        transport = warm['transport']
+        scheduler = transport.scheduler
+    else:
+        transport = Transport(context.obj['config']['api_key'],
+                              settings=context.obj['config']['transport'],
+                              scheduler=scheduler)
+        if warm is not None:
+            if 'transport' in warm:
+                warm['transport'].close()
+            warm['transport'] = transport
+            warm['transport_key'] = transport_key
+    context.obj['transport'] = transport
+    context.obj['commands'] = Commands(transport)
+    context.obj['downloader'] = Downloader(transport,
+                                           window=context.obj['config']['time_entry_window'],
+                                           workers=context.obj['config']['download_workers'])
+
+    def close_transport():
+        logger.debug("connections: %s", transport.stats)
+        logger.debug("rate limiting: %s", scheduler.stats)
+        if warm is None:
+            transport.close()
+
+    context.call_on_close(close_transport)
+    context.obj['synchronizer'] = Synchronizer(cache, context.obj['downloader'],
+                                               workers=context.obj['config']['download_workers'])
+
+    # Stale resources are served from the cache and synced in the background,
+    # with a connection and synchronizer of their own; the command waits for
+    # that to finish before it exits (and before the transport is closed).
+    context.obj['freshness'] = FreshnessPolicy(context.obj['config']['freshness'])
+    revalidator = Revalidator(
+        lambda caching: Synchronizer(caching,
+                                     Downloader(transport,
+                                                window=context.obj['config']['time_entry_window'],
+                                                workers=context.obj['config']['download_workers']),
+                                     workers=context.obj['config']['download_workers']),
+        lambda: Caching(cache_name=os.path.join(app_dir, 'cache.db'),
+                        profile=context.obj['config']['cache']))
+    context.obj['revalidator'] = revalidator
+    context.call_on_close(revalidator.join)
 
 
 ######################################################
@@ -255,12 +380,35 @@ def main(context: click.Context,
 
 assert(isinstance(main, click.Group))
 
-main.add_command(workspace_cli)
-main.add_command(project_cli)
-main.add_command(tag_cli)
-main.add_command(timer_cli)
+
+def run():
+    """
+    The command line entry point. Commands are handed to the daemon when one
+    is running and only run here when there is none.
+    """
+    args = sys.argv[1:]
+
+    # The daemon itself, and anything asking questions on the terminal, always
+    # runs here.
+    if 'daemon' not in args and '--reset-api-key' not in args:
+        from togglcmder.toggl.daemon.client import DaemonError, send, socket_path
+
+        try:
+            reply = send(socket_path(click.get_app_dir('togglcmder')), args,
+                         {key: value for key, value in os.environ.items() if key.startswith('TOGGL_')},
+                         color=sys.stdout.isatty())
+        except DaemonError as e:
+            click.echo(click.style('ERROR', fg='red') + f': {e}', err=True)
+            sys.exit(1)
+
+        if reply:
+            sys.stdout.write(reply.output)
+            sys.exit(reply.exit_code)
+
+    main(auto_envvar_prefix='TOGGL')
+
 
 ######################################################
 
 if __name__ == "__main__":
-    main(auto_envvar_prefix='TOGGL')
+    run()
@@ -0,0 +1,124 @@
+import functools
+import random
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from togglcmder.toggl.aggregators.time_entries import TimeEntries as TimeEntryAggregator
+from togglcmder.toggl.builders.time_entry_builder import TimeEntryBuilder
+from togglcmder.toggl.filters.time_entries import TimeEntries as TimeEntryFilter
+from togglcmder.toggl.types.project import Project
+from togglcmder.toggl.types.time_entry import TimeEntry
+from togglcmder.toggl.types.workspace import Workspace
+from togglcmder.toggl.views.time_entry import TimeEntry as TimeEntryView
+
+
+def reduce_with_filters(time_entries, workspaces, projects):
+    # How "timers list" used to reduce, filtering the whole list for every
+    # workspace, project and description; kept to check against.
+    result = []
+    for workspace in workspaces:
+        workspace_entries = TimeEntryFilter.filter_on_workspace(time_entries, workspace)
+        if not workspace_entries:
+            continue
+        for project in projects:
+            project_entries = TimeEntryFilter.filter_on_project(workspace_entries, project)
+            if not project_entries:
+                continue
+            for description in dict.fromkeys(entry.description for entry in project_entries):
+                description_entries = sorted(
+                    TimeEntryFilter.filter_on_description(project_entries, description),
+                    key=lambda entry: entry.last_updated,
+                    reverse=True)
+                result.append((functools.reduce(
+                    lambda x, y: TimeEntryBuilder(x).duration(x.duration + y.duration).build(),
+                    description_entries), project, workspace))
+        for entry in workspace_entries:
+            if entry.project_identifier is None:
+                result.append((entry, None, workspace))
+    return result
+
+
+def rows(reduced):
+    return [row for entry, project, workspace in reduced
+            for row in TimeEntryView([entry], project, workspace).values()]
+
+
+class TestAggregators(unittest.TestCase):
+    START = datetime(2020, 6, 1, tzinfo=timezone.utc)
+
+    @staticmethod
+    def __data(count: int, *, workspaces: int = 2, projects: int = 5, descriptions: int = 20, seed: int = 1):
+        generator = random.Random(seed)
+        workspace_list = [Workspace(name=f'Workspace {index}', identifier=index)
+                          for index in range(1, workspaces + 1)]
+        # Every workspace has projects, and one more workspace has entries but isn't listed.
+        project_list = [Project(name=f'Project {index}', identifier=index,
+                                workspace_identifier=index % workspaces + 1)
+                        for index in range(1, projects + 1)]
+
+        time_entries = []
+        for index in range(count):
+            project = generator.choice(project_list + [None])
+            start = TestAggregators.START + timedelta(minutes=index)
+            time_entries.append(TimeEntry(
+                identifier=index,
+                description=f'Task {generator.randrange(descriptions)}',
+                start_time=start,
+                stop_time=start + timedelta(minutes=30),
+                duration=generator.randrange(60, 3600),
+                project_identifier=project.identifier if project else None,
+                workspace_identifier=project.workspace_identifier if project else
+                generator.randrange(1, workspaces + 2),
+                tags=[],
+                # Plenty of ties, which go to the first entry.
+                last_updated=start.replace(minute=0) + timedelta(hours=generator.randrange(3))))
+        return time_entries, workspace_list, project_list
+
+    def test_matches_filters(self):
+        time_entries, workspaces, projects = TestAggregators.__data(2000)
+
+        reduced = TimeEntryAggregator.reduce_on_description(time_entries, workspaces, projects)
+        self.assertEqual(rows(reduce_with_filters(time_entries, workspaces, projects)), rows(reduced))
+        self.assertEqual(sum(entry.duration for entry in time_entries
+                             if entry.workspace_identifier <= len(workspaces)),
+                         sum(entry.duration for entry, _, _ in reduced))
+
+    def test_running_entry(self):
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        stopped = TimeEntry(identifier=1, description='Task', start_time=now - timedelta(hours=3),
+                            duration=3600, project_identifier=1, workspace_identifier=1,
+                            last_updated=now - timedelta(hours=2))
+        running = TimeEntry(identifier=2, description='Task', start_time=now - timedelta(minutes=10),
+                            duration=-int((now - timedelta(minutes=10)).timestamp()),
+                            project_identifier=1, workspace_identifier=1,
+                            last_updated=now - timedelta(minutes=10))
+        workspace = Workspace(name='Workspace', identifier=1)
+        project = Project(name='Project', identifier=1, workspace_identifier=1)
+
+        [(entry, _, _)] = TimeEntryAggregator.reduce_on_description([stopped, running], [workspace], [project])
+        # The running entry counts for the time it has run so far, and being
+        # the latest update it is the one shown.
+        self.assertEqual(running.identifier, entry.identifier)
+        self.assertAlmostEqual(3600 + 600, entry.duration, delta=5)
+
+        # On its own it is left alone.
+        [(entry, _, _)] = TimeEntryAggregator.reduce_on_description([running], [workspace], [project])
+        self.assertIs(running, entry)
+
+    def test_many_groups(self):
+        # How fast this is is measured by benchmarks/bench_aggregators.py.
+        time_entries, workspaces, projects = TestAggregators.__data(
+            20000, workspaces=5, projects=50, descriptions=500)
+
+        reduced = TimeEntryAggregator.reduce_on_description(time_entries, workspaces, projects)
+        self.assertEqual(sum(entry.duration for entry in time_entries
+                             if entry.workspace_identifier <= len(workspaces)),
+                         sum(entry.duration for entry, _, _ in reduced))
+        self.assertEqual(len({(entry.workspace_identifier, entry.project_identifier, entry.description)
+                              for entry in time_entries
+                              if entry.project_identifier is not None}),
+                         len([row for row in reduced if row[1] is not None]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,15 @@
+import os
+import multiprocessing
+import sqlite3
+import tempfile
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from tzlocal import get_localzone
 
-from togglcmder.toggl.caching import Caching
+from togglcmder.toggl.caching import Caching, SyncState, UpsertResult
+from togglcmder.toggl.builders.workspace_builder import WorkspaceBuilder
+from togglcmder.toggl.builders.project_builder import ProjectBuilder
+from togglcmder.toggl.builders.time_entry_builder import TimeEntryBuilder
 from togglcmder.toggl.types.workspace import Workspace
 from togglcmder.toggl.types.project import Project
 from togglcmder.toggl.types.tag import Tag
@@ -10,6 +17,18 @@ from togglcmder.toggl.types.user import User
 from togglcmder.toggl.types.time_entry import TimeEntry
 
 
+def write_concurrently(cache_name: str, writer: int, count: int) -> int:
+    # Runs in a separate process; every write is its own transaction so the
+    # writers keep contending for the database lock.
+    caching = Caching(cache_name=cache_name)
+    written = 0
+    for index in range(count):
+        written += caching.update_workspace_cache([
+            WorkspaceBuilder(TestCaching.WORKSPACE).identifier(writer * count + index + 1).build()
+        ])
+    return written
+
+
 class TestCaching(unittest.TestCase):
     WORKSPACE = Workspace(
         name='Test Workspace',
@@ -111,6 +130,287 @@ class TestCaching(unittest.TestCase):
         self.assertEqual(1, self.__connection.update_user_cache(TestCaching.USER))
         self.assertEqual(TestCaching.USER, self.__connection.retrieve_user_cache())
 
+    def test_upsert_counts(self):
+        self.assertEqual(1, self.__connection.update_workspace_cache([TestCaching.WORKSPACE]))
+        self.assertEqual(UpsertResult(inserted=1, updated=0), self.__connection.last_upsert)
+
+        # Identical rows are left alone entirely.
+        self.assertEqual(0, self.__connection.update_workspace_cache([TestCaching.WORKSPACE]))
+        self.assertEqual(UpsertResult(inserted=0, updated=0), self.__connection.last_upsert)
+
+        renamed = WorkspaceBuilder(TestCaching.WORKSPACE).name('Renamed Workspace').build()
+        other = WorkspaceBuilder(TestCaching.WORKSPACE).identifier(2).build()
+        self.assertEqual(2, self.__connection.update_workspace_cache([renamed, other]))
+        self.assertEqual(UpsertResult(inserted=1, updated=1), self.__connection.last_upsert)
+        self.assertEqual([renamed, other], self.__connection.retrieve_workspace_cache())
+
+    def test_transaction_rollback(self):
+        with self.assertRaises(RuntimeError):
+            with self.__connection.transaction():
+                self.__connection.update_workspace_cache([TestCaching.WORKSPACE])
+                raise RuntimeError()
+        self.assertIsNone(self.__connection.retrieve_workspace_cache())
+
+        # An interrupted batch isn't saved half applied either.
+        with self.assertRaises(KeyboardInterrupt):
+            with self.__connection.transaction():
+                self.__connection.update_workspace_cache([TestCaching.WORKSPACE])
+                raise KeyboardInterrupt()
+        self.assertIsNone(self.__connection.retrieve_workspace_cache())
+
+        with self.__connection.transaction():
+            with self.__connection.transaction():
+                self.__connection.update_workspace_cache([TestCaching.WORKSPACE])
+        self.assertEqual([TestCaching.WORKSPACE], self.__connection.retrieve_workspace_cache())
+
+    def test_time_entry_tags_retrieval(self):
+        self.__connection.update_workspace_cache([TestCaching.WORKSPACE])
+        self.__connection.update_project_cache([TestCaching.PROJECT])
+        self.__connection.update_tag_cache(
+            [TestCaching.TAG_ONE, TestCaching.TAG_TWO, TestCaching.TAG_THREE])
+
+        untagged = TimeEntryBuilder(TestCaching.TIME_ENTRY_TWO).identifier(3).tags([]).build()
+        self.__connection.update_time_entry_cache(
+            [TestCaching.TIME_ENTRY_ONE, untagged, TestCaching.TIME_ENTRY_TWO])
+
+        # Tags are stitched back onto the right entries from a single query.
+        self.assertEqual({1: ['Test Tag One', 'Test Tag Two'], 2: ['Test Tag Three'], 3: []},
+                         {entry.identifier: entry.tags
+                          for entry in self.__connection.retrieve_time_entry_cache()})
+
+    def test_time_entry_query(self):
+        self.__connection.update_workspace_cache([TestCaching.WORKSPACE])
+        self.__connection.update_project_cache([TestCaching.PROJECT])
+        self.__connection.update_tag_cache(
+            [TestCaching.TAG_ONE, TestCaching.TAG_TWO, TestCaching.TAG_THREE])
+
+        now = get_localzone().localize(datetime.now())
+        old_entry = TimeEntryBuilder(TestCaching.TIME_ENTRY_ONE)\
+            .identifier(3)\
+            .start_time(dt=now - timedelta(days=30))\
+            .build()
+        no_project_entry = TimeEntryBuilder(TestCaching.TIME_ENTRY_TWO)\
+            .identifier(4)\
+            .project_identifier(None)\
+            .build()
+        self.__connection.update_time_entry_cache(
+            [TestCaching.TIME_ENTRY_ONE, TestCaching.TIME_ENTRY_TWO, old_entry, no_project_entry])
+
+        window = (now - timedelta(days=5), now + timedelta(days=1))
+        self.assertEqual([1, 2, 4], [entry.identifier for entry in self.__connection.query_time_entries(
+            TestCaching.WORKSPACE.identifier, *window)])
+        self.assertEqual([1, 2], [entry.identifier for entry in self.__connection.query_time_entries(
+            TestCaching.WORKSPACE.identifier, *window, project_identifier=TestCaching.PROJECT.identifier)])
+        self.assertEqual([2, 4], [entry.identifier for entry in self.__connection.query_time_entries(
+            TestCaching.WORKSPACE.identifier, *window, tag_identifiers=[TestCaching.TAG_THREE.identifier])])
+        self.assertEqual([], self.__connection.query_time_entries(2, *window))
+        self.assertEqual([old_entry, TestCaching.TIME_ENTRY_ONE], self.__connection.query_time_entries(
+            TestCaching.WORKSPACE.identifier, tag_identifiers=[TestCaching.TAG_ONE.identifier]))
+
+    def test_time_entry_summary(self):
+        self.__connection.update_workspace_cache([TestCaching.WORKSPACE])
+        self.__connection.update_project_cache([TestCaching.PROJECT])
+        self.__connection.update_tag_cache(
+            [TestCaching.TAG_ONE, TestCaching.TAG_TWO, TestCaching.TAG_THREE])
+
+        # A Monday, and the Sunday before it.
+        monday = get_localzone().localize(datetime(2020, 6, 1, 23, 30))
+        sunday = get_localzone().localize(datetime(2020, 5, 31, 0, 30))
+        now = monday + timedelta(hours=2)
+        running_builder = TimeEntryBuilder(TestCaching.TIME_ENTRY_TWO)\
+            .identifier(3)\
+            .start_time(dt=monday + timedelta(minutes=15))
+        running_builder.unset_stop_time()
+        running = running_builder.build()
+        no_project_entry = TimeEntryBuilder(TestCaching.TIME_ENTRY_TWO)\
+            .identifier(4)\
+            .start_time(dt=sunday)\
+            .project_identifier(None)\
+            .description('')\
+            .tags([])\
+            .build()
+        self.__connection.update_time_entry_cache([
+            TimeEntryBuilder(TestCaching.TIME_ENTRY_ONE).start_time(dt=monday).build(),
+            TimeEntryBuilder(TestCaching.TIME_ENTRY_TWO).start_time(dt=sunday).build(),
+            running,
+            no_project_entry])
+
+        def summary(group_by, **kwargs):
+            return [tuple(row) for row in self.__connection.summarize_time_entries(group_by, now=now, **kwargs)]
+
+        # The running entry has run for 105 minutes.
+        self.assertEqual([('2020-05-31', 2, 120, 60.0), ('2020-06-01', 2, 6330, 3165.0)], summary('day'))
+        self.assertEqual([('2020-05-25', 2, 120, 60.0), ('2020-06-01', 2, 6330, 3165.0)], summary('week'))
+        self.assertEqual([('2020-05', 2, 120, 60.0), ('2020-06', 2, 6330, 3165.0)], summary('month'))
+        self.assertEqual([('Test Project', 3, 6390, 2130.0), (None, 1, 60, 60.0)], summary('project'))
+        self.assertEqual([('Test Entry Two', 2, 6360, 3180.0), (None, 1, 60, 60.0), ('Test Entry One', 1, 30, 30.0)],
+                         summary('description'))
+        self.assertEqual([('Test Tag Three', 2, 6360, 3180.0), (None, 1, 60, 60.0),
+                          ('Test Tag One', 1, 30, 30.0), ('Test Tag Two', 1, 30, 30.0)],
+                         sorted(summary('tag'), key=lambda row: (-row[2], row[0] or '')))
+
+        # The same criteria as query_time_entries.
+        self.assertEqual([('2020-06-01', 2, 6330, 3165.0)], summary('day', start=sunday))
+        self.assertEqual([('2020-05-31', 1, 60, 60.0)],
+                         summary('day', stop=monday, project_identifiers=[TestCaching.PROJECT.identifier]))
+        self.assertEqual([], summary('day', workspace_identifiers=[2]))
+
+    def test_time_entry_summary_same_project_names(self):
+        other_workspace = WorkspaceBuilder(TestCaching.WORKSPACE).identifier(2).build()
+        other_project = ProjectBuilder(TestCaching.PROJECT).identifier(2).workspace_identifier(2).build()
+        self.__connection.update_workspace_cache([TestCaching.WORKSPACE, other_workspace])
+        self.__connection.update_project_cache([TestCaching.PROJECT, other_project])
+        self.__connection.update_time_entry_cache([
+            TimeEntryBuilder(TestCaching.TIME_ENTRY_ONE).tags([]).build(),
+            TimeEntryBuilder(TestCaching.TIME_ENTRY_TWO).tags([])
+            .project_identifier(2).workspace_identifier(2).build()])
+
+        # Same name, different projects: one row each, as timers list shows them.
+        self.assertEqual([('Test Project', 1, 60, 60.0), ('Test Project', 1, 30, 30.0)],
+                         [tuple(row) for row in self.__connection.summarize_time_entries('project')])
+
+    def test_time_entry_tags_resync(self):
+        self.__connection.update_workspace_cache([TestCaching.WORKSPACE])
+        self.__connection.update_project_cache([TestCaching.PROJECT])
+        self.__connection.update_tag_cache(
+            [TestCaching.TAG_ONE, TestCaching.TAG_TWO, TestCaching.TAG_THREE])
+
+        for _ in range(2):
+            self.__connection.update_time_entry_cache([TestCaching.TIME_ENTRY_ONE])
+            self.assertEqual([TestCaching.TIME_ENTRY_ONE], self.__connection.retrieve_time_entry_cache())
+
+        retagged = TimeEntryBuilder(TestCaching.TIME_ENTRY_ONE).tags(['Test Tag Three']).build()
+        self.__connection.update_time_entry_cache([retagged])
+        self.assertEqual([retagged], self.__connection.retrieve_time_entry_cache())
+
+    def test_time_entry_tags_migration(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_name = os.path.join(directory, 'cache.db')
+
+            caching = Caching(cache_name=cache_name)
+            caching.update_workspace_cache([TestCaching.WORKSPACE])
+            caching.update_project_cache([TestCaching.PROJECT])
+            caching.update_tag_cache([TestCaching.TAG_ONE, TestCaching.TAG_TWO])
+            caching.update_time_entry_cache([TestCaching.TIME_ENTRY_ONE])
+            del caching
+
+            # Turn this into a cache from before schema versioning, with the
+            # original junction table, duplicates and all.
+            connection = sqlite3.connect(cache_name)
+            connection.execute('DROP INDEX time_entry_tags_tag')
+            connection.execute('ALTER TABLE time_entry_tags RENAME TO keyed')
+            connection.executescript('''
+                CREATE TABLE time_entry_tags (
+                    tag_identifier INTEGER NOT NULL,
+                    time_entry_identifier INTEGER NOT NULL
+                );
+                INSERT INTO time_entry_tags SELECT tag_identifier, time_entry_identifier FROM keyed;
+                INSERT INTO time_entry_tags SELECT tag_identifier, time_entry_identifier FROM keyed;
+                INSERT INTO time_entry_tags VALUES (99, 1);
+                DROP TABLE keyed;
+                PRAGMA user_version = 0;
+            ''')
+            connection.commit()
+            connection.close()
+
+            caching = Caching(cache_name=cache_name)
+            self.assertEqual([TestCaching.TIME_ENTRY_ONE], caching.retrieve_time_entry_cache())
+            del caching
+
+            connection = sqlite3.connect(cache_name)
+            self.assertEqual(len(Caching.MIGRATIONS), connection.execute('PRAGMA user_version').fetchone()[0])
+            self.assertEqual(2, connection.execute('SELECT COUNT(*) FROM time_entry_tags').fetchone()[0])
+            self.assertIn('WITHOUT ROWID', connection.execute(
+                "SELECT sql FROM sqlite_master WHERE name='time_entry_tags'").fetchone()[0])
+            connection.close()
+
+    def test_sync_state(self):
+        self.assertIsNone(self.__connection.retrieve_sync_state('projects', 1))
+
+        mark = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        self.__connection.update_sync_state('projects', 1, high_water_mark=mark)
+        state = self.__connection.retrieve_sync_state('projects', 1)
+        self.assertIsInstance(state, SyncState)
+        self.assertEqual(mark, state.high_water_mark)
+        self.assertIsNone(state.coverage_start)
+        self.assertIsNone(self.__connection.retrieve_sync_state('projects', 2))
+
+        # Bulk removals report how many rows actually went away.
+        self.__connection.update_workspace_cache([TestCaching.WORKSPACE])
+        self.__connection.update_time_entry_cache([
+            TimeEntryBuilder(TestCaching.TIME_ENTRY_ONE).project_identifier(None).tags([]).build()])
+        self.assertEqual(1, self.__connection.remove_workspaces_from_cache([1, 2]))
+        self.assertEqual([], self.__connection.retrieve_time_entry_cache())
+
+    def test_running_time_entry(self):
+        self.__connection.update_workspace_cache([TestCaching.WORKSPACE])
+        self.assertIsNone(self.__connection.retrieve_running_time_entry_cache())
+
+        builder = TimeEntryBuilder(TestCaching.TIME_ENTRY_ONE).project_identifier(None).tags([])
+        builder.unset_stop_time()
+        running = builder.build()
+        self.__connection.update_time_entry_cache([running])
+        self.assertEqual((running.identifier, running.start_time),
+                         self.__connection.retrieve_running_time_entry_cache())
+
+        # Seeing the same entry stopped forgets it again.
+        stopped = TimeEntryBuilder(running).stop_time(dt=running.start_time + timedelta(minutes=5)).build()
+        self.__connection.update_time_entry_cache([stopped])
+        self.assertIsNone(self.__connection.retrieve_running_time_entry_cache())
+
+    def test_schema_version(self):
+        self.assertEqual(len(Caching.MIGRATIONS), self.__connection.schema_version)
+        self.assertFalse(self.__connection.rebuilt)
+
+    def test_failed_migration_rebuilds(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_name = os.path.join(directory, 'cache.db')
+
+            caching = Caching(cache_name=cache_name)
+            caching.update_workspace_cache([TestCaching.WORKSPACE])
+            del caching
+
+            # A cache claiming a revision it does not have can't be migrated.
+            connection = sqlite3.connect(cache_name)
+            connection.executescript('''
+                DROP TABLE time_entry_tags;
+                PRAGMA user_version = 2;
+            ''')
+            connection.close()
+
+            caching = Caching(cache_name=cache_name)
+            self.assertTrue(caching.rebuilt)
+            self.assertEqual(len(Caching.MIGRATIONS), caching.schema_version)
+            self.assertIsNone(caching.retrieve_workspace_cache())
+            del caching
+
+    def test_connection_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            caching = Caching(cache_name=os.path.join(directory, 'cache.db'),
+                              profile={'synchronous': 'full', 'busy_timeout': 100})
+            caching.update_workspace_cache([TestCaching.WORKSPACE])
+            del caching
+
+            connection = sqlite3.connect(os.path.join(directory, 'cache.db'))
+            self.assertEqual('wal', connection.execute('PRAGMA journal_mode').fetchone()[0])
+            connection.close()
+
+        with self.assertRaises(ValueError):
+            Caching(cache_name=':memory:', profile={'journal_mode': 'wal; DROP TABLE tags'})
+
+    def test_concurrent_writers(self):
+        writers, count = 4, 50
+        with tempfile.TemporaryDirectory() as directory:
+            cache_name = os.path.join(directory, 'cache.db')
+            Caching(cache_name=cache_name)
+
+            with multiprocessing.Pool(writers) as pool:
+                written = pool.starmap(write_concurrently,
+                                       [(cache_name, writer, count) for writer in range(writers)])
+
+            self.assertEqual([count] * writers, written)
+            self.assertEqual(writers * count, len(Caching(cache_name=cache_name).retrieve_workspace_cache()))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,188 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import click
+import requests
+from click.testing import CliRunner
+
+from togglcmder.toggl.caching import Caching
+from togglcmder.toggl.commands import Commands
+from togglcmder.toggl.downloader import Changes, Downloader
+from togglcmder.toggl.endpoints.api import API
+from togglcmder.toggl.cli.helpers import LazyData, needs
+from togglcmder.toggl.cli.time_entries import stop_running_time_entry, timer_update
+from togglcmder.toggl.indexes.time_entries import TimeEntryIndex
+from togglcmder.toggl.synchronizer import Synchronizer
+from togglcmder.toggl.types.project import Project
+from togglcmder.toggl.types.workspace import Workspace
+
+
+class StubReply(object):
+    def __init__(self, data, status_code: int = 200):
+        self.text = json.dumps({'data': data})
+        self.status_code = status_code
+        self.request = self
+
+    body = None
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(self.status_code, response=self)
+
+
+class StubTransport(object):
+    # Plays the server's part for stopping timers, recording every request.
+    def __init__(self):
+        self.requests = []
+        self.running = None
+        self.stopped = {}
+
+    @staticmethod
+    def entry(identifier: int, start: datetime, stop=None) -> dict:
+        entry = {'id': identifier, 'wid': 1, 'description': 'Entry',
+                 'start': start.isoformat(), 'at': start.isoformat(),
+                 'duration': -int(start.timestamp())}
+        if stop:
+            entry['stop'] = stop.isoformat()
+            entry['duration'] = int((stop - start).total_seconds())
+        return entry
+
+    def get(self, url: str) -> StubReply:
+        self.requests.append(('GET', url))
+        return StubReply(self.running and StubTransport.entry(*self.running))
+
+    def put(self, url: str) -> StubReply:
+        self.requests.append(('PUT', url))
+        identifier = int(url.rsplit('/', 2)[1])
+        now = datetime.now(tz=timezone.utc).replace(microsecond=0)
+        if self.running and self.running[0] == identifier:
+            self.stopped[identifier] = (identifier, self.running[1], now)
+            self.running = None
+        if identifier not in self.stopped:
+            return StubReply(None, 404)
+        return StubReply(StubTransport.entry(*self.stopped[identifier]))
+
+
+class WritingDownloader(object):
+    # While "downloading" projects, writes to the cache from another
+    # connection, as a cron --sync running at the same time would.
+    def __init__(self, cache_name: str):
+        self.__cache_name = cache_name
+        self.written = 0
+
+    def download_workspace_changes(self, since=None):
+        return Changes([Workspace(name='Test Workspace', identifier=1, last_updated=TestCli.START)], [])
+
+    def download_project_changes(self, workspace, since=None):
+        other = Caching(cache_name=self.__cache_name, profile={'busy_timeout': 100})
+        self.written = other.update_workspace_cache([
+            Workspace(name='Other Workspace', identifier=2, last_updated=TestCli.START)])
+        return Changes([Project(name='Test Project', color=Project.Color.RED, identifier=1,
+                                workspace_identifier=1, last_updated=TestCli.START)], [])
+
+
+class TestCli(unittest.TestCase):
+    START = datetime.now(tz=timezone.utc).replace(microsecond=0) - timedelta(hours=1)
+
+    def setUp(self) -> None:
+        self.__transport = StubTransport()
+        self.__caching = Caching(cache_name=':memory:')
+        self.__caching.update_workspace_cache([
+            Workspace(name='Test Workspace', identifier=1, last_updated=TestCli.START)])
+        self.__context = {
+            'cache': self.__caching,
+            'commands': Commands(self.__transport),
+            'downloader': Downloader(self.__transport)
+        }
+
+    def __start(self, identifier: int) -> None:
+        self.__transport.running = (identifier, TestCli.START)
+        self.__caching.update_time_entry_cache([Downloader(self.__transport).get_current_time_entry()])
+        del self.__transport.requests[:]
+
+    def test_stop_tracked(self):
+        self.__start(1)
+
+        entry = stop_running_time_entry(self.__context)
+        self.assertEqual(1, entry.identifier)
+        self.assertEqual([('PUT', API().time_entries.stop(1))],
+                         self.__transport.requests)
+
+    def test_stop_falls_back(self):
+        self.__start(1)
+        # Something else started another timer since.
+        self.__transport.stopped[1] = (1, TestCli.START, TestCli.START + timedelta(minutes=5))
+        self.__transport.running = (2, TestCli.START + timedelta(minutes=10))
+
+        entry = stop_running_time_entry(self.__context)
+        self.assertEqual(2, entry.identifier)
+        self.assertEqual(['PUT', 'GET', 'PUT'], [method for method, _ in self.__transport.requests])
+
+    def test_stop_untracked(self):
+        self.__transport.running = (3, TestCli.START)
+
+        self.assertEqual(3, stop_running_time_entry(self.__context).identifier)
+        self.assertIsNone(stop_running_time_entry(self.__context))
+
+    def test_update_nothing(self):
+        self.__start(1)
+        time_entries = self.__caching.retrieve_time_entry_cache()
+        self.__context['data'] = LazyData({
+            'workspace': self.__caching.retrieve_workspace_cache()[0],
+            'projects': [],
+            'tags': [],
+            'time_entry_index': TimeEntryIndex(time_entries)})
+
+        result = CliRunner().invoke(timer_update, ['--old-description', 'Entry'], obj=self.__context)
+        self.assertEqual(0, result.exit_code)
+        self.assertIn('nothing to update', result.output)
+        self.assertEqual([], self.__transport.requests)
+
+    def test_lazy_data(self):
+        loaded = []
+        data = LazyData({'workspaces': [], 'tags': []})
+        data.loader('workspaces', lambda: loaded.append('workspaces') or ['workspace'])
+        data.loader('tags', lambda: loaded.append('tags') or ['tag'])
+
+        # Nothing is loaded until it is read, and then only once.
+        self.assertEqual([], loaded)
+        data.load('workspaces')
+        self.assertEqual(['workspace'], data['workspaces'])
+        self.assertEqual(['workspaces'], loaded)
+
+        self.assertEqual(['tag'], data['tags'])
+        self.assertEqual(['workspaces', 'tags'], loaded)
+
+        # Unknown keys still fail like any other dictionary.
+        with self.assertRaises(KeyError):
+            data['time_entries']
+
+    def test_loading_does_not_lock_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_name = os.path.join(directory, 'cache.db')
+            caching = Caching(cache_name=cache_name)
+            downloader = WritingDownloader(cache_name)
+            synchronizer = Synchronizer(caching, downloader)
+
+            def load_projects():
+                synchronizer.sync_workspaces()
+                synchronizer.sync_projects(caching.retrieve_workspace_cache()[0])
+                return caching.retrieve_project_cache()
+
+            data = LazyData()
+            data.loader('projects', load_projects)
+            with click.Context(click.Command('list'), obj={'cache': caching, 'data': data}):
+                needs('projects')(lambda: None)()
+
+            # The workspaces written before the projects were downloaded were
+            # committed, so the other connection could write in between.
+            self.assertEqual(1, downloader.written)
+            self.assertEqual([1], [project.identifier for project in data['projects']])
+            self.assertEqual({1, 2}, {workspace.identifier for workspace in caching.retrieve_workspace_cache()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import json
+import unittest
+
+import requests
+from datetime import datetime
+from unittest import mock
+from tzlocal import get_localzone
+
+from togglcmder.toggl.commands import Commands, DeleteResult
+from togglcmder.toggl.types.time_entry import TimeEntry
+
+
+class StubReply(object):
+    def __init__(self, text: str, status_code: int = 200):
+        self.text = text
+        self.status_code = status_code
+        self.request = self
+
+    body = None
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(self.status_code)
+
+
+class StubTransport(object):
+    # Echoes bulk updates back the way the server does and records each request.
+    def __init__(self):
+        self.requests = []
+        self.deletes = []
+        self.failing = set()
+
+    def delete(self, url: str) -> StubReply:
+        identifiers = [int(identifier) for identifier in url.rsplit('/', 1)[1].split(',')]
+        self.deletes.append(identifiers)
+        return StubReply('', 500 if self.failing.intersection(identifiers) else 200)
+
+    def put(self, url: str, data: str) -> StubReply:
+        self.requests.append((url, json.loads(data)['time_entry']))
+        identifiers = [int(identifier) for identifier in url.rsplit('/', 1)[1].split(',')]
+        if self.failing.intersection(identifiers):
+            return StubReply('', 500)
+        return StubReply(json.dumps({'data': [
+            {'id': identifier, 'wid': 1, 'start': '2020-01-01T00:00:00+00:00', 'duration': 60,
+             'tags': ['Tag'], 'at': '2020-01-01T00:01:00+00:00'}
+            for identifier in identifiers
+        ]}))
+
+
+class TestCommands(unittest.TestCase):
+    def setUp(self) -> None:
+        self.__transport = StubTransport()
+        self.__commands = Commands(self.__transport)
+        self.__time_entries = [
+            TimeEntry(description='Entry', workspace_identifier=1, identifier=identifier,
+                      start_time=get_localzone().localize(datetime.now()))
+            for identifier in range(1000, 1300)
+        ]
+
+    def test_bulk_update(self):
+        updated = self.__commands.update_time_entries(
+            self.__time_entries, description='Renamed', add_tags=['Tag']).updated
+
+        # 300 entries fit in a single request.
+        self.assertEqual(1, len(self.__transport.requests))
+        self.assertEqual({'description': 'Renamed', 'tags': ['Tag'], 'tag_action': 'add'},
+                         self.__transport.requests[0][1])
+        self.assertEqual([entry.identifier for entry in self.__time_entries],
+                         [entry.identifier for entry in updated])
+
+    def test_tag_actions(self):
+        self.__commands.update_time_entries(
+            self.__time_entries[:2], description='Renamed', add_tags=['One'], remove_tags=['Two'])
+        self.assertEqual([{'description': 'Renamed', 'tags': ['One'], 'tag_action': 'add'},
+                          {'tags': ['Two'], 'tag_action': 'remove'}],
+                         [change for _, change in self.__transport.requests])
+
+    def test_identifiers_chunked(self):
+        with mock.patch.object(Commands, 'URL_LIMIT', 100):
+            updated = self.__commands.update_time_entries(self.__time_entries, remove_tags=['Tag']).updated
+
+        self.assertLess(1, len(self.__transport.requests))
+        self.assertTrue(all(len(url) <= 100 for url, _ in self.__transport.requests))
+        self.assertEqual(300, len(updated))
+
+    def test_bulk_update_partly_failed(self):
+        self.__transport.failing = {1150}
+
+        with mock.patch.object(Commands, 'URL_LIMIT', 200):
+            result = self.__commands.update_time_entries(
+                self.__time_entries, add_tags=['One'], remove_tags=['Two'])
+
+        # The other chunks are still applied and returned; the failed one is
+        # reported, and not sent again for the second tag action.
+        failed_chunk = next(url for url, _ in self.__transport.requests if '1150' in url)
+        failed_chunk = [int(identifier) for identifier in failed_chunk.rsplit('/', 1)[1].split(',')]
+        self.assertEqual(failed_chunk, result.failed)
+        self.assertEqual([entry.identifier for entry in self.__time_entries
+                          if entry.identifier not in failed_chunk],
+                         [entry.identifier for entry in result.updated])
+        self.assertEqual(1, len([url for url, _ in self.__transport.requests if '1150' in url]))
+
+    def test_bulk_delete(self):
+        identifiers = [entry.identifier for entry in self.__time_entries]
+        self.__transport.failing = {1150}
+
+        with mock.patch.object(Commands, 'URL_LIMIT', 200):
+            result = self.__commands.delete_time_entries(identifiers)
+
+            # Only the chunk that failed is reported, and only it is sent again.
+            failed_chunk = next(chunk for chunk in self.__transport.deletes if 1150 in chunk)
+            self.assertEqual(DeleteResult(deleted=[identifier for identifier in identifiers
+                                                   if identifier not in failed_chunk],
+                                          failed=failed_chunk), result)
+
+            self.__transport.failing = set()
+            del self.__transport.deletes[:]
+            self.assertEqual(DeleteResult(deleted=failed_chunk, failed=[]),
+                             self.__commands.delete_time_entries(result.failed))
+            self.assertEqual([failed_chunk], self.__transport.deletes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+import click
+from twisted.internet.defer import succeed
+from twisted.internet.testing import StringTransport
+
+from togglcmder.toggl.daemon.client import DaemonError, Reply, \
+    decode_netstring, encode_netstring, send
+from togglcmder.toggl.daemon.server import Daemon
+
+
+@click.command()
+@click.argument('name')
+@click.pass_context
+def greet(context: click.Context, name: str):
+    # Counts its runs in the warm state, which only the daemon keeps around.
+    warm = context.obj['warm']
+    warm['runs'] = warm.get('runs', 0) + 1
+    greeting = os.environ.get('TOGGL_GREETING', 'Hello')
+    click.echo(f"{greeting} {name} ({warm['runs']})")
+    if name == 'nobody':
+        context.exit(3)
+
+
+class SynchronousDaemon(Daemon):
+    # Runs commands right away instead of on the worker thread.
+    def run(self, request: dict):
+        return succeed(self.execute(request))
+
+
+class TestDaemon(unittest.TestCase):
+    def test_netstrings(self):
+        self.assertEqual(b'5:hello,', encode_netstring(b'hello'))
+        self.assertEqual(b'hello', decode_netstring(b'5:hello,'))
+        self.assertEqual(b'', decode_netstring(encode_netstring(b'')))
+        with self.assertRaises(DaemonError):
+            decode_netstring(b'5:hell,')
+        with self.assertRaises(DaemonError):
+            decode_netstring(b'')
+
+    def test_execute_keeps_warm_state(self):
+        daemon = SynchronousDaemon(greet)
+        self.assertEqual({'exit_code': 0, 'output': 'Hello you (1)\n'},
+                         daemon.execute({'args': ['you'], 'env': {}}))
+        self.assertEqual({'exit_code': 0, 'output': 'Hi you (2)\n'},
+                         daemon.execute({'args': ['you'], 'env': {'TOGGL_GREETING': 'Hi'}}))
+        self.assertEqual(3, daemon.execute({'args': ['nobody'], 'env': {}})['exit_code'])
+        self.assertEqual(2, daemon.execute({'args': [], 'env': {}})['exit_code'])
+
+    def test_protocol(self):
+        protocol = SynchronousDaemon(greet).buildProtocol(None)
+        transport = StringTransport()
+        protocol.makeConnection(transport)
+
+        protocol.dataReceived(encode_netstring(json.dumps({'args': ['you'], 'env': {}}).encode()))
+        self.assertEqual({'exit_code': 0, 'output': 'Hello you (1)\n'},
+                         json.loads(decode_netstring(transport.value())))
+        self.assertTrue(transport.disconnecting)
+
+    def test_protocol_malformed(self):
+        protocol = SynchronousDaemon(greet).buildProtocol(None)
+        transport = StringTransport()
+        protocol.makeConnection(transport)
+
+        protocol.dataReceived(encode_netstring(b'{"env": {}}'))
+        self.assertEqual(1, json.loads(decode_netstring(transport.value()))['exit_code'])
+
+    def test_send_without_daemon(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertIsNone(send(os.path.join(directory, 'daemon.sock'), ['timers', 'list'], {}))
+
+            # A socket left behind by a daemon that is gone.
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(os.path.join(directory, 'daemon.sock'))
+            stale.close()
+            self.assertIsNone(send(os.path.join(directory, 'daemon.sock'), ['timers', 'list'], {}))
+
+    def test_send(self):
+        daemon = SynchronousDaemon(greet)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'daemon.sock')
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(path)
+            server.listen(1)
+
+            def serve_once():
+                # Plays the daemon's part of a single exchange.
+                connection, _ = server.accept()
+                data = b''
+                while not data.endswith(b','):
+                    data += connection.recv(4096)
+                reply = daemon.execute(json.loads(decode_netstring(data)))
+                connection.sendall(encode_netstring(json.dumps(reply).encode()))
+                connection.close()
+
+            thread = threading.Thread(target=serve_once)
+            thread.start()
+            try:
+                self.assertEqual(Reply(exit_code=0, output='Hey you (1)\n'),
+                                 send(path, ['you'], {'TOGGL_GREETING': 'Hey'}))
+            finally:
+                thread.join()
+                server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import json
+import unittest
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from tzlocal import get_localzone
+
+from togglcmder.toggl.downloader import Downloader
+
+
+class StubReply(object):
+    def __init__(self, text: str):
+        self.text = text
+        self.request = self
+
+    body = None
+
+    def raise_for_status(self):
+        pass
+
+
+class StubTransport(object):
+    # Hands back the same time entry for every request and records the URLs.
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url: str) -> StubReply:
+        self.urls.append(url)
+        return StubReply('{"data": [{"id": 1, "wid": 1, "description": "Entry", "duration": 60, '
+                         '"start": "2020-01-01T00:00:00+00:00", "stop": "2020-01-01T00:01:00+00:00", '
+                         '"at": "2020-01-01T00:01:00+00:00"}]}')
+
+
+class WindowTransport(object):
+    # Serves one time entry every six hours within the requested window,
+    # edges included, cut short at the downloader's limit like the server.
+    def __init__(self):
+        self.windows = []
+
+    def get(self, url: str) -> StubReply:
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+        start = datetime.fromisoformat(query['start_date'][0])
+        end = datetime.fromisoformat(query['end_date'][0])
+        self.windows.append((start, end))
+
+        entries = []
+        hour = -(-int(start.timestamp()) // 21600) * 21600
+        while hour <= end.timestamp() and len(entries) < Downloader.TIME_ENTRY_LIMIT:
+            moment = datetime.fromtimestamp(hour, tz=timezone.utc).isoformat()
+            entries.append({'id': hour // 3600, 'wid': 1, 'description': 'Entry', 'duration': 60,
+                            'start': moment, 'stop': moment, 'at': moment})
+            hour += 21600
+        return StubReply(json.dumps({'data': entries}))
+
+
+class TestDownloader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.__transport = StubTransport()
+        self.__downloader = Downloader(self.__transport)
+
+    def test_time_entry_windows_coalesced(self):
+        stop = get_localzone().localize(datetime.now())
+        start = stop - timedelta(days=5)
+
+        for _ in range(3):
+            self.assertEqual([1], [entry.identifier for entry in
+                                   self.__downloader.download_time_entries(start, stop)])
+        self.assertEqual(1, self.__downloader.requests_made)
+
+        # A different window is a different request.
+        self.__downloader.download_time_entries(start - timedelta(days=1), stop)
+        self.__downloader.download_time_entry_changes(start, stop)
+        self.assertEqual(2, self.__downloader.requests_made)
+        self.assertEqual(2, len(self.__transport.urls))
+
+    def test_time_entry_windows_chunked(self):
+        transport = WindowTransport()
+        downloader = Downloader(transport, window='week')
+        stop = datetime(2020, 3, 1, tzinfo=timezone.utc)
+        start = stop - timedelta(days=30)
+
+        time_entries = downloader.download_time_entries(start, stop)
+        self.assertEqual(5, len(transport.windows))
+        self.assertEqual(30 * 4 + 1, len(time_entries))
+        self.assertEqual(len(time_entries), len({entry.identifier for entry in time_entries}))
+        self.assertEqual(sorted(time_entries, key=lambda entry: entry.start_time), time_entries)
+
+    def test_time_entry_changes_not_chunked(self):
+        transport = WindowTransport()
+        downloader = Downloader(transport, window='week')
+        stop = datetime(2020, 3, 1, tzinfo=timezone.utc)
+        start = stop - timedelta(days=30)
+
+        downloader.download_time_entry_changes(start, stop, stop - timedelta(days=1))
+        self.assertEqual([(start, stop)], transport.windows)
+
+        # A full reply is still split.
+        transport.windows.clear()
+        with mock.patch.object(Downloader, 'TIME_ENTRY_LIMIT', 10):
+            time_entries = downloader.download_time_entry_changes(start, stop, stop - timedelta(days=2)).changed
+        self.assertLess(1, len(transport.windows))
+        self.assertEqual(30 * 4 + 1, len(time_entries))
+
+    def test_full_time_entry_windows_split(self):
+        transport = WindowTransport()
+        downloader = Downloader(transport, window='month')
+        stop = datetime(2020, 3, 1, tzinfo=timezone.utc)
+        start = stop - timedelta(days=8)
+
+        with mock.patch.object(Downloader, 'TIME_ENTRY_LIMIT', 10):
+            time_entries = downloader.download_time_entries(start, stop)
+        self.assertLess(1, len(transport.windows))
+        self.assertEqual(8 * 4 + 1, len(time_entries))
+
+
+if __name__ == '__main__':
+    unittest.main()
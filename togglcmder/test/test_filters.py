@@ -1,3 +1,4 @@
+import logging
 import unittest
 from datetime import datetime
 
@@ -5,6 +6,7 @@ from togglcmder.toggl.filters.time_entries import TimeEntries
 from togglcmder.toggl.filters.tags import Tags
 from togglcmder.toggl.filters.workspaces import Workspaces
 from togglcmder.toggl.filters.projects import Projects
+from togglcmder.toggl.filters.diagnostics import TRACE_LOGGER, summarize
 
 from togglcmder.toggl.types.project import Project
 from togglcmder.toggl.types.workspace import Workspace
@@ -137,5 +139,32 @@ class TestFilters(unittest.TestCase):
                          ))
 
 
+    def test_summary(self) -> None:
+        self.assertEqual("3 item(s) [1, 2, 3]", str(summarize([1, 2, 3])))
+        self.assertEqual("25 item(s) [0, 2, 4, 6, 8, 10, 12, 14, 16, 18] and 15 more",
+                         str(summarize(list(range(25)), lambda item: item * 2)))
+
+    def test_summary_is_lazy(self) -> None:
+        summarized = []
+        logging.getLogger('togglcmder.toggl.filters.tags').debug(
+            'unused = %s', summarize([TestFilters.TAG_ONE], lambda tag: summarized.append(tag)))
+        self.assertEqual([], summarized)
+
+    def test_trace(self) -> None:
+        with self.assertLogs(TRACE_LOGGER, level=logging.DEBUG) as logs:
+            TimeEntries.filter_on_any_tags(
+                [TestFilters.TIME_ENTRY_ONE, TestFilters.TIME_ENTRY_TWO],
+                [TestFilters.TAG_THREE])
+        self.assertRegex(logs.output[-1],
+                         r'TimeEntries\.filter_on_any_tags\(\[Test Tag Three,3,1\]\): 2 -> 1 in [\d.]+ms$')
+
+    def test_trace_shortens_criteria(self) -> None:
+        with self.assertLogs(TRACE_LOGGER, level=logging.DEBUG) as logs:
+            TimeEntries.filter_on_description(
+                [TestFilters.TIME_ENTRY_ONE, TestFilters.TIME_ENTRY_TWO],
+                'x' * 100)
+        self.assertRegex(logs.output[-1], r"filter_on_description\('x{17}\.\.\.x{18}'\): 2 -> 0 in")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,198 @@
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from togglcmder.toggl.caching import Caching
+from togglcmder.toggl.cli.helpers import prefetch_if_needed, sync_if_needed
+from togglcmder.toggl.freshness import Freshness, FreshnessPolicy, Revalidator
+from togglcmder.toggl.synchronizer import Synchronizer
+from togglcmder.toggl.types.workspace import Workspace
+
+
+class RecordingSynchronizer(Synchronizer):
+    # Records what it was asked to sync, and on which thread, instead of syncing.
+    def __init__(self, caching: Caching):
+        super(RecordingSynchronizer, self).__init__(caching, None)
+        self.synced = []
+        self.threads = set()
+        self.offline = False
+
+    def sync_workspaces(self) -> int:
+        self.synced.append(('workspaces',))
+        self.threads.add(threading.current_thread())
+        if self.offline:
+            raise RequestsConnectionError('offline')
+        return 0
+
+    def sync_time_entries(self, start: datetime, stop: datetime) -> int:
+        self.synced.append(('time_entries', start, stop))
+        self.threads.add(threading.current_thread())
+        return 0
+
+    def prefetch(self, workspaces, *, projects: bool = True, tags: bool = True) -> None:
+        self.synced.append(('prefetch', [workspace.identifier for workspace in workspaces], projects, tags))
+
+
+class RecordingRevalidator(object):
+    def __init__(self):
+        self.requested = []
+
+    def request(self, resource: str, *args, key: tuple = ()) -> None:
+        self.requested.append((resource,) + args)
+
+
+class TestFreshness(unittest.TestCase):
+    NOW = datetime(2020, 6, 1, 12, tzinfo=timezone.utc)
+
+    def test_policy(self):
+        policy = FreshnessPolicy({'projects': {'ttl': 60}})
+        now = TestFreshness.NOW
+
+        self.assertEqual(Freshness.EXPIRED, policy.freshness('projects', None, now))
+        self.assertEqual(Freshness.FRESH, policy.freshness('projects', now - timedelta(seconds=60), now))
+        self.assertEqual(Freshness.STALE, policy.freshness('projects', now - timedelta(seconds=61), now))
+        # The grace period not overridden is kept.
+        self.assertEqual(Freshness.STALE, policy.freshness('projects', now - timedelta(days=7), now))
+        self.assertEqual(Freshness.EXPIRED, policy.freshness('projects', now - timedelta(days=8), now))
+
+        self.assertEqual(Freshness.FRESH, policy.freshness('workspaces', now - timedelta(hours=1), now))
+
+    def test_revalidator(self):
+        synchronizers = []
+        caches = []
+
+        def synchronizer(caching: Caching) -> Synchronizer:
+            synchronizers.append(RecordingSynchronizer(caching))
+            return synchronizers[-1]
+
+        def caching() -> Caching:
+            caches.append(threading.current_thread())
+            return Caching(cache_name=':memory:')
+
+        revalidator = Revalidator(synchronizer, caching)
+        revalidator.join()
+        self.assertEqual([], synchronizers)
+
+        revalidator.request('workspaces')
+        revalidator.request('workspaces')
+        revalidator.request('time_entries', TestFreshness.NOW, TestFreshness.NOW)
+        revalidator.join()
+
+        # Synced once each, on one background thread with a cache of its own.
+        self.assertEqual(1, len(synchronizers))
+        self.assertEqual([('workspaces',), ('time_entries', TestFreshness.NOW, TestFreshness.NOW)],
+                         synchronizers[0].synced)
+        self.assertEqual(synchronizers[0].threads, set(caches))
+        self.assertNotIn(threading.current_thread(), caches)
+
+    def test_sync_if_needed(self):
+        caching = Caching(cache_name=':memory:')
+        synchronizer = RecordingSynchronizer(caching)
+        revalidator = RecordingRevalidator()
+        context = {
+            'cache': caching,
+            'synchronizer': synchronizer,
+            'sync': False,
+            'freshness': FreshnessPolicy({'workspaces': {'ttl': 60, 'grace': 60},
+                                          'time_entries': {'ttl': 60, 'grace': 60}}),
+            'revalidator': revalidator
+        }
+
+        # Never synced, so it has to be now.
+        sync_if_needed(context, 'workspaces')
+        self.assertEqual([('workspaces',)], synchronizer.synced)
+
+        # Just synced, so served as is.
+        caching.update_sync_state('workspaces')
+        sync_if_needed(context, 'workspaces')
+        self.assertEqual(1, len(synchronizer.synced))
+        self.assertEqual([], revalidator.requested)
+
+        # Unless the sync is forced.
+        context['sync'] = True
+        sync_if_needed(context, 'workspaces')
+        self.assertEqual(2, len(synchronizer.synced))
+
+        # Time entries from before what the cache covers have to be synced.
+        context['sync'] = False
+        stop = datetime.now(tz=timezone.utc)
+        caching.update_sync_state('time_entries', coverage_start=stop - timedelta(days=1))
+        sync_if_needed(context, 'time_entries', stop - timedelta(hours=1), stop, since=stop - timedelta(hours=1))
+        self.assertEqual(2, len(synchronizer.synced))
+        sync_if_needed(context, 'time_entries', stop - timedelta(days=2), stop, since=stop - timedelta(days=2))
+        self.assertEqual(3, len(synchronizer.synced))
+
+    def test_sync_if_needed_offline(self):
+        caching = Caching(cache_name=':memory:')
+        synchronizer = RecordingSynchronizer(caching)
+        synchronizer.offline = True
+        context = {
+            'cache': caching,
+            'synchronizer': synchronizer,
+            'sync': False,
+            'freshness': FreshnessPolicy(),
+            'revalidator': RecordingRevalidator()
+        }
+
+        # An expired cache that can't be synced is still served...
+        sync_if_needed(context, 'workspaces')
+        self.assertEqual([('workspaces',)], synchronizer.synced)
+
+        # ...but a forced sync fails as it always has.
+        context['sync'] = True
+        with self.assertRaises(RequestsConnectionError):
+            sync_if_needed(context, 'workspaces')
+
+    def test_sync_if_needed_stale(self):
+        caching = Caching(cache_name=':memory:')
+        synchronizer = RecordingSynchronizer(caching)
+        revalidator = RecordingRevalidator()
+        context = {
+            'cache': caching,
+            'synchronizer': synchronizer,
+            'sync': False,
+            # Anything synced is immediately stale, and stays so for a day.
+            'freshness': FreshnessPolicy({'workspaces': {'ttl': -1, 'grace': 86400}}),
+            'revalidator': revalidator
+        }
+        caching.update_sync_state('workspaces')
+
+        sync_if_needed(context, 'workspaces')
+        self.assertEqual([], synchronizer.synced)
+        self.assertEqual([('workspaces',)], revalidator.requested)
+
+    def test_prefetch_if_needed(self):
+        caching = Caching(cache_name=':memory:')
+        synchronizer = RecordingSynchronizer(caching)
+        context = {
+            'cache': caching,
+            'synchronizer': synchronizer,
+            'sync': False,
+            # Anything synced is immediately stale, and stays so for a day.
+            'freshness': FreshnessPolicy({'projects': {'ttl': -1, 'grace': 86400}}),
+            'revalidator': RecordingRevalidator()
+        }
+        workspaces = [Workspace(name=f'Workspace {identifier}', identifier=identifier) for identifier in range(1, 4)]
+
+        # Only the workspace that was never synced has expired; the stale
+        # ones are left to the revalidator.
+        caching.update_sync_state('projects', 1)
+        caching.update_sync_state('projects', 2)
+        prefetch_if_needed(context, 'projects', workspaces)
+        self.assertEqual([('prefetch', [3], True, False)], synchronizer.synced)
+
+        # With nothing expired nothing is prefetched...
+        caching.update_sync_state('projects', 3)
+        prefetch_if_needed(context, 'projects', workspaces)
+        self.assertEqual(1, len(synchronizer.synced))
+
+        # ...unless the sync is forced.
+        context['sync'] = True
+        prefetch_if_needed(context, 'tags', workspaces)
+        self.assertEqual(('prefetch', [1, 2, 3], False, True), synchronizer.synced[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
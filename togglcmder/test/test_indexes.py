@@ -0,0 +1,87 @@
+import itertools
+import random
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from togglcmder.toggl.indexes.time_entries import TimeEntryIndex
+from togglcmder.toggl.types.project import Project
+from togglcmder.toggl.types.tag import Tag
+from togglcmder.toggl.types.time_entry import TimeEntry
+from togglcmder.toggl.types.workspace import Workspace
+
+
+class TestIndexes(unittest.TestCase):
+    START = datetime(2020, 6, 1, tzinfo=timezone.utc)
+
+    WORKSPACES = [Workspace(name=f'Workspace {index}', identifier=index) for index in range(1, 4)]
+    PROJECTS = [Project(name=f'Project {index}', identifier=index, workspace_identifier=index % 3 + 1)
+                for index in range(1, 7)]
+    TAGS = [Tag(name=f'Tag {index}', identifier=index, workspace_identifier=1) for index in range(1, 5)]
+
+    @staticmethod
+    def __time_entries(count: int):
+        generator = random.Random(1)
+        time_entries = []
+        for index in range(count):
+            project = generator.choice(TestIndexes.PROJECTS + [None])
+            # Shuffled start times, some of them shared.
+            start = TestIndexes.START + timedelta(hours=generator.randrange(count // 2))
+            time_entries.append(TimeEntry(
+                identifier=index,
+                description=f'Task {generator.randrange(10)}',
+                start_time=start,
+                stop_time=start + timedelta(minutes=30),
+                duration=1800,
+                project_identifier=project.identifier if project else None,
+                workspace_identifier=project.workspace_identifier if project else generator.randrange(1, 4),
+                tags=[tag.name for tag in TestIndexes.TAGS if generator.random() < 0.3],
+                last_updated=start))
+        return time_entries
+
+    def test_matches_scan(self):
+        time_entries = TestIndexes.__time_entries(500)
+        index = TimeEntryIndex(time_entries)
+
+        def scan(workspace=None, project=None, all_tags=None, any_tags=None, start=None, end=None):
+            return [entry for entry in time_entries
+                    if (not workspace or entry.workspace_identifier == workspace.identifier)
+                    and (not project or entry.project_identifier == project.identifier)
+                    and (not all_tags or {tag.name for tag in all_tags}.issubset(entry.tags))
+                    and (not any_tags or not {tag.name for tag in any_tags}.isdisjoint(entry.tags))
+                    and (not start or start < entry.start_time)
+                    and (not end or entry.start_time < end)]
+
+        # A shared start time, so the ends of the range have to be exclusive.
+        start = time_entries[0].start_time
+        end = start + timedelta(hours=40)
+        for workspace, project, all_tags, any_tags, window in itertools.product(
+                [None, TestIndexes.WORKSPACES[0]],
+                [None, TestIndexes.PROJECTS[2], TestIndexes.PROJECTS[1]],
+                [None, TestIndexes.TAGS[:2]],
+                [None, TestIndexes.TAGS[2:]],
+                [(None, None), (start, None), (None, end), (start, end), (end, start)]):
+            criteria = dict(workspace=workspace, project=project, all_tags=all_tags, any_tags=any_tags,
+                            start=window[0], end=window[1])
+            self.assertEqual(scan(**criteria), index.query(**criteria), criteria)
+
+    def test_description(self):
+        time_entries = TestIndexes.__time_entries(100)
+        index = TimeEntryIndex(time_entries)
+
+        self.assertEqual([entry for entry in time_entries if entry.description in ('Task 1', 'Task 2')],
+                         index.query(description='task [12]'))
+        self.assertEqual([entry for entry in time_entries
+                          if entry.description == 'Task 3' and 'Tag 1' in entry.tags],
+                         index.query(description='Task 3', any_tags=[TestIndexes.TAGS[0]]))
+        self.assertEqual([], index.query(description='Task'))
+
+    def test_unknown_keys(self):
+        index = TimeEntryIndex(TestIndexes.__time_entries(100))
+
+        self.assertEqual([], index.query(workspace=Workspace(name='Other', identifier=99)))
+        self.assertEqual([], index.query(all_tags=[TestIndexes.TAGS[0], Tag(name='Other', workspace_identifier=1)]))
+        self.assertEqual(100, len(index.query()))
+
+
+if __name__ == '__main__':
+    unittest.main()
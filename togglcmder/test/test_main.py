@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from typing import Dict
+
+from click.testing import CliRunner
+
+from togglcmder.__main__ import main
+
+
+def import_times(module: str) -> Dict[str, int]:
+    # Cumulative import time, in microseconds, of every module imported by a
+    # fresh interpreter importing the given module.
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestMain(unittest.TestCase):
+    # Nothing the commands need to do their work should be imported just to
+    # parse the command line.
+    DEFERRED_MODULES = (
+        'requests',
+        'tabulate',
+        'tzlocal',
+        'pytz',
+        'sqlite3',
+        'twisted',
+        'togglcmder.toggl.cli.workspaces',
+        'togglcmder.toggl.cli.projects',
+        'togglcmder.toggl.cli.tags',
+        'togglcmder.toggl.cli.time_entries',
+        'togglcmder.toggl.cli.daemon'
+    )
+
+    # What importing the entry point may cost on top of importing click, in
+    # microseconds. It is around 10ms now; importing the commands eagerly
+    # again costs well over 100ms.
+    IMPORT_BUDGET = 40000
+
+    def test_cold_start(self):
+        # The best of a few runs keeps a busy machine from failing the test.
+        overheads = []
+        for _ in range(3):
+            times = import_times('togglcmder.__main__')
+            for module in TestMain.DEFERRED_MODULES:
+                self.assertNotIn(module, times)
+            overheads.append(times['togglcmder.__main__'] - times['click'])
+
+        self.assertLess(min(overheads), TestMain.IMPORT_BUDGET)
+
+    def test_help_does_not_load_commands(self):
+        process = subprocess.run([sys.executable, '-c',
+                                  'import sys\n'
+                                  'from togglcmder.__main__ import main\n'
+                                  'try:\n'
+                                  '    main(["--help"])\n'
+                                  'except SystemExit:\n'
+                                  '    pass\n'
+                                  'print(*sorted(sys.modules), file=sys.stderr)'],
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                 universal_newlines=True, check=True)
+        self.assertIn('timers', process.stdout)
+        self.assertIn('Add, update, delete, start, stop, and list timers.', process.stdout)
+
+        modules = process.stderr.split()
+        for module in TestMain.DEFERRED_MODULES:
+            self.assertNotIn(module, modules)
+
+    def tearDown(self) -> None:
+        # Every invocation of main logs to a file in its app directory.
+        logger = logging.getLogger()
+        for handler in logger.handlers[:]:
+            if isinstance(handler, logging.FileHandler):
+                logger.removeHandler(handler)
+                handler.close()
+
+    def test_config_written_only_when_changed(self):
+        with tempfile.TemporaryDirectory() as home:
+            runner = CliRunner(env={'XDG_CONFIG_HOME': home})
+
+            result = runner.invoke(main, ['--api-key', 'key'])
+            self.assertEqual(0, result.exit_code, result.output)
+
+            config = os.path.join(home, 'togglcmder', 'toggl.json')
+            with open(config) as handle:
+                self.assertEqual('key', json.load(handle)['api_key'])
+
+            # Nothing changed, so the file is left alone.
+            os.utime(config, (0, 0))
+            result = runner.invoke(main, ['--api-key', 'key'])
+            self.assertEqual(0, result.exit_code, result.output)
+            self.assertEqual(0, os.stat(config).st_mtime)
+
+            result = runner.invoke(main, ['--api-key', 'key', '--default-project', 'Project'])
+            self.assertEqual(0, result.exit_code, result.output)
+            self.assertNotEqual(0, os.stat(config).st_mtime)
+            with open(config) as handle:
+                self.assertEqual('Project', json.load(handle)['default_project'])
+
+
+if __name__ == '__main__':
+    unittest.main()
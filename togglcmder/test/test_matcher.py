@@ -0,0 +1,46 @@
+import itertools
+import re
+import unittest
+
+from togglcmder.toggl.indexes.names import NameIndex
+from togglcmder.toggl.matcher import Matcher
+
+
+class TestMatcher(unittest.TestCase):
+    NAMES = ['Python', 'python work', 'PYTHON WORK', 'Pythonic', 'Reading', 'reading list', '', None,
+             'C++ (review)', 'a.b', 'axb', 'Py']
+
+    PATTERNS = ['python', 'PYTHON WORK', 'python.*', 'Py.*', '.*', 'reading list.*', 'Nothing', 'Nothing.*',
+                r'python\s.*', '^Python$', 'Py(thon)?', r'C\+\+ \(review\)', 'a.b', 'a\\.b', '']
+
+    def test_kinds(self):
+        self.assertEqual(Matcher.LITERAL, Matcher.compile('Python Work').kind)
+        self.assertEqual('python work', Matcher.compile('Python Work').text)
+        self.assertEqual(Matcher.PREFIX, Matcher.compile('Python.*').kind)
+        self.assertEqual('python', Matcher.compile('Python.*').text)
+        for pattern in ('Py(thon)?', 'a.b', r'python\s.*', '.*x', '^Python$'):
+            self.assertEqual(Matcher.REGEX, Matcher.compile(pattern).kind, pattern)
+
+    def test_compiled_once(self):
+        self.assertIs(Matcher.compile('Compiled Once'), Matcher.compile('Compiled Once'))
+        self.assertIsNot(Matcher.compile('Compiled Once'), Matcher.compile('compiled once'))
+
+    def test_matches_regex(self):
+        for pattern, name in itertools.product(TestMatcher.PATTERNS, TestMatcher.NAMES):
+            self.assertEqual(re.match("^{}$".format(pattern), name or "", re.IGNORECASE) is not None,
+                             Matcher.compile(pattern).matches(name), (pattern, name))
+
+    def test_name_index(self):
+        index = NameIndex(TestMatcher.NAMES)
+        for pattern in TestMatcher.PATTERNS:
+            matcher = Matcher.compile(pattern)
+            expected = [position for position, name in enumerate(TestMatcher.NAMES) if matcher.matches(name)]
+            self.assertEqual(expected, index.lookup(matcher), pattern)
+            if matcher.kind != Matcher.REGEX:
+                self.assertEqual(len(expected), index.count(matcher), pattern)
+            else:
+                self.assertIsNone(index.count(matcher))
+
+
+if __name__ == '__main__':
+    unittest.main()
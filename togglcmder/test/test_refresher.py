@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from togglcmder.toggl.caching import Caching
+from togglcmder.toggl.refresher import Refresher
+from togglcmder.toggl.types.workspace import Workspace
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+class StubSynchronizer(object):
+    # Records what was synced and reports whatever changes it is told to.
+    def __init__(self, changes: dict = None, failing: tuple = ()):
+        self.changes = changes or {}
+        self.failing = failing
+        self.synced = []
+
+    def __sync(self, resource: str) -> int:
+        self.synced.append(resource)
+        if resource in self.failing:
+            raise ConnectionError(resource)
+        return self.changes.get(resource, 0)
+
+    def sync_workspaces(self) -> int:
+        return self.__sync('workspaces')
+
+    def prefetch(self, workspaces, *, projects: bool = True, tags: bool = True) -> None:
+        pass
+
+    def sync_projects(self, workspace: Workspace) -> int:
+        return self.__sync('projects')
+
+    def sync_tags(self, workspace: Workspace) -> int:
+        return self.__sync('tags')
+
+    def sync_time_entries(self, start: datetime, stop: datetime) -> int:
+        return self.__sync('time_entries')
+
+
+class TestRefresher(unittest.TestCase):
+    SETTINGS = {'workspaces': 100, 'projects': 10, 'tags': 10, 'time_entries': 5, 'max_backoff': 4}
+
+    def setUp(self) -> None:
+        self.__clock = FakeClock()
+        self.__caching = Caching(cache_name=':memory:')
+        self.__caching.update_workspace_cache([
+            Workspace(name='Test Workspace', identifier=1,
+                      last_updated=datetime(2020, 1, 1, tzinfo=timezone.utc))])
+        self.__stop = datetime.now(tz=timezone.utc)
+        self.__start = self.__stop - timedelta(days=5)
+
+    def __refresh(self, refresher: Refresher, synchronizer: StubSynchronizer, **kwargs):
+        return refresher.refresh(self.__caching, synchronizer, self.__start, self.__stop, **kwargs)
+
+    def test_intervals(self):
+        refresher = Refresher(settings=TestRefresher.SETTINGS, clock=self.__clock.time)
+        synchronizer = StubSynchronizer(changes={'time_entries': 1})
+
+        # Everything is due the first time, in dependency order.
+        self.assertEqual({'workspaces': 0, 'projects': 0, 'tags': 0, 'time_entries': 1},
+                         self.__refresh(refresher, synchronizer))
+        self.assertEqual(['workspaces', 'projects', 'tags', 'time_entries'], synchronizer.synced)
+        self.assertEqual(5, refresher.next_due())
+
+        self.__clock.now += 5
+        self.assertEqual(['time_entries'], refresher.due())
+        self.assertEqual({'time_entries': 1}, self.__refresh(refresher, StubSynchronizer(changes={'time_entries': 1})))
+
+        # Asking for a resource syncs it whether it is due or not.
+        self.assertEqual({'workspaces': 0}, self.__refresh(refresher, StubSynchronizer(), resources=['workspaces']))
+
+    def test_backoff(self):
+        refresher = Refresher(settings={**TestRefresher.SETTINGS, 'workspaces': 1000, 'projects': 1000,
+                                        'tags': 1000}, clock=self.__clock.time)
+        waits = []
+        for _ in range(4):
+            self.assertEqual(0, sum(self.__refresh(refresher, StubSynchronizer()).values()))
+            waits.append(refresher.next_due())
+            self.__clock.now += refresher.next_due()
+        # Doubles while nothing changes, up to max_backoff times the interval.
+        self.assertEqual([10, 20, 20, 20], waits)
+
+        self.__refresh(refresher, StubSynchronizer(changes={'time_entries': 3}), resources=['time_entries'])
+        self.assertEqual(5, refresher.next_due())
+
+    def test_failure(self):
+        refresher = Refresher(settings=TestRefresher.SETTINGS, clock=self.__clock.time)
+        synchronizer = StubSynchronizer(failing=('projects',))
+
+        # A failing resource is retried later and doesn't stop the others.
+        self.assertEqual({'workspaces': 0, 'projects': 0, 'tags': 0, 'time_entries': 0},
+                         self.__refresh(refresher, synchronizer))
+        self.assertEqual(['workspaces', 'projects', 'tags', 'time_entries'], synchronizer.synced)
+        self.assertEqual(['projects'], refresher.failed)
+
+    def test_one_refresh_at_a_time(self):
+        with tempfile.TemporaryDirectory() as directory:
+            lock_path = os.path.join(directory, 'sync.lock')
+            first = Refresher(lock_path=lock_path, settings=TestRefresher.SETTINGS, clock=self.__clock.time)
+            second = Refresher(lock_path=lock_path, settings=TestRefresher.SETTINGS, clock=self.__clock.time)
+
+            nested = []
+            synchronizer = StubSynchronizer()
+            sync_workspaces = synchronizer.sync_workspaces
+
+            def sync_while_another_process_tries() -> int:
+                nested.append(self.__refresh(second, StubSynchronizer()))
+                return sync_workspaces()
+            synchronizer.sync_workspaces = sync_while_another_process_tries
+
+            self.assertIsNotNone(self.__refresh(first, synchronizer, resources=['workspaces']))
+            self.assertEqual([None], nested)
+
+            # Once it is done, the other one gets its turn.
+            self.assertIsNotNone(self.__refresh(second, StubSynchronizer()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from togglcmder.toggl.scheduler import Scheduler, SchedulerStats
+
+
+class StubReply(object):
+    def __init__(self, status_code: int, headers: dict = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeClock(object):
+    # Time only moves when something sleeps.
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.__clock = FakeClock()
+
+    def __scheduler(self, **kwargs) -> Scheduler:
+        return Scheduler(clock=self.__clock.time, sleep=self.__clock.sleep, **kwargs)
+
+    def test_token_bucket(self):
+        scheduler = self.__scheduler(settings={'rate': 1.0, 'burst': 2})
+        for _ in range(4):
+            scheduler.acquire()
+
+        # The burst goes straight out, after that one request per second.
+        self.assertEqual([1.0, 1.0], self.__clock.sleeps)
+
+        self.__clock.now += 10
+        scheduler.acquire()
+        self.assertEqual([1.0, 1.0], self.__clock.sleeps)
+
+    def test_retry_after(self):
+        scheduler = self.__scheduler()
+        replies = [StubReply(429, {'Retry-After': '3'}), StubReply(200)]
+
+        self.assertEqual(200, scheduler.call(lambda: replies.pop(0)).status_code)
+        self.assertEqual([3.0], self.__clock.sleeps)
+        self.assertEqual(SchedulerStats(requests=2, retries=1, waited=3.0, backed_off=3.0), scheduler.stats)
+
+    def test_backoff(self):
+        scheduler = self.__scheduler(settings={'max_retries': 3, 'backoff_base': 1.0, 'backoff_cap': 3.0})
+
+        # Out of retries, the last reply is handed back for the caller to deal with.
+        self.assertEqual(429, scheduler.call(lambda: StubReply(429)).status_code)
+        self.assertEqual(4, scheduler.stats.requests)
+        self.assertEqual(3, scheduler.stats.retries)
+        self.assertLessEqual(scheduler.stats.backed_off, 1.0 + 2.0 + 3.0)
+
+    def test_shared_state(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rate_limit.lock')
+            first = self.__scheduler(state_path=path, settings={'burst': 1})
+            second = self.__scheduler(state_path=path, settings={'burst': 1})
+
+            # The second scheduler sees the token the first one took.
+            first.acquire()
+            second.acquire()
+            self.assertEqual([1.0], self.__clock.sleeps)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,248 @@
+import threading
+import unittest
+from datetime import datetime, timedelta
+from tzlocal import get_localzone
+
+from togglcmder.toggl.caching import Caching
+from togglcmder.toggl.downloader import Changes, Downloader
+from togglcmder.toggl.synchronizer import Synchronizer
+from togglcmder.toggl.builders.project_builder import ProjectBuilder
+from togglcmder.toggl.builders.workspace_builder import WorkspaceBuilder
+from togglcmder.toggl.builders.time_entry_builder import TimeEntryBuilder
+from togglcmder.toggl.types.workspace import Workspace
+from togglcmder.toggl.types.project import Project
+from togglcmder.toggl.types.time_entry import TimeEntry
+
+
+class StubDownloader(object):
+    # Serves whatever the test put in place and records the "since" it was asked for.
+    def __init__(self):
+        self.workspaces = Changes([], [])
+        self.projects = Changes([], [])
+        self.time_entries = Changes([], [])
+        self.calls = []
+        self.threads = set()
+
+    def download_workspace_changes(self, since=None):
+        self.calls.append(('workspaces', since))
+        return self.workspaces
+
+    def download_project_changes(self, workspace, since=None):
+        self.calls.append(('projects', since))
+        self.threads.add(threading.get_ident())
+        return Changes([project for project in self.projects.changed
+                        if project.workspace_identifier == workspace.identifier], self.projects.deleted)
+
+    def download_tags(self, workspace):
+        self.calls.append(('tags', None))
+        self.threads.add(threading.get_ident())
+        return []
+
+    def download_time_entry_changes(self, start, end, since=None):
+        self.calls.append(('time_entries', since))
+        return self.time_entries
+
+
+class ServerDownloader(object):
+    # Keeps time entries as the server would, and answers searches by start
+    # time and by when they were last updated.
+    def __init__(self):
+        self.time_entries = {}
+
+    def edit(self, *time_entries):
+        for time_entry in time_entries:
+            self.time_entries[time_entry.identifier] = time_entry
+
+    def download_time_entry_changes(self, start, end, since=None):
+        return Changes([time_entry for time_entry in self.time_entries.values()
+                        if start <= time_entry.start_time <= end
+                        and (since is None or time_entry.last_updated > since)], [])
+
+
+class EmptyReply(object):
+    text = '{"data": []}'
+    body = None
+
+    def __init__(self):
+        self.request = self
+
+    def raise_for_status(self):
+        pass
+
+
+class EmptyTransport(object):
+    # Answers every request with nothing and counts the requests.
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url: str) -> EmptyReply:
+        self.urls.append(url)
+        return EmptyReply()
+
+
+class TestSynchronizer(unittest.TestCase):
+    NOW = get_localzone().localize(datetime.now())
+
+    WORKSPACE = Workspace(
+        name='Test Workspace',
+        identifier=1,
+        last_updated=NOW - timedelta(days=1))
+
+    PROJECT = Project(
+        name='Test Project',
+        color=Project.Color.RED,
+        last_updated=NOW - timedelta(hours=2),
+        created=NOW - timedelta(days=1),
+        identifier=1,
+        workspace_identifier=1)
+
+    TIME_ENTRY = TimeEntry(
+        description='Test Entry',
+        start_time=NOW - timedelta(hours=1),
+        stop_time=NOW - timedelta(minutes=30),
+        duration=1800,
+        identifier=1,
+        workspace_identifier=1,
+        last_updated=NOW - timedelta(minutes=30))
+
+    def setUp(self) -> None:
+        self.__caching = Caching(cache_name=':memory:')
+        self.__downloader = StubDownloader()
+        self.__synchronizer = Synchronizer(self.__caching, self.__downloader)
+
+        self.__downloader.workspaces = Changes([TestSynchronizer.WORKSPACE], [])
+        self.__synchronizer.sync_workspaces()
+
+    def tearDown(self) -> None:
+        del self.__caching
+
+    def test_incremental_projects(self):
+        self.__downloader.projects = Changes([TestSynchronizer.PROJECT], [])
+        self.assertEqual(1, self.__synchronizer.sync_projects(TestSynchronizer.WORKSPACE))
+        self.assertEqual(('projects', None), self.__downloader.calls[-1])
+
+        # The next sync asks for changes since the newest project and writes nothing.
+        self.assertEqual(0, self.__synchronizer.sync_projects(TestSynchronizer.WORKSPACE))
+        self.assertEqual(('projects', TestSynchronizer.PROJECT.last_updated), self.__downloader.calls[-1])
+
+        renamed = ProjectBuilder(TestSynchronizer.PROJECT)\
+            .name('Renamed Project')\
+            .last_updated(epoch=TestSynchronizer.NOW.timestamp())\
+            .build()
+        self.__downloader.projects = Changes([renamed], [])
+        self.assertEqual(1, self.__synchronizer.sync_projects(TestSynchronizer.WORKSPACE))
+        self.assertEqual([renamed], self.__caching.retrieve_project_cache())
+
+        self.__downloader.projects = Changes([], [TestSynchronizer.PROJECT.identifier])
+        self.assertEqual(1, self.__synchronizer.sync_projects(TestSynchronizer.WORKSPACE))
+        self.assertIsNone(self.__caching.retrieve_project_cache())
+
+    def test_full_download_removes_missing(self):
+        other = ProjectBuilder(TestSynchronizer.PROJECT).identifier(2).build()
+        self.__caching.update_project_cache([TestSynchronizer.PROJECT, other])
+
+        self.__downloader.projects = Changes([TestSynchronizer.PROJECT], [])
+        self.assertEqual(1, self.__synchronizer.sync_projects(TestSynchronizer.WORKSPACE))
+        self.assertEqual([TestSynchronizer.PROJECT], self.__caching.retrieve_project_cache())
+
+    def test_incremental_time_entries(self):
+        start = TestSynchronizer.NOW - timedelta(days=5)
+        stop = TestSynchronizer.NOW
+
+        self.__downloader.time_entries = Changes([TestSynchronizer.TIME_ENTRY], [])
+        self.assertEqual(1, self.__synchronizer.sync_time_entries(start, stop))
+        self.assertEqual(('time_entries', None), self.__downloader.calls[-1])
+
+        # A narrower window within the covered range is kept current incrementally.
+        self.assertEqual(0, self.__synchronizer.sync_time_entries(start + timedelta(days=1), stop))
+        self.assertEqual(('time_entries', TestSynchronizer.TIME_ENTRY.last_updated), self.__downloader.calls[-1])
+
+        # Each invocation gets its own synchronizer.
+        self.__downloader.time_entries = Changes([], [TestSynchronizer.TIME_ENTRY.identifier])
+        self.assertEqual(1, Synchronizer(self.__caching, self.__downloader).sync_time_entries(start, stop))
+        self.assertEqual([], self.__caching.retrieve_time_entry_cache())
+
+        # A window older than the covered range needs a full download.
+        self.__synchronizer.sync_time_entries(start - timedelta(days=1), stop - timedelta(days=1))
+        self.assertEqual(('time_entries', None), self.__downloader.calls[-1])
+
+    def test_incremental_time_entry_requests(self):
+        start = TestSynchronizer.NOW - timedelta(days=5)
+        stop = TestSynchronizer.NOW
+        covered = TestSynchronizer.NOW - timedelta(days=365)
+        self.__caching.update_sync_state('time_entries',
+                                         high_water_mark=TestSynchronizer.NOW - timedelta(hours=1),
+                                         coverage_start=covered)
+
+        downloader = Downloader(EmptyTransport(), window='week')
+        self.assertEqual(0, Synchronizer(self.__caching, downloader).sync_time_entries(start, stop))
+
+        # Only the window asked for is downloaded, not the whole covered year,
+        # and only the window is covered from then on.
+        self.assertEqual(1, downloader.requests_made)
+        self.assertEqual(start.timestamp(),
+                         self.__caching.retrieve_sync_state('time_entries').coverage_start.timestamp())
+
+    def test_edits_before_incremental_window(self):
+        server = ServerDownloader()
+        old = TimeEntryBuilder(TestSynchronizer.TIME_ENTRY)\
+            .identifier(1).description('old')\
+            .start_time(dt=TestSynchronizer.NOW - timedelta(days=20)).build()
+        recent = TimeEntryBuilder(TestSynchronizer.TIME_ENTRY).identifier(2).description('recent').build()
+        server.edit(old, recent)
+
+        month = TestSynchronizer.NOW - timedelta(days=30)
+        week = TestSynchronizer.NOW - timedelta(days=5)
+        Synchronizer(self.__caching, server).sync_time_entries(month, TestSynchronizer.NOW)
+
+        server.edit(TimeEntryBuilder(old).description('old EDITED')
+                    .last_updated(epoch=TestSynchronizer.NOW.timestamp()).build(),
+                    TimeEntryBuilder(recent).description('recent EDITED')
+                    .last_updated(epoch=TestSynchronizer.NOW.timestamp()).build())
+        Synchronizer(self.__caching, server).sync_time_entries(week, TestSynchronizer.NOW)
+        self.assertEqual(week.timestamp(),
+                         self.__caching.retrieve_sync_state('time_entries').coverage_start.timestamp())
+
+        # The month is no longer covered, so it is downloaded in full and the
+        # edit made before the week shows up.
+        Synchronizer(self.__caching, server).sync_time_entries(month, TestSynchronizer.NOW)
+        self.assertEqual([(1, 'old EDITED'), (2, 'recent EDITED')],
+                         [(entry.identifier, entry.description)
+                          for entry in self.__caching.retrieve_time_entry_cache()])
+
+    def test_time_entry_windows_coalesced(self):
+        start = TestSynchronizer.NOW - timedelta(days=5)
+        stop = TestSynchronizer.NOW
+
+        self.__downloader.time_entries = Changes([TestSynchronizer.TIME_ENTRY], [])
+        for _ in range(3):
+            self.__synchronizer.sync_time_entries(start, stop)
+        self.__synchronizer.sync_time_entries(start - timedelta(days=1), stop - timedelta(days=1))
+
+        self.assertEqual(2, len([call for call in self.__downloader.calls if call[0] == 'time_entries']))
+
+    def test_prefetch(self):
+        workspaces = [WorkspaceBuilder(TestSynchronizer.WORKSPACE).identifier(identifier).build()
+                      for identifier in range(1, 4)]
+        projects = [ProjectBuilder(TestSynchronizer.PROJECT)
+                    .identifier(workspace.identifier)
+                    .workspace_identifier(workspace.identifier)
+                    .build() for workspace in workspaces]
+        self.__caching.update_workspace_cache(workspaces)
+        self.__downloader.projects = Changes(projects, [])
+        del self.__downloader.calls[:]
+
+        self.__synchronizer.prefetch(workspaces)
+        self.assertEqual(6, len(self.__downloader.calls))
+        self.assertNotIn(threading.get_ident(), self.__downloader.threads)
+
+        # The syncs use what was prefetched, and write from this thread.
+        for workspace in workspaces:
+            self.assertEqual(1, self.__synchronizer.sync_projects(workspace))
+            self.assertEqual(0, self.__synchronizer.sync_tags(workspace))
+        self.assertEqual(6, len(self.__downloader.calls))
+        self.assertEqual(projects, self.__caching.retrieve_project_cache())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import gzip
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from togglcmder.toggl.transport import Transport, TransportStats
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    attempts = 0
+
+    def do_GET(self):
+        if self.path == '/flaky':
+            # Fails the first time round so the retry policy kicks in.
+            KeepAliveHandler.attempts += 1
+            if KeepAliveHandler.attempts == 1:
+                self.send_response(503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        body = json.dumps({'encoding': self.headers.get('Accept-Encoding')}).encode()
+        if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTransport(unittest.TestCase):
+    def setUp(self) -> None:
+        KeepAliveHandler.attempts = 0
+        self.__server = HTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        self.__url = 'http://127.0.0.1:{}'.format(self.__server.server_port)
+        self.__transport = Transport('1234', settings={'backoff_factor': 0})
+
+    def tearDown(self) -> None:
+        self.__transport.close()
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def test_connections_reused(self):
+        for _ in range(3):
+            self.__transport.get(self.__url + '/').raise_for_status()
+        self.assertEqual(TransportStats(requests=3, opened=1, reused=2), self.__transport.stats)
+
+    def test_gzip_accepted(self):
+        reply = self.__transport.get(self.__url + '/')
+        self.assertIn('gzip', reply.json()['encoding'])
+
+    def test_retries(self):
+        reply = self.__transport.get(self.__url + '/flaky')
+        self.assertEqual(200, reply.status_code)
+        self.assertEqual(2, KeepAliveHandler.attempts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from togglcmder.toggl.types.workspace import Workspace
+from togglcmder.toggl.types.project import Project
+from togglcmder.toggl.types.time_entry import TimeEntry
+from togglcmder.toggl.builders.time_entry_builder import TimeEntryBuilder
+
+
+class Group(object):
+    # The running total of one (workspace, project, description) group.
+    __slots__ = ('entry', 'count', 'duration')
+
+    def __init__(self, entry: TimeEntry, duration: float):
+        self.entry = entry
+        self.count = 1
+        self.duration = duration
+
+
+class TimeEntries(object):
+
+    @staticmethod
+    def reduce_on_description(
+            time_entries: List[TimeEntry],
+            workspaces: List[Workspace],
+            projects: List[Project]
+    ) -> List[Tuple[TimeEntry, Optional[Project], Workspace]]:
+        """
+        Adds up the time entries of each workspace, project and description
+        into a single entry, in one pass over them. The entry kept for each
+        group is its most recently updated one, carrying the group's total
+        duration; a running entry counts for the time it has run so far.
+        Entries without a project are passed through as they are.
+
+        :param time_entries:
+        :param workspaces: the workspaces to report on, in order.
+        :param projects: the projects to report on, in order.
+        :return: the entries along with their project and workspace, grouped
+                 by workspace, then project, then description in the order
+                 each first appears.
+        """
+        # Running entries have a negative duration (minus their start epoch).
+        now = datetime.now(timezone.utc).replace(microsecond=0).timestamp()
+
+        groups: Dict[Tuple[int, int], Dict[str, Group]] = {}
+        without_project: Dict[int, List[TimeEntry]] = {}
+        for entry in time_entries:
+            if entry.project_identifier is None:
+                without_project.setdefault(entry.workspace_identifier, []).append(entry)
+                continue
+
+            duration = entry.duration if entry.duration >= 0 else now + entry.duration
+            descriptions = groups.setdefault((entry.workspace_identifier, entry.project_identifier), {})
+            group = descriptions.get(entry.description)
+            if group is None:
+                descriptions[entry.description] = Group(entry, duration)
+                continue
+
+            group.count += 1
+            group.duration += duration
+            # The first entry wins a tie, like a stable sort would.
+            if entry.last_updated > group.entry.last_updated:
+                group.entry = entry
+
+        result = []
+        for workspace in workspaces:
+            for project in projects:
+                for group in groups.get((workspace.identifier, project.identifier), {}).values():
+                    # A lone entry is shown as is, running or not.
+                    entry = group.entry if group.count == 1 else \
+                        TimeEntryBuilder(group.entry).duration(group.duration).build()
+                    result.append((entry, project, workspace))
+
+            for entry in without_project.get(workspace.identifier, []):
+                result.append((entry, None, workspace))
+        return result
@@ -1,9 +1,9 @@
 import sqlite3
-from sqlite3 import IntegrityError
 import logging
 
-from typing import List
-from datetime import datetime
+from contextlib import contextmanager
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+from datetime import datetime, timedelta, timezone
 
 from togglcmder.toggl.types.workspace import Workspace
 from togglcmder.toggl.builders.workspace_builder import WorkspaceBuilder
@@ -17,7 +17,55 @@ from togglcmder.toggl.types.project import Project
 from togglcmder.toggl.builders.project_builder import ProjectBuilder
 
 
+class UpsertResult(NamedTuple):
+    inserted: int
+    updated: int
+
+
+class SyncState(NamedTuple):
+    last_sync: datetime
+    high_water_mark: Optional[datetime]
+    coverage_start: Optional[datetime]
+
+
+class RunningTimeEntry(NamedTuple):
+    identifier: int
+    start_time: datetime
+
+
+class SummaryRow(NamedTuple):
+    # None for entries with no project, tag or description to group them by.
+    group: Optional[str]
+    count: int
+    # In seconds.
+    total: int
+    average: float
+
+
 class Caching(object):
+    # SQLite refuses statements with more bound variables than this (the
+    # default compile time limit for older versions is 999).
+    SQL_VARIABLE_LIMIT = 900
+
+    # Connection settings applied to every cache connection; any of them can
+    # be overridden through the "cache" section of the configuration file.
+    #   journal_mode: WAL lets readers and a writer work at the same time.
+    #   synchronous: NORMAL is durable enough for a cache under WAL and
+    #     avoids an fsync on every commit.
+    #   busy_timeout: milliseconds to wait on a locked database (e.g. while a
+    #     scheduled sync is writing) before failing.
+    #   cache_size: page cache size; negative values are in KiB.
+    #   mmap_size: bytes of the database to memory map for reads.
+    #   temp_store: keep temporary tables and indexes in memory.
+    CONNECTION_PROFILE = {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'busy_timeout': 5000,
+        'cache_size': -16384,
+        'mmap_size': 268435456,
+        'temp_store': 'memory',
+    }
+
     WORKSPACE_TABLE = '''
     CREATE TABLE IF NOT EXISTS workspaces (
         name TEXT NOT NULL,
@@ -64,13 +112,58 @@ class Caching(object):
 
     TIME_ENTRY_TAG_JUNCTION_TABLE = '''
     CREATE TABLE IF NOT EXISTS time_entry_tags (
-        tag_identifier INTEGER NOT NULL,
         time_entry_identifier INTEGER NOT NULL,
+        tag_identifier INTEGER NOT NULL,
+        PRIMARY KEY (time_entry_identifier, tag_identifier),
         FOREIGN KEY (tag_identifier) REFERENCES tags (identifier) ON DELETE CASCADE,
-        FOREIGN KEY (time_entry_identifier) REFERENCES time_entries (identifier) ON DELETE CASCADE 
-    )
+        FOREIGN KEY (time_entry_identifier) REFERENCES time_entries (identifier) ON DELETE CASCADE
+    ) WITHOUT ROWID
+    '''
+
+    # The primary key serves lookups by time entry; this serves tag removal.
+    TIME_ENTRY_TAG_INDEX = '''
+    CREATE INDEX IF NOT EXISTS time_entry_tags_tag
+    ON time_entry_tags (tag_identifier)
+    '''
+
+    # Both indexes end in start_time so a windowed lookup is a single range
+    # scan, and since the identifier is the rowid they also cover the
+    # identifier-only subqueries used to fetch tags for the same window.
+    TIME_ENTRY_WORKSPACE_INDEX = '''
+    CREATE INDEX IF NOT EXISTS time_entries_workspace_start
+    ON time_entries (workspace_identifier, start_time)
     '''
 
+    TIME_ENTRY_PROJECT_INDEX = '''
+    CREATE INDEX IF NOT EXISTS time_entries_project_start
+    ON time_entries (project_identifier, start_time)
+    '''
+
+    # What summarize_time_entries groups entries on, the name each group is
+    # shown as, and the joins that takes. Projects and tags are grouped on
+    # their identifiers, so those with the same name in different workspaces
+    # stay apart. Periods are first added up by the quarter hour they start
+    # in: SQLite's localtime conversion is several times slower than the
+    # rest of the query together, and every time zone offset is a whole
+    # number of quarter hours, so each of those falls in a single local day.
+    SUMMARY_GROUPS = {
+        'period': ('CAST(time_entries.start_time AS INTEGER) / 900', 'NULL', ''),
+        'project': ('time_entries.project_identifier', 'projects.name',
+                    'LEFT JOIN projects ON projects.identifier = time_entries.project_identifier'),
+        'tag': ('tags.identifier', 'tags.name',
+                'LEFT JOIN time_entry_tags ON time_entry_tags.time_entry_identifier = time_entries.identifier '
+                'LEFT JOIN tags ON tags.identifier = time_entry_tags.tag_identifier'),
+        'description': ("NULLIF(time_entries.description, '')", "NULLIF(time_entries.description, '')", ''),
+    }
+
+    # The local periods summarize_time_entries can group by; a week is named
+    # after its Monday.
+    SUMMARY_PERIODS = {
+        'day': lambda local: local.strftime('%Y-%m-%d'),
+        'week': lambda local: (local - timedelta(days=local.weekday())).strftime('%Y-%m-%d'),
+        'month': lambda local: local.strftime('%Y-%m'),
+    }
+
     USER_TABLE = '''
     CREATE TABLE IF NOT EXISTS users (
         name TEXT,
@@ -80,57 +173,298 @@ class Caching(object):
     )
     '''
 
-    def __init__(self, *, cache_name: str = "cache.db"):
-        self.__connection = sqlite3.connect(cache_name)
-        self.__connection.set_trace_callback(logging.getLogger(__name__).debug)
+    # What has been downloaded so far, per resource and workspace (0 when a
+    # resource isn't downloaded per workspace). The high water mark is the
+    # newest server "at" timestamp seen; coverage_start is how far back a
+    # windowed resource has been fully downloaded.
+    SYNC_STATE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS sync_state (
+        resource TEXT NOT NULL,
+        workspace_identifier INTEGER NOT NULL,
+        last_sync TIMESTAMP NOT NULL,
+        high_water_mark TIMESTAMP,
+        coverage_start TIMESTAMP,
+        PRIMARY KEY (resource, workspace_identifier)
+    ) WITHOUT ROWID
+    '''
+
+    # The timer last seen running, so it can be stopped without asking the
+    # server which one that is. There is at most one row.
+    RUNNING_TIME_ENTRY_TABLE = '''
+    CREATE TABLE IF NOT EXISTS running_time_entry (
+        singleton INTEGER PRIMARY KEY CHECK (singleton = 0),
+        identifier INTEGER NOT NULL,
+        start_time TIMESTAMP NOT NULL
+    )
+    '''
+
+    # Rebuilds time_entry_tags with the current layout, keeping one copy of
+    # every pair that still references existing rows.
+    TIME_ENTRY_TAG_JUNCTION_REBUILD = (
+        'ALTER TABLE time_entry_tags RENAME TO time_entry_tags_previous',
+        TIME_ENTRY_TAG_JUNCTION_TABLE,
+        '''
+        INSERT OR IGNORE INTO time_entry_tags (time_entry_identifier, tag_identifier)
+        SELECT time_entry_identifier, tag_identifier
+        FROM time_entry_tags_previous
+        WHERE time_entry_identifier IN (SELECT identifier FROM time_entries)
+          AND tag_identifier IN (SELECT identifier FROM tags)
+        ''',
+        'DROP TABLE time_entry_tags_previous',
+    )
+
+    # Ordered schema revisions; the cache's PRAGMA user_version is the number
+    # of revisions already applied. Only ever append to this list.
+    MIGRATIONS = (
+        # 1: the original tables (caches from before versioning already have
+        #    them, which is why every statement is IF NOT EXISTS).
+        (WORKSPACE_TABLE,
+         PROJECT_TABLE,
+         TAG_TABLE,
+         TIME_ENTRY_TABLE,
+         TIME_ENTRY_TAG_JUNCTION_TABLE,
+         USER_TABLE),
+        # 2: indexes for windowed time entry lookups.
+        (TIME_ENTRY_WORKSPACE_INDEX,
+         TIME_ENTRY_PROJECT_INDEX),
+        # 3: time_entry_tags keyed on (time_entry, tag) without duplicates.
+        TIME_ENTRY_TAG_JUNCTION_REBUILD + (TIME_ENTRY_TAG_INDEX,),
+        # 4: per resource sync watermarks.
+        (SYNC_STATE_TABLE,),
+        # 5: the running timer.
+        (RUNNING_TIME_ENTRY_TABLE,),
+    )
+
+    def __init__(self, *, cache_name: str = "cache.db", profile: Optional[dict] = None):
+        profile = {**Caching.CONNECTION_PROFILE, **(profile or {})}
+
+        self.__connection = sqlite3.connect(
+            cache_name, timeout=int(profile['busy_timeout']) / 1000)
+        # Tracing expands every bound statement into text, which is a large
+        # share of the cost of a bulk write; only pay for it when it is logged.
+        logger = logging.getLogger(__name__)
+        if logger.isEnabledFor(logging.DEBUG):
+            self.__connection.set_trace_callback(logger.debug)
         self.__cursor = self.__connection.cursor()
 
+        self.__apply_profile(profile)
         self.__cursor.execute("PRAGMA foreign_keys = 1")
         self.__connection.commit()
 
-        self.__cursor.execute(Caching.WORKSPACE_TABLE)
-        self.__cursor.execute(Caching.PROJECT_TABLE)
-        self.__cursor.execute(Caching.TAG_TABLE)
-        self.__cursor.execute(Caching.TIME_ENTRY_TABLE)
-        self.__cursor.execute(Caching.TIME_ENTRY_TAG_JUNCTION_TABLE)
-        self.__cursor.execute(Caching.USER_TABLE)
+        self.__rebuilt = False
+        self.__migrate()
 
-        self.__connection.commit()
+        self.__transaction_depth = 0
+        self.__last_upsert = UpsertResult(inserted=0, updated=0)
 
         self.__workspaces: List[Workspace] = []
         self.__projects: List[Project] = []
         self.__tags: List[Tag] = []
         self.__time_entries: List[TimeEntry] = []
 
+    def __apply_profile(self, profile: dict) -> None:
+        # PRAGMA values cannot be bound as parameters, so only accept the
+        # known settings with plain numeric or word values.
+        for name in Caching.CONNECTION_PROFILE:
+            value = str(profile[name])
+            if not value.lstrip('-').isalnum():
+                raise ValueError('invalid value for cache setting {}: {}'.format(name, value))
+            self.__cursor.execute('PRAGMA {} = {}'.format(name, value))
+
+        unknown = set(profile) - set(Caching.CONNECTION_PROFILE)
+        if unknown:
+            logging.getLogger(__name__).warning(
+                'ignoring unknown cache settings: %s', ', '.join(sorted(unknown)))
+
+    @property
+    def schema_version(self) -> int:
+        self.__cursor.execute('PRAGMA user_version')
+        return self.__cursor.fetchone()[0]
+
+    @property
+    def rebuilt(self) -> bool:
+        """
+        True when the cache could not be migrated and was recreated empty, in
+        which case everything needs to be downloaded from the server again.
+        """
+        return self.__rebuilt
+
+    def __migrate(self) -> None:
+        logger = logging.getLogger(__name__)
+
+        version = self.schema_version
+        if version == len(Caching.MIGRATIONS):
+            return
+
+        try:
+            if version > len(Caching.MIGRATIONS):
+                raise sqlite3.DatabaseError(
+                    'cache schema version {} is newer than this version supports ({})'.format(
+                        version, len(Caching.MIGRATIONS)))
+            self.__apply_migrations(version)
+        except sqlite3.DatabaseError as e:
+            logger.warning('failed to migrate the cache from schema version %d, rebuilding it: %s',
+                           version, e)
+            self.__rebuild()
+
+    def __apply_migrations(self, version: int) -> None:
+        logger = logging.getLogger(__name__)
+        for index, statements in enumerate(Caching.MIGRATIONS[version:], start=version + 1):
+            logger.info('migrating the cache to schema version %d', index)
+            # Each revision, including the version bump, is all or nothing.
+            self.__cursor.execute('BEGIN')
+            try:
+                for statement in statements:
+                    self.__cursor.execute(statement)
+                self.__cursor.execute('PRAGMA user_version = {:d}'.format(index))
+            except sqlite3.DatabaseError:
+                self.__connection.rollback()
+                raise
+            self.__connection.commit()
+
+    def __rebuild(self) -> None:
+        # The cache only mirrors the server, so the quickest way past a schema
+        # it cannot upgrade is to start over and download everything again.
+        self.__cursor.execute('PRAGMA foreign_keys = 0')
+        self.__cursor.execute(
+            "SELECT type, name FROM sqlite_master"
+            " WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'")
+        for kind, name in self.__cursor.fetchall():
+            self.__cursor.execute('DROP {} IF EXISTS "{}"'.format(kind.upper(), name))
+        self.__cursor.execute('PRAGMA user_version = 0')
+        self.__connection.commit()
+        self.__cursor.execute('PRAGMA foreign_keys = 1')
+
+        self.__apply_migrations(0)
+        self.__rebuilt = True
+
     def __del__(self):
-        self.__connection.close()
+        try:
+            self.__connection.close()
+        except sqlite3.ProgrammingError:
+            # Collected on a thread other than the one that opened it (the
+            # daemon's worker, say); the connection goes away with the process.
+            pass
+
+    @property
+    def last_upsert(self) -> UpsertResult:
+        """
+        The inserted/updated split of the most recent update_*_cache call.
+        """
+        return self.__last_upsert
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups every mutation made inside the block into a single commit, so a
+        sync pays for one transaction instead of one per update call. Blocks
+        may be nested; only the outermost one commits, and only if it is left
+        normally: anything raised out of it, KeyboardInterrupt included, rolls
+        the whole batch back.
+        """
+        self.__transaction_depth += 1
+        completed = False
+        try:
+            yield self
+            completed = True
+        finally:
+            self.__transaction_depth -= 1
+            if self.__transaction_depth == 0:
+                if completed:
+                    self.__connection.commit()
+                else:
+                    self.__connection.rollback()
+
+    def __commit(self) -> None:
+        if self.__transaction_depth == 0:
+            self.__connection.commit()
+
+    def __upsert(self, table: str, insert_sql: str, update_sql: str, rows: List[tuple]) -> int:
+        # New rows are inserted first, and what that leaves over is updated;
+        # the change count of each is the inserted/updated split. The update
+        # only runs if some rows already existed, and skips rows identical to
+        # what is cached, so a first sync is a single pass.
+        changes_before = self.__connection.total_changes
+        self.__cursor.executemany(insert_sql, rows)
+        inserted = self.__connection.total_changes - changes_before
+
+        updated = 0
+        if inserted < len(rows):
+            changes_before = self.__connection.total_changes
+            self.__cursor.executemany(update_sql, rows)
+            updated = self.__connection.total_changes - changes_before
+
+        self.__last_upsert = UpsertResult(inserted=inserted, updated=updated)
+        logging.getLogger(__name__).debug(
+            'upserted into %s: %d inserted, %d updated, %d unchanged',
+            table, inserted, updated, len(rows) - inserted - updated)
+
+        return inserted + updated
+
+    def __remove(self, table: str, identifiers: List[int]) -> int:
+        removed = 0
+        for offset in range(0, len(identifiers), Caching.SQL_VARIABLE_LIMIT):
+            chunk = identifiers[offset:offset + Caching.SQL_VARIABLE_LIMIT]
+            self.__cursor.execute(
+                'DELETE FROM {} WHERE identifier IN ({})'.format(table, ','.join('?' * len(chunk))),
+                chunk)
+            removed += self.__cursor.rowcount
+        self.__commit()
+        return removed
+
+    def retrieve_sync_state(self, resource: str, workspace_identifier: int = 0) -> Optional[SyncState]:
+        sql = '''
+            SELECT last_sync, high_water_mark, coverage_start FROM sync_state
+            WHERE resource=? AND workspace_identifier=?
+        '''
+
+        self.__cursor.execute(sql, (resource, workspace_identifier))
+        result = self.__cursor.fetchone()
+        if result:
+            return SyncState(*(
+                datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+                for value in result
+            ))
+
+    def update_sync_state(self, resource: str, workspace_identifier: int = 0, *,
+                          high_water_mark: Optional[datetime] = None,
+                          coverage_start: Optional[datetime] = None) -> None:
+        sql = '''
+            INSERT OR REPLACE INTO sync_state
+            (resource, workspace_identifier, last_sync, high_water_mark, coverage_start) VALUES
+            (?, ?, ?, ?, ?)
+        '''
+
+        self.__cursor.execute(sql, (resource,
+                                    workspace_identifier,
+                                    datetime.now(tz=timezone.utc).timestamp(),
+                                    high_water_mark.timestamp() if high_water_mark else None,
+                                    coverage_start.timestamp() if coverage_start else None))
+        self.__commit()
 
     def update_workspace_cache(self, workspaces: List[Workspace]) -> int:
         insert_sql = '''
-            INSERT INTO workspaces
-            (name, identifier, last_updated) VALUES 
-            (?, ?, ?)
+            INSERT OR IGNORE INTO workspaces
+            (name, identifier, last_updated) VALUES
+            (?1, ?2, ?3)
         '''
 
         update_sql = '''
-            UPDATE workspaces SET name=?, last_updated=?
-            WHERE identifier=?
+            UPDATE workspaces
+            SET name=?1, last_updated=?3
+            WHERE identifier=?2
+              AND (name IS NOT ?1
+                   OR last_updated IS NOT ?3)
         '''
 
-        for workspace in workspaces:
-            try:
-                self.__cursor.execute(
-                    insert_sql, (workspace.name,
-                                 workspace.identifier,
-                                 workspace.last_updated.timestamp()))
-            except IntegrityError:
-                self.__cursor.execute(
-                    update_sql, (workspace.name,
-                                 workspace.last_updated.timestamp(),
-                                 workspace.identifier))
+        rows_affected = self.__upsert(
+            'workspaces', insert_sql, update_sql,
+            [(workspace.name,
+              workspace.identifier,
+              workspace.last_updated.timestamp()) for workspace in workspaces])
 
-        self.__connection.commit()
-        return self.__cursor.rowcount
+        self.__commit()
+        return rows_affected
 
     def retrieve_workspace_cache(self) -> List[Workspace]:
         sql = '''
@@ -148,33 +482,42 @@ class Caching(object):
                 for result in results
             ]
 
+    def remove_workspaces_from_cache(self, identifiers: List[int]) -> int:
+        # Time entries don't cascade with their workspace, so they go first.
+        for offset in range(0, len(identifiers), Caching.SQL_VARIABLE_LIMIT):
+            chunk = identifiers[offset:offset + Caching.SQL_VARIABLE_LIMIT]
+            self.__cursor.execute(
+                'DELETE FROM time_entries WHERE workspace_identifier IN ({})'.format(','.join('?' * len(chunk))),
+                chunk)
+        return self.__remove('workspaces', identifiers)
+
     def update_user_cache(self, user: User) -> int:
         insert_sql = '''
-            INSERT INTO users
-            (name, api_token, identifier, last_updated) VALUES 
-            (?, ?, ?, ?)
+            INSERT OR IGNORE INTO users
+            (name, api_token, identifier, last_updated) VALUES
+            (?1, ?2, ?3, ?4)
         '''
 
         update_sql = '''
-            UPDATE users SET name=?, api_token=?, last_updated=?
-            WHERE identifier=?
+            UPDATE users
+            SET name=?1,
+                api_token=?2,
+                last_updated=?4
+            WHERE identifier=?3
+              AND (name IS NOT ?1
+                   OR api_token IS NOT ?2
+                   OR last_updated IS NOT ?4)
         '''
 
-        try:
-            self.__cursor.execute(
-                insert_sql, (user.name,
-                             user.api_token,
-                             user.identifier,
-                             user.last_updated.timestamp()))
-        except IntegrityError:
-            self.__cursor.execute(
-                update_sql, (user.name,
-                             user.api_token,
-                             user.last_updated.timestamp(),
-                             user.identifier))
+        rows_affected = self.__upsert(
+            'users', insert_sql, update_sql,
+            [(user.name,
+              user.api_token,
+              user.identifier,
+              user.last_updated.timestamp())])
 
-        self.__connection.commit()
-        return self.__cursor.rowcount
+        self.__commit()
+        return rows_affected
 
     def retrieve_user_cache(self) -> User:
         sql = '''
@@ -192,36 +535,35 @@ class Caching(object):
 
     def update_project_cache(self, projects: List[Project]) -> int:
         insert_sql = '''
-            INSERT INTO projects
-            (name, color, last_updated, created, identifier, workspace_identifier) VALUES 
-            (?, ?, ?, ?, ?, ?) 
+            INSERT OR IGNORE INTO projects
+            (name, color, last_updated, created, identifier, workspace_identifier) VALUES
+            (?1, ?2, ?3, ?4, ?5, ?6)
         '''
 
         update_sql = '''
             UPDATE projects
-            SET name=?, color=?, last_updated=?, workspace_identifier=?
-            WHERE identifier=?
+            SET name=?1,
+                color=?2,
+                last_updated=?3,
+                workspace_identifier=?6
+            WHERE identifier=?5
+              AND (name IS NOT ?1
+                   OR color IS NOT ?2
+                   OR last_updated IS NOT ?3
+                   OR workspace_identifier IS NOT ?6)
         '''
 
-        for project in projects:
-            try:
-                self.__cursor.execute(
-                    insert_sql, (project.name,
-                                 project.color.value,
-                                 project.last_updated.timestamp(),
-                                 project.created.timestamp() if project.created else datetime.now().timestamp(),
-                                 project.identifier,
-                                 project.workspace_identifier))
-            except IntegrityError:
-                self.__cursor.execute(
-                    update_sql, (project.name,
-                                 project.color.value,
-                                 project.last_updated.timestamp(),
-                                 project.workspace_identifier,
-                                 project.identifier))
+        rows_affected = self.__upsert(
+            'projects', insert_sql, update_sql,
+            [(project.name,
+              project.color.value,
+              project.last_updated.timestamp(),
+              project.created.timestamp() if project.created else datetime.now().timestamp(),
+              project.identifier,
+              project.workspace_identifier) for project in projects])
 
-        self.__connection.commit()
-        return self.__cursor.rowcount
+        self.__commit()
+        return rows_affected
 
     def retrieve_project_cache(self) -> List[Project]:
         sql = '''
@@ -249,36 +591,33 @@ class Caching(object):
         '''
         self.__cursor.execute(sql, (project.identifier,))
 
-        self.__connection.commit()
+        self.__commit()
+
+    def remove_projects_from_cache(self, identifiers: List[int]) -> int:
+        return self.__remove('projects', identifiers)
 
     def update_tag_cache(self, tags: List[Tag]) -> int:
         insert_sql = '''
-            INSERT INTO tags
+            INSERT OR IGNORE INTO tags
             (name, identifier, workspace_identifier) VALUES
-            (?, ?, ?)
+            (?1, ?2, ?3)
         '''
 
         update_sql = '''
             UPDATE tags
-            SET name=?, workspace_identifier=?
-            WHERE identifier=?
+            SET name=?1, workspace_identifier=?3
+            WHERE identifier=?2
+              AND (name IS NOT ?1
+                   OR workspace_identifier IS NOT ?3)
         '''
 
-        rows_affected = 0
-        for tag in tags:
-            try:
-                self.__cursor.execute(
-                    insert_sql, (tag.name,
-                                 tag.identifier,
-                                 tag.workspace_identifier))
-            except IntegrityError:
-                self.__cursor.execute(
-                    update_sql, (tag.name,
-                                 tag.workspace_identifier,
-                                 tag.identifier))
-            rows_affected += self.__cursor.rowcount
+        rows_affected = self.__upsert(
+            'tags', insert_sql, update_sql,
+            [(tag.name,
+              tag.identifier,
+              tag.workspace_identifier) for tag in tags])
 
-        self.__connection.commit()
+        self.__commit()
         return rows_affected
 
     def retrieve_tag_cache(self) -> List[Tag]:
@@ -310,128 +649,171 @@ class Caching(object):
         '''
         self.__cursor.execute(join_table_removal_sql, (tag.identifier,))
 
-        self.__connection.commit()
+        self.__commit()
 
-    def __retrieve_time_entry_tags_join(self, time_entry_identifier: int) -> List[tuple]:
-        sql = '''
-            SELECT name, tag_identifier, time_entry_identifier
-            FROM time_entry_tags
-            INNER JOIN tags ON time_entry_tags.tag_identifier = tags.identifier
-            WHERE time_entry_identifier=?
-        '''
-        self.__cursor.execute(sql, (time_entry_identifier,))
-        return self.__cursor.fetchall()
+    def remove_tags_from_cache(self, identifiers: List[int]) -> int:
+        return self.__remove('tags', identifiers)
 
-    def __retrieve_time_entry_tags(self, time_entry_identifier: int) -> List[tuple]:
-        sql = '''
-            SELECT tag_identifier, time_entry_identifier
-            FROM time_entry_tags
-            WHERE time_entry_identifier=?
-        '''
-        self.__cursor.execute(sql, (time_entry_identifier,))
-        return self.__cursor.fetchall()
-
-    def __check_existing(self, tags: List[int], time_entry_identifier: int) -> List[int]:
-        # returns a tuple of (tag_id, time_entry_id)
-        existing_time_entry_tags = self.__retrieve_time_entry_tags(time_entry_identifier)
-        if len(tags) == 0 or len(existing_time_entry_tags) == 0:
-            return tags
-        return list(
-            # 2. map each tuple to be just the tag identifier, so given x,
-            #    return the tag_id
-            map(lambda x: x[0],
-                # 1. filter so we only get tags tuples that aren't in the existing list
-                #     of tags (checked based on x[0], which is the tag identifier)
-                filter(lambda x: x[0] not in tags, existing_time_entry_tags)))
+    def __retrieve_time_entry_tag_identifiers(self, time_entry_identifiers: List[int]) -> Dict[int, Set[int]]:
+        tag_identifiers = {}
+        for offset in range(0, len(time_entry_identifiers), Caching.SQL_VARIABLE_LIMIT):
+            chunk = time_entry_identifiers[offset:offset + Caching.SQL_VARIABLE_LIMIT]
+            self.__cursor.execute(
+                '''
+                SELECT time_entry_identifier, tag_identifier
+                FROM time_entry_tags
+                WHERE time_entry_identifier IN ({})
+                '''.format(','.join('?' * len(chunk))),
+                chunk)
+            for time_entry_identifier, tag_identifier in self.__cursor.fetchall():
+                tag_identifiers.setdefault(time_entry_identifier, set()).add(tag_identifier)
+        return tag_identifiers
 
     def update_time_entry_cache(self, time_entries: List[TimeEntry]) -> int:
         insert_sql = '''
-            INSERT INTO time_entries
+            INSERT OR IGNORE INTO time_entries
             (description, start_time, stop_time, duration, identifier,
-             project_identifier, workspace_identifier, last_updated) VALUES 
-            (?, ?, ?, ?, ?, ?, ?, ?)
+             project_identifier, workspace_identifier, last_updated) VALUES
+            (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8)
         '''
 
         update_sql = '''
             UPDATE time_entries
-            SET description=?, 
-                start_time=?, 
-                stop_time=?, 
-                duration=?, 
-                project_identifier=?, 
-                workspace_identifier=?, 
-                last_updated=?
-            WHERE identifier=?
+            SET description=?1,
+                start_time=?2,
+                stop_time=?3,
+                duration=?4,
+                project_identifier=?6,
+                workspace_identifier=?7,
+                last_updated=?8
+            WHERE identifier=?5
+              AND (description IS NOT ?1
+                   OR start_time IS NOT ?2
+                   OR stop_time IS NOT ?3
+                   OR duration IS NOT ?4
+                   OR project_identifier IS NOT ?6
+                   OR workspace_identifier IS NOT ?7
+                   OR last_updated IS NOT ?8)
         '''
 
         insert_time_entry_tag_sql = '''
-            INSERT INTO time_entry_tags
-            (tag_identifier, time_entry_identifier)
+            INSERT OR IGNORE INTO time_entry_tags
+            (time_entry_identifier, tag_identifier)
             VALUES (?, ?)
         '''
-        tag_rows = self.retrieve_tag_cache()
-        rows_affected = 0
-
-        for time_entry in time_entries:
-            try:
-                self.__cursor.execute(
-                    insert_sql, (time_entry.description,
-                                 time_entry.start_time.timestamp(),
-                                 None if not time_entry.stop_time else time_entry.stop_time.timestamp(),
-                                 time_entry.duration,
-                                 time_entry.identifier,
-                                 time_entry.project_identifier,
-                                 time_entry.workspace_identifier,
-                                 time_entry.last_updated.timestamp()))
-            except IntegrityError:
-                self.__cursor.execute(
-                    update_sql, (time_entry.description,
-                                 time_entry.start_time.timestamp(),
-                                 None if not time_entry.stop_time else time_entry.stop_time.timestamp(),
-                                 time_entry.duration,
-                                 time_entry.project_identifier,
-                                 time_entry.workspace_identifier,
-                                 time_entry.last_updated.timestamp(),
-                                 time_entry.identifier))
-            rows_affected += self.__cursor.rowcount
-
-            tag_ids = []
-            if time_entry.tags:
-                for tag in time_entry.tags:
-                    for tag_row in tag_rows:
-                        if tag == tag_row.name:
-                            tag_ids.append(tag_row.identifier)
-                            break
-                for tag_id in self.__check_existing(tag_ids, time_entry.identifier):
-                    self.__cursor.execute(
-                        insert_time_entry_tag_sql,
-                        (tag_id,
-                         time_entry.identifier))
 
-        self.__connection.commit()
+        delete_time_entry_tag_sql = '''
+            DELETE FROM time_entry_tags
+            WHERE time_entry_identifier=? AND tag_identifier=?
+        '''
 
+        rows_affected = self.__upsert(
+            'time_entries', insert_sql, update_sql,
+            [(time_entry.description,
+              time_entry.start_time.timestamp(),
+              None if not time_entry.stop_time else time_entry.stop_time.timestamp(),
+              time_entry.duration,
+              time_entry.identifier,
+              time_entry.project_identifier,
+              time_entry.workspace_identifier,
+              time_entry.last_updated.timestamp()) for time_entry in time_entries])
+
+        # Only the difference between the cached and the given tags is written,
+        # so syncing the same entries again never touches the junction table.
+        # Entries that were just inserted have no cached tags to diff against.
+        tagged = any(time_entry.tags for time_entry in time_entries)
+        existing_tags = {} if self.__last_upsert.inserted == len(time_entries) else \
+            self.__retrieve_time_entry_tag_identifiers([time_entry.identifier for time_entry in time_entries])
+        if tagged or existing_tags:
+            # The first tag with a given name wins, same as a linear search would.
+            tag_identifiers = {}
+            for tag in (self.retrieve_tag_cache() or []) if tagged else []:
+                tag_identifiers.setdefault(tag.name, tag.identifier)
+
+            added_tags = []
+            removed_tags = []
+            for time_entry in time_entries:
+                existing = existing_tags.get(time_entry.identifier, set())
+                if not time_entry.tags and not existing:
+                    continue
+                wanted = {tag_identifiers[tag] for tag in time_entry.tags or [] if tag in tag_identifiers}
+                added_tags.extend((time_entry.identifier, tag_id) for tag_id in wanted - existing)
+                removed_tags.extend((time_entry.identifier, tag_id) for tag_id in existing - wanted)
+            self.__cursor.executemany(insert_time_entry_tag_sql, added_tags)
+            self.__cursor.executemany(delete_time_entry_tag_sql, removed_tags)
+
+        # Keep track of the running timer: a running entry (one without a stop
+        # time) becomes it, and it is forgotten once it is seen stopped.
+        running = [time_entry for time_entry in time_entries if time_entry.stop_time is None]
+        if running:
+            self.__update_running_time_entry(max(running, key=lambda time_entry: time_entry.start_time))
+        else:
+            tracked = self.retrieve_running_time_entry_cache()
+            if tracked and any(time_entry.identifier == tracked.identifier for time_entry in time_entries):
+                self.remove_running_time_entry_from_cache()
+
+        self.__commit()
         return rows_affected
 
-    def retrieve_time_entry_cache(self) -> List[TimeEntry]:
+    def __update_running_time_entry(self, time_entry: TimeEntry) -> None:
+        sql = '''
+            INSERT OR REPLACE INTO running_time_entry
+            (singleton, identifier, start_time) VALUES
+            (0, ?, ?)
+        '''
+
+        self.__cursor.execute(sql, (time_entry.identifier, time_entry.start_time.timestamp()))
+
+    def retrieve_running_time_entry_cache(self) -> Optional[RunningTimeEntry]:
+        sql = '''
+            SELECT identifier, start_time FROM running_time_entry
+        '''
+
+        self.__cursor.execute(sql)
+        result = self.__cursor.fetchone()
+        if result:
+            return RunningTimeEntry(identifier=result[0],
+                                    start_time=datetime.fromtimestamp(result[1], tz=timezone.utc))
+
+    def remove_running_time_entry_from_cache(self) -> None:
+        self.__cursor.execute('DELETE FROM running_time_entry')
+        self.__commit()
+
+    def __retrieve_time_entries(self, where: str = '', parameters: tuple = (), *,
+                                order_by: Optional[str] = None) -> List[TimeEntry]:
         time_entry_sql = """
-            SELECT  description, 
-                    start_time, 
-                    stop_time, 
-                    duration, 
-                    identifier, 
-                    project_identifier, 
-                    workspace_identifier, 
+            SELECT  description,
+                    start_time,
+                    stop_time,
+                    duration,
+                    identifier,
+                    project_identifier,
+                    workspace_identifier,
                     last_updated
             FROM time_entries
-        """
+            {} {}
+        """.format(where, 'ORDER BY {}'.format(order_by) if order_by else '')
+
+        # All of the tag names for the selected entries come back in one
+        # query and are grouped here, instead of one query per entry.
+        tag_sql = """
+            SELECT time_entry_identifier, name
+            FROM time_entry_tags
+            INNER JOIN tags ON time_entry_tags.tag_identifier = tags.identifier
+            {}
+        """.format('WHERE time_entry_identifier IN (SELECT identifier FROM time_entries {})'.format(where)
+                   if where else '')
+
+        tag_names = {}
+        self.__cursor.execute(tag_sql, parameters)
+        for time_entry_identifier, name in self.__cursor.fetchall():
+            tag_names.setdefault(time_entry_identifier, []).append(name)
 
         time_entries = []
 
-        self.__cursor.execute(time_entry_sql)
+        self.__cursor.execute(time_entry_sql, parameters)
         results = self.__cursor.fetchall()
         for result in results:
-            tag_results = self.__retrieve_time_entry_tags_join(result[4])
-
             builder = TimeEntryBuilder()\
                 .description(result[0])\
                 .start_time(epoch=result[1])\
@@ -441,11 +823,129 @@ class Caching(object):
                 .project_identifier(result[5])\
                 .workspace_identifier(result[6])\
                 .last_updated(epoch=result[7])\
-                .tags([tag_result[0] for tag_result in tag_results])
+                .tags(tag_names.get(result[4], []))
             time_entries.append(builder.build())
 
         return time_entries
 
+    def retrieve_time_entry_cache(self) -> List[TimeEntry]:
+        return self.__retrieve_time_entries()
+
+    def query_time_entries(self, workspace_identifier: Optional[int],
+                           start: Optional[datetime] = None,
+                           stop: Optional[datetime] = None, *,
+                           project_identifier: Optional[int] = None,
+                           tag_identifiers: Optional[List[int]] = None) -> List[TimeEntry]:
+        """
+        Retrieve only the cached time entries matching the given criteria. This
+        mirrors chaining the workspace, date range, project and any-tag
+        filters over retrieve_time_entry_cache, but the work is done by SQLite
+        so it scales with the size of the window rather than the cache.
+        Entries are returned in start time order.
+
+        :param workspace_identifier: only entries in this workspace, if given.
+        :param start: only entries starting strictly after this time.
+        :param stop: only entries starting strictly before this time.
+        :param project_identifier: only entries in this project, if given.
+        :param tag_identifiers: only entries with at least one of these tags.
+        :return:
+        """
+        conditions = []
+        parameters = []
+        if workspace_identifier is not None:
+            conditions.append('workspace_identifier = ?')
+            parameters.append(workspace_identifier)
+        if project_identifier is not None:
+            conditions.append('project_identifier = ?')
+            parameters.append(project_identifier)
+        if start:
+            conditions.append('start_time > ?')
+            parameters.append(start.timestamp())
+        if stop:
+            conditions.append('start_time < ?')
+            parameters.append(stop.timestamp())
+        if tag_identifiers:
+            conditions.append(
+                'identifier IN (SELECT time_entry_identifier FROM time_entry_tags'
+                ' WHERE tag_identifier IN ({}))'.format(','.join('?' * len(tag_identifiers))))
+            parameters.extend(tag_identifiers)
+
+        where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+        return self.__retrieve_time_entries(where, tuple(parameters), order_by='start_time')
+
+    def summarize_time_entries(self, group_by: str,
+                               workspace_identifiers: Optional[List[int]] = None,
+                               start: Optional[datetime] = None,
+                               stop: Optional[datetime] = None, *,
+                               project_identifiers: Optional[List[int]] = None,
+                               now: Optional[datetime] = None) -> List[SummaryRow]:
+        """
+        Count and add up the cached time entries matching the given criteria
+        by day, week, month, project, tag or description. The work is done by
+        SQLite without building any time entries, and the criteria are those
+        of query_time_entries so its indexes are used the same way. An entry
+        with several tags counts towards each of them, and a running entry
+        counts for the time it has run so far.
+
+        :param group_by: one of SUMMARY_PERIODS, or project, tag or description.
+        :param workspace_identifiers: only entries in these workspaces, if given.
+        :param start: only entries starting strictly after this time.
+        :param stop: only entries starting strictly before this time.
+        :param project_identifiers: only entries in these projects, if given.
+        :param now: when running entries are counted up to, now by default.
+        :return: periods in order, anything else largest total first.
+        """
+        period = Caching.SUMMARY_PERIODS.get(group_by)
+        group, label, joins = Caching.SUMMARY_GROUPS['period' if period else group_by]
+
+        conditions = []
+        parameters = []
+        if workspace_identifiers is not None:
+            conditions.append('time_entries.workspace_identifier IN ({})'.format(
+                ','.join('?' * len(workspace_identifiers))))
+            parameters.extend(workspace_identifiers)
+        if project_identifiers is not None:
+            conditions.append('time_entries.project_identifier IN ({})'.format(
+                ','.join('?' * len(project_identifiers))))
+            parameters.extend(project_identifiers)
+        if start:
+            conditions.append('time_entries.start_time > ?')
+            parameters.append(start.timestamp())
+        if stop:
+            conditions.append('time_entries.start_time < ?')
+            parameters.append(stop.timestamp())
+
+        # A running entry's duration is only as recent as its last sync.
+        sql = """
+            SELECT  {group} AS grouped,
+                    {label},
+                    COUNT(*),
+                    SUM(CASE WHEN time_entries.stop_time IS NULL THEN ? - time_entries.start_time
+                             ELSE time_entries.duration END)
+            FROM time_entries
+            {joins}
+            {where}
+            GROUP BY grouped
+        """.format(group=group, label=label, joins=joins,
+                   where='WHERE ' + ' AND '.join(conditions) if conditions else '')
+
+        # Keyed on what was grouped on (or the local period), with the name
+        # only carried along to be shown.
+        totals: Dict[Any, List] = {}
+        self.__cursor.execute(sql, ((now or datetime.now(tz=timezone.utc)).timestamp(), *parameters))
+        for grouped, name, count, duration in self.__cursor.fetchall():
+            if period:
+                grouped = name = period(datetime.fromtimestamp(grouped * 900))
+            total = totals.setdefault(grouped, [name, 0, 0])
+            total[1] += count
+            total[2] += int(duration or 0)
+
+        rows = [SummaryRow(group=name, count=count, total=total, average=total / count)
+                for name, count, total in totals.values()]
+        if period:
+            return sorted(rows, key=lambda row: row.group)
+        return sorted(rows, key=lambda row: row.total, reverse=True)
+
     def remove_time_entry_from_cache(self, time_entry: TimeEntry) -> None:
         entry_removal_sql = '''
             DELETE FROM time_entries
@@ -459,7 +959,10 @@ class Caching(object):
         '''
         self.__cursor.execute(joined_entry_removal_sql, (time_entry.identifier,))
 
-        self.__connection.commit()
+        self.__commit()
+
+    def remove_time_entries_from_cache(self, identifiers: List[int]) -> int:
+        return self.__remove('time_entries', identifiers)
 
     def get_workspace_identifier(self, workspace_name: str) -> int:
         sql = """
@@ -0,0 +1,22 @@
+import click
+
+from togglcmder.toggl.daemon.client import socket_path
+
+
+@click.command(
+    help='Keep a warm togglcmder running in the background. While it runs, other '
+         'togglcmder commands are handed to it over a local socket instead of '
+         'starting from scratch.'
+)
+@click.option('--refresh/--no-refresh',
+              default=True,
+              show_default=True,
+              help='Also keep the cache up to date in the background, as "sync --watch" does.')
+@click.pass_context
+def daemon(context: click.Context, refresh: bool):
+    # Only imported here; Twisted is never loaded for a regular command.
+    from togglcmder.toggl.daemon.server import serve
+
+    path = socket_path(click.get_app_dir('togglcmder'))
+    click.echo(click.style('INFO', fg='green') + f': listening on {path}')
+    serve(path, context.find_root().command, refresh=refresh)
@@ -1,6 +1,18 @@
+import click
+import functools
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from requests.exceptions import RequestException
+
 from togglcmder.toggl.caching import Caching
 from togglcmder.toggl.downloader import Downloader
 from togglcmder.toggl.commands import Commands
+from togglcmder.toggl.filters.diagnostics import TRACE_LOGGER
+from togglcmder.toggl.freshness import Freshness
+from togglcmder.toggl.synchronizer import Synchronizer
+from togglcmder.toggl.transport import Transport
+from togglcmder.toggl.types.workspace import Workspace
 
 
 # Helpers that don't fit anywhere else!
@@ -20,3 +32,170 @@ def retrieve_commands_from_context(context: dict) -> Commands:
     commands = context['commands']
     assert(isinstance(commands, Commands))
     return commands
+
+
+def retrieve_transport_from_context(context: dict) -> Transport:
+    transport = context['transport']
+    assert(isinstance(transport, Transport))
+    return transport
+
+
+def retrieve_synchronizer_from_context(context: dict) -> Synchronizer:
+    synchronizer = context['synchronizer']
+    assert(isinstance(synchronizer, Synchronizer))
+    return synchronizer
+
+
+def cache_freshness(context_obj: dict, resource: str, *, workspace_identifier: int = 0,
+                    since: Optional[datetime] = None) -> Freshness:
+    """
+    :param context_obj:
+    :param resource: workspaces, projects, tags or time_entries.
+    :param workspace_identifier: for resources synced per workspace.
+    :param since: for time entries, how far back the cache has to reach.
+    :return: how far the cached resource can be trusted, by the configured policy.
+    """
+    state = retrieve_cache_from_context(context_obj).retrieve_sync_state(resource, workspace_identifier)
+    if state and since and (not state.coverage_start or since < state.coverage_start):
+        # However fresh, it doesn't go back far enough.
+        state = None
+
+    return context_obj['freshness'].freshness(resource, state.last_sync if state else None)
+
+
+def sync_if_needed(context_obj: dict, resource: str, *args, workspace_identifier: int = 0,
+                   since: Optional[datetime] = None) -> None:
+    """
+    Syncs a resource before it is read from the cache, if it has to be. With
+    --sync it always is; otherwise it is only when the cache has expired, and
+    a stale cache is served while it is refreshed in the background.
+
+    :param context_obj:
+    :param resource: workspaces, projects, tags or time_entries.
+    :param args: what the synchronizer's sync_<resource> takes.
+    :param workspace_identifier: for resources synced per workspace.
+    :param since: for time entries, how far back the cache has to reach.
+    :return:
+    """
+    sync = getattr(retrieve_synchronizer_from_context(context_obj), f'sync_{resource}')
+    if context_obj['sync'] is True:
+        sync(*args)
+        return
+
+    freshness = cache_freshness(context_obj, resource, workspace_identifier=workspace_identifier, since=since)
+    if freshness == Freshness.EXPIRED:
+        try:
+            sync(*args)
+        except RequestException as e:
+            # Offline, say; what is cached is better than nothing.
+            logging.getLogger(__name__).error(e)
+            click.echo(click.style('WARNING', fg='yellow') +
+                       f': could not sync {resource.replace("_", " ")} with Toggl, showing what is cached.',
+                       err=True)
+    elif freshness == Freshness.STALE:
+        context_obj['revalidator'].request(resource, *args, key=(workspace_identifier,))
+
+
+def prefetch_if_needed(context_obj: dict, resource: str, workspaces: List[Workspace]) -> None:
+    """
+    Downloads the projects or tags of every workspace that sync_if_needed is
+    about to sync, all at once, so they aren't waited on one workspace at a
+    time. Stale and fresh workspaces are left to sync_if_needed.
+
+    :param context_obj:
+    :param resource: projects or tags.
+    :param workspaces:
+    :return:
+    """
+    expired = [workspace for workspace in workspaces
+               if context_obj['sync'] is True or
+               cache_freshness(context_obj, resource, workspace_identifier=workspace.identifier) == Freshness.EXPIRED]
+    if not expired:
+        return
+
+    try:
+        retrieve_synchronizer_from_context(context_obj).prefetch(
+            expired, projects=resource == 'projects', tags=resource == 'tags')
+    except RequestException as e:
+        # Each workspace is tried again, and reported, as it is synced.
+        logging.getLogger(__name__).debug(e)
+
+
+class LazyData(dict):
+    """
+    The data shared between a group and its subcommands. Groups register a
+    loader per key instead of filling the keys in up front; a key is loaded
+    the first time it is read and then kept for the rest of the invocation.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(LazyData, self).__init__(*args, **kwargs)
+        self.__loaders: Dict[str, Callable[[], Any]] = {}
+
+    def loader(self, key: str, load: Callable[[], Any]) -> None:
+        self.pop(key, None)
+        self.__loaders[key] = load
+
+    def load(self, *keys: str) -> None:
+        for key in keys:
+            self[key]
+
+    def __missing__(self, key: str) -> Any:
+        if key not in self.__loaders:
+            raise KeyError(key)
+        self[key] = self.__loaders.pop(key)()
+        return self[key]
+
+
+def needs(*keys: str):
+    """
+    Declares which keys of the context data a command uses. They are loaded
+    before the command runs; nothing else is loaded. Loading them may sync
+    with Toggl, so it is not wrapped in a transaction: each resource synced
+    is written in one of its own, and the cache is never locked while a
+    download is waiting on the network.
+
+    :param keys:
+    :return:
+    """
+    def decorator(command):
+        @functools.wraps(command)
+        def wrapper(*args, **kwargs):
+            context_obj = click.get_current_context().obj
+            context_obj['data'].load(*keys)
+            return command(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class EchoHandler(logging.Handler):
+    # Writes log records to whatever stderr the current command has, which
+    # inside the daemon is the one sent back to the client.
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            click.echo(self.format(record), err=True)
+        except Exception:
+            self.handleError(record)
+
+
+def enable_filter_trace(context: click.Context) -> None:
+    """
+    Reports each filter run by this command on stderr: how many items it was
+    given, how many it returned and how long it took. Tracing stops when the
+    command is done.
+
+    :param context:
+    :return:
+    """
+    logger = logging.getLogger(TRACE_LOGGER)
+    handler = EchoHandler()
+    handler.setFormatter(logging.Formatter('trace: %(message)s'))
+    level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+
+    def stop() -> None:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+
+    context.call_on_close(stop)
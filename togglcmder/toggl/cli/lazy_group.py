@@ -0,0 +1,43 @@
+import click
+import importlib
+from typing import Dict, List, Optional, Tuple
+
+
+class LazyGroup(click.Group):
+    """
+    A click group whose subcommands live in modules that are only imported
+    once the subcommand is actually invoked. Each subcommand is registered by
+    name with the "module:attribute" path of its command and the short help
+    shown in the group's --help, so listing them imports nothing either.
+    """
+
+    def __init__(self, *args, lazy_subcommands: Optional[Dict[str, Tuple[str, str]]] = None, **kwargs):
+        super(LazyGroup, self).__init__(*args, **kwargs)
+        self.__lazy_subcommands = dict(lazy_subcommands or {})
+
+    def list_commands(self, context: click.Context) -> List[str]:
+        return sorted(set(super(LazyGroup, self).list_commands(context)) | self.__lazy_subcommands.keys())
+
+    def get_command(self, context: click.Context, name: str) -> Optional[click.Command]:
+        if name in self.__lazy_subcommands and name not in self.commands:
+            path, _ = self.__lazy_subcommands[name]
+            module_name, attribute = path.split(':')
+            command = getattr(importlib.import_module(module_name), attribute)
+            assert(isinstance(command, click.Command))
+            self.add_command(command, name)
+        return super(LazyGroup, self).get_command(context, name)
+
+    def format_commands(self, context: click.Context, formatter: click.HelpFormatter) -> None:
+        rows = []
+        for name in self.list_commands(context):
+            if name in self.commands:
+                command = self.commands[name]
+                if command.hidden:
+                    continue
+                rows.append((name, command.get_short_help_str(formatter.width - 6 - len(name))))
+            else:
+                rows.append((name, self.__lazy_subcommands[name][1]))
+
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
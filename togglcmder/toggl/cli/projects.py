@@ -1,17 +1,17 @@
 import click
-from tabulate import tabulate
 import logging
 from typing import List, Optional
 
 from togglcmder.toggl.cli.workspaces \
-    import sync_or_retrieve_workspaces, retrieve_workspace_from_context
+    import register_workspace_loaders, retrieve_workspace_from_context
 
+from togglcmder.toggl.cli.helpers import needs
 from togglcmder.toggl.cli.helpers import retrieve_cache_from_context
 from togglcmder.toggl.cli.helpers import retrieve_commands_from_context
-from togglcmder.toggl.cli.helpers import retrieve_downloader_from_context
+from togglcmder.toggl.cli.helpers import prefetch_if_needed
+from togglcmder.toggl.cli.helpers import sync_if_needed
 
 from togglcmder.toggl.types.workspace import Workspace
-from togglcmder.toggl.filters.workspaces import Workspaces as WorkspaceFilter
 
 from togglcmder.toggl.types.project import Project
 from togglcmder.toggl.builders.project_builder import ProjectBuilder
@@ -21,20 +21,15 @@ from togglcmder.toggl.filters.projects import Projects as ProjectFilter
 
 def sync_or_retrieve_projects(context_obj: dict, workspace: Workspace) -> List[Project]:
     caching = retrieve_cache_from_context(context_obj)
-    downloader = retrieve_downloader_from_context(context_obj)
 
-    # Download any new projects if remote sync is enabled.
-    if context_obj['sync'] is True:
-        current_projects = downloader.download_projects(workspace)
-        if current_projects:
-            caching.update_project_cache(current_projects)
-    else:
-        # Otherwise we just pull from the local cache.
-        current_projects = caching.retrieve_project_cache()
+    # Download any changed projects if the cache is too old or sync is forced.
+    sync_if_needed(context_obj, 'projects', workspace, workspace_identifier=workspace.identifier)
 
-        if current_projects:
-            # Retrieval from DB doesn't filter on workspace, so we do that ourselves.
-            current_projects = ProjectFilter.filter_on_workspace(current_projects, workspace)
+    current_projects = caching.retrieve_project_cache()
+
+    if current_projects:
+        # Retrieval from DB doesn't filter on workspace, so we do that ourselves.
+        current_projects = ProjectFilter.filter_on_workspace(current_projects, workspace)
 
     return current_projects
 
@@ -52,26 +47,23 @@ def retrieve_project_from_context(context: dict) -> Optional[Project]:
 def projects(context: click.Context, workspace: str):
     workspace_name = workspace or context.obj['config']['default_workspace']
 
-    workspaces = sync_or_retrieve_workspaces(context.obj)
-
-    if workspace_name:
-        workspaces = WorkspaceFilter.filter_on_name(
-            workspaces,
-            workspace_name)
+    # Nothing is loaded here; subcommands declare what they need.
+    register_workspace_loaders(context.obj, workspace_name)
 
-        workspaces_found = len(workspaces)
-        if workspaces_found == 1:
-            context.obj['data']['workspace'] = workspaces[0]
+    def load_projects() -> List[Project]:
+        workspaces = context.obj['data']['workspaces']
 
-    context.obj['data']['workspaces'] = workspaces
+        # Download every workspace's projects at once before looping over them.
+        prefetch_if_needed(context.obj, 'projects', workspaces)
 
-    current_projects = []
-    for current_workspace in workspaces:
-        synced_projects = sync_or_retrieve_projects(context.obj, current_workspace)
-        if synced_projects:
-            current_projects.extend(synced_projects)
+        current_projects = []
+        for current_workspace in workspaces:
+            synced_projects = sync_or_retrieve_projects(context.obj, current_workspace)
+            if synced_projects:
+                current_projects.extend(synced_projects)
+        return current_projects
 
-    context.obj['data']['projects'] = current_projects
+    context.obj['data'].loader('projects', load_projects)
 
 
 @projects.command('add')
@@ -80,6 +72,7 @@ def projects(context: click.Context, workspace: str):
 @click.option('--color',
               type=click.Choice([val.__str__() for val in Project.Color]),
               default=Project.Color.BLACK.name.lower())
+@needs('workspace', 'projects')
 @click.pass_context
 def project_add(context: click.Context, name: str, color: str):
     workspace = retrieve_workspace_from_context(context.obj)
@@ -138,6 +131,7 @@ def project_add(context: click.Context, name: str, color: str):
               is_flag=True,
               default=False,
               show_default=True)
+@needs('workspace', 'projects')
 @click.pass_context
 def project_delete(context: click.Context, name: str, color: str,
                    multiple: bool):
@@ -191,10 +185,11 @@ def project_delete(context: click.Context, name: str, color: str,
     try:
         if len(current_projects) > 1:
             commands.delete_projects(current_projects)
-            for project in current_projects:
-                cache.remove_project_from_cache(project)
-                click.echo(click.style('SUCCESS', fg='green') +
-                           f': deleted project({project.name})!')
+            with cache.transaction():
+                for project in current_projects:
+                    cache.remove_project_from_cache(project)
+                    click.echo(click.style('SUCCESS', fg='green') +
+                               f': deleted project({project.name})!')
         else:
             commands.delete_project(current_projects[0])
             cache.remove_project_from_cache(current_projects[0])
@@ -219,6 +214,7 @@ def project_delete(context: click.Context, name: str, color: str,
               is_flag=True,
               default=False,
               show_default=True)
+@needs('workspace', 'projects')
 @click.pass_context
 def project_update(context: click.Context, old_name: str, old_color: str,
                    new_name: str, new_color: str, multiple: bool):
@@ -306,6 +302,7 @@ def project_update(context: click.Context, old_name: str, old_color: str,
               type=click.Choice([val.__str__() for val in ProjectView.headers()]),
               default=ProjectView.headers()[0],
               show_default=True)
+@needs('workspaces', 'projects')
 @click.pass_context
 def project_list(context: click.Context, name: str, color: str, sort_by: str):
     # Workspaces are already filtered if needed, otherwise this will
@@ -356,6 +353,7 @@ def project_list(context: click.Context, name: str, color: str, sort_by: str):
                 break
 
     rows = sorted(rows, key=lambda key: key[sort_by_index], reverse=True)
+    from tabulate import tabulate
     click.echo_via_pager(tabulate(
         rows,
         headers=ProjectView.headers(),
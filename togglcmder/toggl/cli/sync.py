@@ -0,0 +1,94 @@
+import click
+import os
+import time
+from typing import Dict, List, Optional
+
+from togglcmder.toggl.cli.time_entries import default_time_entry_window
+
+from togglcmder.toggl.cli.helpers import retrieve_cache_from_context
+from togglcmder.toggl.cli.helpers import retrieve_transport_from_context
+
+from togglcmder.toggl.downloader import Downloader
+from togglcmder.toggl.refresher import Refresher
+from togglcmder.toggl.synchronizer import Synchronizer
+
+
+def retrieve_refresher_from_context(context_obj: dict) -> Refresher:
+    # The daemon keeps the refresher, and with it the schedule, between runs.
+    warm = context_obj['warm']
+    if warm is not None and 'refresher' in warm:
+        context_obj.setdefault('refresher', warm['refresher'])
+
+    if 'refresher' not in context_obj:
+        context_obj['refresher'] = Refresher(
+            lock_path=os.path.join(click.get_app_dir('togglcmder'), 'sync.lock'),
+            settings=context_obj['config']['refresh'])
+        if warm is not None:
+            warm['refresher'] = context_obj['refresher']
+    return context_obj['refresher']
+
+
+def refresh(context_obj: dict, resources: Optional[List[str]] = None) -> Optional[Dict[str, int]]:
+    config = context_obj['config']
+    cache = retrieve_cache_from_context(context_obj)
+
+    # What a synchronizer and downloader remember only holds for one round.
+    synchronizer = Synchronizer(cache,
+                                Downloader(retrieve_transport_from_context(context_obj),
+                                           window=config['time_entry_window'],
+                                           workers=config['download_workers']),
+                                workers=config['download_workers'])
+
+    start, stop = default_time_entry_window(context_obj)
+    return retrieve_refresher_from_context(context_obj).refresh(
+        cache, synchronizer, start, stop, resources=resources)
+
+
+@click.command(
+    help='Bring the local cache up to date with Toggl. With --watch, keep it up to date, '
+         'refreshing each resource on the intervals in the "refresh" configuration.'
+)
+@click.option('--watch',
+              is_flag=True,
+              default=False,
+              help='Keep refreshing until interrupted.')
+@click.option('--due',
+              is_flag=True,
+              default=False,
+              hidden=True,
+              help='Only refresh what is due, quietly. This is what the daemon runs.')
+@click.pass_context
+def sync(context: click.Context, watch: bool, due: bool):
+    if due:
+        refresh(context.obj)
+        return
+
+    if not watch:
+        changed = refresh(context.obj, list(Refresher.RESOURCES))
+        if changed is None:
+            click.echo(click.style('WARNING', fg='yellow') +
+                       ': another sync is already running.')
+            exit(1)
+
+        failed = retrieve_refresher_from_context(context.obj).failed
+        if failed:
+            click.echo(click.style('ERROR', fg='red') +
+                       f': failed to sync {", ".join(failed)}. Check logs for more information.')
+            exit(1)
+
+        click.echo(click.style('SUCCESS', fg='green') +
+                   f': cache is up to date ({sum(changed.values())} changed).')
+        return
+
+    refresher = retrieve_refresher_from_context(context.obj)
+    try:
+        while True:
+            changed = refresh(context.obj)
+            if changed and any(changed.values()):
+                click.echo(f'{time.strftime("%H:%M:%S")}: ' +
+                           ', '.join(f'{count} {resource}' for resource, count in changed.items() if count) +
+                           ' changed')
+            # A second at least, should another process hold the lock.
+            time.sleep(max(refresher.next_due(), 1.0))
+    except KeyboardInterrupt:
+        pass
@@ -1,20 +1,20 @@
 import click
-from tabulate import tabulate
 import logging
 from typing import List
 
 from togglcmder.toggl.cli.workspaces \
-    import sync_or_retrieve_workspaces, retrieve_workspace_from_context
+    import register_workspace_loaders, retrieve_workspace_from_context
 
+from togglcmder.toggl.cli.helpers import needs
 from togglcmder.toggl.cli.helpers import retrieve_cache_from_context
 from togglcmder.toggl.cli.helpers import retrieve_commands_from_context
-from togglcmder.toggl.cli.helpers import retrieve_downloader_from_context
+from togglcmder.toggl.cli.helpers import prefetch_if_needed
+from togglcmder.toggl.cli.helpers import sync_if_needed
 
 from togglcmder.toggl.caching import Caching
 from togglcmder.toggl.commands import Commands
 
 from togglcmder.toggl.types.workspace import Workspace
-from togglcmder.toggl.filters.workspaces import Workspaces as WorkspaceFilter
 
 from togglcmder.toggl.types.tag import Tag
 from togglcmder.toggl.builders.tag_builder import TagBuilder
@@ -24,20 +24,15 @@ from togglcmder.toggl.filters.tags import Tags as TagFilter
 
 def sync_or_retrieve_tags(context_obj: dict, workspace: Workspace) -> List[Tag]:
     caching = retrieve_cache_from_context(context_obj)
-    downloader = retrieve_downloader_from_context(context_obj)
 
-    # Download any new tags if remote sync is enabled.
-    if context_obj['sync'] is True:
-        current_tags = downloader.download_tags(workspace)
-        if current_tags:
-            caching.update_tag_cache(current_tags)
-    else:
-        # Otherwise we just pull from the local cache.
-        current_tags = caching.retrieve_tag_cache()
+    # Download any changed tags if the cache is too old or sync is forced.
+    sync_if_needed(context_obj, 'tags', workspace, workspace_identifier=workspace.identifier)
 
-        if current_tags:
-            # Retrieval from the DB doesn't filter on workspace, so we do that ourselves.
-            current_tags = TagFilter.filter_on_workspace(current_tags, workspace)
+    current_tags = caching.retrieve_tag_cache()
+
+    if current_tags:
+        # Retrieval from the DB doesn't filter on workspace, so we do that ourselves.
+        current_tags = TagFilter.filter_on_workspace(current_tags, workspace)
 
     return current_tags
 
@@ -50,32 +45,29 @@ def sync_or_retrieve_tags(context_obj: dict, workspace: Workspace) -> List[Tag]:
 def tags(context: click.Context, workspace: str):
     workspace_name = workspace or context.obj['config']['default_workspace']
 
-    workspaces = sync_or_retrieve_workspaces(context.obj)
+    # Nothing is loaded here; subcommands declare what they need.
+    register_workspace_loaders(context.obj, workspace_name)
 
-    if workspace_name:
-        workspaces = WorkspaceFilter.filter_on_name(
-            workspaces,
-            workspace_name
-        )
-
-        workspaces_found = len(workspaces)
-        if workspaces_found == 1:
-            context.obj['data']['workspace'] = workspaces[0]
+    def load_tags() -> List[Tag]:
+        workspaces = context.obj['data']['workspaces']
 
-    context.obj['data']['workspaces'] = workspaces
+        # Download every workspace's tags at once before looping over them.
+        prefetch_if_needed(context.obj, 'tags', workspaces)
 
-    current_tags = []
-    for current_workspace in workspaces:
-        synced_tags = sync_or_retrieve_tags(context.obj, current_workspace)
-        if synced_tags:
-            current_tags.extend(synced_tags)
+        current_tags = []
+        for current_workspace in workspaces:
+            synced_tags = sync_or_retrieve_tags(context.obj, current_workspace)
+            if synced_tags:
+                current_tags.extend(synced_tags)
+        return current_tags
 
-    context.obj['data']['tags'] = current_tags
+    context.obj['data'].loader('tags', load_tags)
 
 
 @tags.command('add')
 @click.option('--name',
               required=True)
+@needs('workspace', 'tags')
 @click.pass_context
 def tag_add(context: click.Context, name: str):
     workspace = retrieve_workspace_from_context(context.obj)
@@ -128,6 +120,7 @@ def tag_add(context: click.Context, name: str):
               is_flag=True,
               default=False,
               show_default=True)
+@needs('workspace', 'tags')
 @click.pass_context
 def tag_delete(context: click.Context, name: str, multiple: bool):
     workspace = retrieve_workspace_from_context(context.obj)
@@ -190,6 +183,7 @@ def tag_delete(context: click.Context, name: str, multiple: bool):
               required=True)
 @click.option('--new-name',
               required=True)
+@needs('workspace', 'tags')
 @click.pass_context
 def tag_update(context: click.Context, old_name: str, new_name: str):
     workspace = retrieve_workspace_from_context(context.obj)
@@ -249,6 +243,7 @@ def tag_update(context: click.Context, old_name: str, new_name: str):
               type=click.Choice([val.__str__() for val in TagView.headers()]),
               default=TagView.headers()[0],
               show_default=True)
+@needs('workspaces', 'tags')
 @click.pass_context
 def tag_list(context: click.Context, name: str, sort_by: str):
     workspaces = context.obj['data']['workspaces']
@@ -291,6 +286,7 @@ def tag_list(context: click.Context, name: str, sort_by: str):
                 break
 
     rows = sorted(rows, key=lambda key: key[sort_by_index], reverse=True)
+    from tabulate import tabulate
     click.echo_via_pager(tabulate(
         rows,
         headers=TagView.headers(),
@@ -1,25 +1,26 @@
 import re
 import click
-from tabulate import tabulate
 import logging
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from requests.exceptions import HTTPError
-import functools
 
 from datetime import datetime, timedelta
 from tzlocal import get_localzone
 
 from togglcmder.toggl.cli.workspaces \
-    import sync_or_retrieve_workspaces, retrieve_workspace_from_context
+    import register_workspace_loaders, retrieve_workspace_from_context
 
 from togglcmder.toggl.cli.projects \
     import sync_or_retrieve_projects, retrieve_project_from_context
 
 from togglcmder.toggl.cli.tags import sync_or_retrieve_tags
 
+from togglcmder.toggl.cli.helpers import needs
 from togglcmder.toggl.cli.helpers import retrieve_cache_from_context
 from togglcmder.toggl.cli.helpers import retrieve_commands_from_context
 from togglcmder.toggl.cli.helpers import retrieve_downloader_from_context
+from togglcmder.toggl.cli.helpers import prefetch_if_needed
+from togglcmder.toggl.cli.helpers import sync_if_needed
 
 from togglcmder.toggl.types.workspace import Workspace
 from togglcmder.toggl.filters.workspaces import Workspaces as WorkspaceFilter
@@ -33,7 +34,10 @@ from togglcmder.toggl.filters.tags import Tags as TagFilter
 from togglcmder.toggl.types.time_entry import TimeEntry
 from togglcmder.toggl.builders.time_entry_builder import TimeEntryBuilder
 from togglcmder.toggl.views.time_entry import TimeEntry as TimeEntryView
+from togglcmder.toggl.views.summary import Summary as SummaryView
 from togglcmder.toggl.filters.time_entries import TimeEntries as TimeEntryFilter
+from togglcmder.toggl.aggregators.time_entries import TimeEntries as TimeEntryAggregator
+from togglcmder.toggl.indexes.time_entries import TimeEntryIndex
 
 
 def validated_time(date_time: str) -> datetime:
@@ -59,30 +63,29 @@ def validated_time(date_time: str) -> datetime:
         raise RuntimeError(f"Not a valid time: '{date_time}'.")
 
 
+def default_time_entry_window(context_obj: dict) -> Tuple[datetime, datetime]:
+    config = context_obj['config']
+    start = get_localzone().localize(
+        datetime.now() - timedelta(days=config['default_time_entry_window_start_days']))
+    stop = get_localzone().localize(
+        datetime.now() - timedelta(days=config['default_time_entry_window_stop_days']))
+    return start, stop
+
+
 def sync_or_retrieve_time_entries(context_obj: dict, workspace: Workspace, start: datetime, stop: datetime, *,
                                   project: Optional[Project] = None) -> List[TimeEntry]:
     caching = retrieve_cache_from_context(context_obj)
-    downloader = retrieve_downloader_from_context(context_obj)
-
-    # Download any new time entries if remote sync is enabled.
-    if context_obj['sync'] is True:
-        current_time_entries = downloader.download_time_entries(start, stop)
-        if current_time_entries:
-            caching.update_time_entry_cache(current_time_entries)
-    else:
-        # Otherwise we just pull from the local cache.
-        current_time_entries = caching.retrieve_time_entry_cache()
-
-    # Neither downloading from remote nor pulling from local cache does any filtering, so let's do that.
-    current_time_entries = TimeEntryFilter.filter_on_workspace(current_time_entries, workspace)
-
-    # It also doesn't filter on start/stop, so let's do that too.
-    current_time_entries = TimeEntryFilter.filter_on_date_range(current_time_entries, start, stop)
 
-    # Time entries _can_ be filtered on project if it is provided.
-    current_time_entries = TimeEntryFilter.filter_on_project(current_time_entries, project)
+    # Download any changed time entries if the cache is too old, doesn't
+    # reach back far enough, or sync is forced.
+    sync_if_needed(context_obj, 'time_entries', start, stop, since=start)
 
-    return current_time_entries
+    # Either way, pull the matching entries from the local cache.
+    return caching.query_time_entries(
+        workspace.identifier if workspace else None,
+        start,
+        stop,
+        project_identifier=project.identifier if project else None)
 
 
 @click.group(
@@ -105,90 +108,101 @@ def timers(context: click.Context,
     workspace_name = workspace or context.obj['config']['default_workspace']
     project_name = project or context.obj['config']['default_project']
 
-    workspaces = sync_or_retrieve_workspaces(context.obj)
-    if workspace_name:
-        # If a workspace name is provided, default or otherwise, filter on it.
-        workspaces = WorkspaceFilter.filter_on_name(
-            workspaces,
-            workspace_name)
-
-        # If a single workspace was found we can store it.
-        workspaces_found = len(workspaces)
-        if workspaces_found == 1:
-            context.obj['data']['workspace'] = workspaces[0]
-
-    context.obj['data']['workspaces'] = workspaces
-
-    projects = []
-    # Whether or not we have workspaces filtered, we can download all projects.
-    for current_workspace in workspaces:
-        synced_projects = sync_or_retrieve_projects(context.obj, current_workspace)
-        if synced_projects:
-            projects.extend(synced_projects)
-
-    if project_name and not projects:
-        # No projects exist in this workspace, but the user requested to filter on one.
-        click.echo(click.style('WARNING', fg='yellow') +
-                   f': no projects exist in this workspace!')
-        # We must exit because returning would just go to the next handler
-        # and start a timer regardless.
-        exit(1)
+    data = context.obj['data']
 
-    if projects and project_name:
-        # If there is a specified project name then we can filter on it.
-        projects = ProjectFilter.filter_on_name(
-            projects,
-            project_name)
-        if not projects:
+    # Nothing is loaded here; each subcommand declares what it needs and that
+    # is loaded on first use, so commands like stop never touch the cache.
+    register_workspace_loaders(context.obj, workspace_name)
+
+    def load_projects() -> List[Project]:
+        workspaces = data['workspaces']
+
+        # Download every workspace's projects at once before looping over them.
+        prefetch_if_needed(context.obj, 'projects', workspaces)
+
+        projects = []
+        # Whether or not we have workspaces filtered, we can download all projects.
+        for current_workspace in workspaces:
+            synced_projects = sync_or_retrieve_projects(context.obj, current_workspace)
+            if synced_projects:
+                projects.extend(synced_projects)
+
+        if project_name and not projects:
+            # No projects exist in this workspace, but the user requested to filter on one.
             click.echo(click.style('WARNING', fg='yellow') +
-                       f': no projects exist with this name("{project_name}")'
-                       f' in the current workspace!')
+                       f': no projects exist in this workspace!')
             # We must exit because returning would just go to the next handler
             # and start a timer regardless.
             exit(1)
 
+        if projects and project_name:
+            # If there is a specified project name then we can filter on it.
+            projects = ProjectFilter.filter_on_name(
+                projects,
+                project_name)
+            if not projects:
+                click.echo(click.style('WARNING', fg='yellow') +
+                           f': no projects exist with this name("{project_name}")'
+                           f' in the current workspace!')
+                # We must exit because returning would just go to the next handler
+                # and start a timer regardless.
+                exit(1)
+        return projects
+
+    def load_project() -> Optional[Project]:
         # If a single project was found, we can store it too.
-        projects_found = len(projects)
-        if projects_found == 1:
-            context.obj['data']['project'] = projects[0]
-    context.obj['data']['projects'] = projects
-
-    tags = []
-    for current_workspace in workspaces:
-        synced_tags = sync_or_retrieve_tags(context.obj, current_workspace)
-        if synced_tags:
-            tags.extend(synced_tags)
-    context.obj['data']['tags'] = tags
-
-    # Use our default window settings to download time entry updates.
-    if not download_start:
-        then = get_localzone().localize(
-            datetime.now() - timedelta(days=context.obj['config']['default_time_entry_window_start_days']))
-    else:
-        then = download_start
+        return data['projects'][0] if project_name and len(data['projects']) == 1 else None
 
-    if not download_stop:
-        now = get_localzone().localize(
-            datetime.now() - timedelta(days=context.obj['config']['default_time_entry_window_stop_days']))
-    else:
-        now = download_stop
-
-    time_entries = []
-    for current_workspace in workspaces:
-        if project_name:
-            for current_project in projects:
-                if current_project.workspace_identifier == current_workspace.identifier:
-                    synced_entries = sync_or_retrieve_time_entries(
-                        context.obj, current_workspace, then, now, project=current_project)
-                    if synced_entries:
-                        time_entries.extend(synced_entries)
-        else:
+    def load_tags() -> List[Tag]:
+        workspaces = data['workspaces']
+
+        # Download every workspace's tags at once before looping over them.
+        prefetch_if_needed(context.obj, 'tags', workspaces)
+
+        tags = []
+        for current_workspace in workspaces:
+            synced_tags = sync_or_retrieve_tags(context.obj, current_workspace)
+            if synced_tags:
+                tags.extend(synced_tags)
+        return tags
+
+    def load_window() -> Tuple[datetime, datetime]:
+        # Use our default window settings to download time entry updates.
+        default_start, default_stop = default_time_entry_window(context.obj)
+        return download_start or default_start, download_stop or default_stop
+
+    def load_project_identifiers() -> Optional[List[int]]:
+        # Only set when filtering on a project.
+        return [current_project.identifier for current_project in data['projects']] if project_name else None
+
+    def load_time_entries() -> List[TimeEntry]:
+        then, now = data['window']
+
+        time_entries = []
+        for current_workspace in data['workspaces']:
             synced_entries = sync_or_retrieve_time_entries(
                 context.obj, current_workspace, then, now)
+            if synced_entries and project_name:
+                # The window is fetched once per workspace and then split up
+                # by the matching projects here, rather than once per project.
+                project_identifiers = {
+                    current_project.identifier for current_project in data['projects']
+                    if current_project.workspace_identifier == current_workspace.identifier
+                }
+                synced_entries = [entry for entry in synced_entries
+                                  if entry.project_identifier in project_identifiers]
             if synced_entries:
                 time_entries.extend(synced_entries)
+        return time_entries
 
-    context.obj['data']['time_entries'] = time_entries
+    data.loader('projects', load_projects)
+    data.loader('project', load_project)
+    data.loader('tags', load_tags)
+    data.loader('window', load_window)
+    data.loader('project_identifiers', load_project_identifiers)
+    data.loader('time_entries', load_time_entries)
+    # Built once, for the subcommands that look the entries up more than once.
+    data.loader('time_entry_index', lambda: TimeEntryIndex(data['time_entries']))
 
 
 @timers.command(
@@ -208,6 +222,7 @@ def timers(context: click.Context,
               help='The duration of this time entry. Stop time will be calculated if this is provided.',
               type=int)
 @click.option('--tags')
+@needs('workspace', 'project', 'time_entries')
 @click.pass_context
 def timer_add(context: click.Context,
               description: str,
@@ -287,6 +302,7 @@ def timer_add(context: click.Context,
               default=False,
               show_default=True)
 @click.option('--tags')
+@needs('workspace', 'tags', 'time_entry_index')
 @click.pass_context
 def timer_delete(context: click.Context, description: str, multiple: bool, tags: str):
     workspace = retrieve_workspace_from_context(context.obj)
@@ -303,12 +319,11 @@ def timer_delete(context: click.Context, description: str, multiple: bool, tags:
                    f': either description or tags must be specified when deleting a timer.')
         return
 
-    time_entries = context.obj['data']['time_entries']
+    time_entry_index = context.obj['data']['time_entry_index']
+    time_entries = time_entry_index.time_entries
 
     if description:
-        time_entries = TimeEntryFilter.filter_on_description(
-            time_entries, description
-        )
+        time_entries = time_entry_index.query(description=description)
         if not time_entries:
             click.echo(click.style('WARNING', fg='yellow') +
                        f': no time entries exist with the specified description.')
@@ -324,9 +339,9 @@ def timer_delete(context: click.Context, description: str, multiple: bool, tags:
                        f': no tags exist with the specified names.')
             return
 
-        time_entries = TimeEntryFilter.filter_on_any_tags(
-            time_entries, current_tags
-        )
+        # The entries with these tags are looked up first, and only those
+        # are matched against the description.
+        time_entries = time_entry_index.query(description=description, any_tags=current_tags)
         if not time_entries:
             click.echo(click.style('WARNING', fg='yellow') +
                        f': no time entries exist with the specified tags.')
@@ -342,17 +357,22 @@ def timer_delete(context: click.Context, description: str, multiple: bool, tags:
     caching = retrieve_cache_from_context(context.obj)
     commands = retrieve_commands_from_context(context.obj)
 
-    try:
-        for entry in time_entries:
-            commands.delete_time_entry(entry)
-            caching.remove_time_entry_from_cache(entry)
+    result = commands.delete_time_entries([entry.identifier for entry in time_entries])
+
+    # Whatever the server deleted leaves the cache in one go.
+    with caching.transaction():
+        caching.remove_time_entries_from_cache(result.deleted)
+
+    deleted = set(result.deleted)
+    for entry in time_entries:
+        if entry.identifier in deleted:
             click.echo(click.style('SUCCESS', fg='green') +
                        f': deleted timer({entry.description})!')
 
-    except HTTPError as e:
-        logging.getLogger(__name__).error(e)
+    if result.failed:
         click.echo(click.style('ERROR', fg='red') +
-                   f': failed to delete the timer(s). An exception has been logged;'
+                   f': failed to delete {len(result.failed)} timer(s) '
+                   f'({", ".join(map(str, result.failed))}). An exception has been logged;'
                    ' check the logs for more information.')
 
 
@@ -365,13 +385,19 @@ def timer_delete(context: click.Context, description: str, multiple: bool, tags:
 @click.option('--old-tags')
 @click.option('--add-tags')
 @click.option('--remove-tags')
-@click.option('--new-start-time')
-@click.option('--new-duration')
-@click.option('--new-stop-time')
+@click.option('--new-start-time',
+              type=validated_time,
+              help='This can be now[-/+[dhms]] or an iso formatted time string.')
+@click.option('--new-duration',
+              type=int)
+@click.option('--new-stop-time',
+              type=validated_time,
+              help='This can be now[-/+[dhms]] or an iso formatted time string.')
 @click.option('--multiple',
               is_flag=True,
               default=False,
               show_default=True)
+@needs('workspace', 'projects', 'tags', 'time_entry_index')
 @click.pass_context
 def timer_update(context: click.Context,
                  old_description: str,
@@ -398,16 +424,21 @@ def timer_update(context: click.Context,
                    f': either description or tags must be specified when updating a timer.')
         return
 
-    time_entries = context.obj['data']['time_entries']
+    if not (new_description or new_project or new_start_time or new_duration or new_stop_time or
+            add_tags or remove_tags):
+        click.echo(click.style('ERROR', fg='red') +
+                   ': nothing to update; specify a new field, --add-tags or --remove-tags.')
+        return
+
+    time_entry_index = context.obj['data']['time_entry_index']
+    time_entries = time_entry_index.time_entries
     if not time_entries:
         click.echo(click.style('ERROR', fg='red') +
                    f': no time entries to update in this workspace({workspace.name}).')
         return
 
     if old_description:
-        time_entries = TimeEntryFilter.filter_on_description(
-            time_entries, old_description
-        )
+        time_entries = time_entry_index.query(description=old_description)
         if not time_entries:
             click.echo(click.style('WARNING', fg='yellow') +
                        f': no time entries exist with the specified description.')
@@ -423,9 +454,7 @@ def timer_update(context: click.Context,
                        f': no tags exist with the specified names.')
             return
 
-        time_entries = TimeEntryFilter.filter_on_any_tags(
-            time_entries, current_tags
-        )
+        time_entries = time_entry_index.query(description=old_description, any_tags=current_tags)
         if not time_entries:
             click.echo(click.style('WARNING', fg='yellow') +
                        f': no time entries exist with the specified tags.')
@@ -479,42 +508,37 @@ def timer_update(context: click.Context,
                        f': no tags found with the specified names in --remove-tags.')
             return
 
-    entries: List[TimeEntry] = []
-    for time_entry in time_entries:
-        time_entry_builder = TimeEntryBuilder(time_entry)
-        if new_description:
-            time_entry_builder.description(new_description)
-        if new_project:
-            time_entry_builder.project_identifier(new_specified_project.identifier)
-        if add_tags:
-            time_entry_builder.add_tags([tag.name for tag in additional_tags])
-        if remove_tags:
-            time_entry_builder.remove_tags([tag.name for tag in removed_tags])
-        if new_start_time:
-            time_entry_builder.start_time(dt=new_start_time)
-        if new_duration:
-            time_entry_builder.duration(new_duration)
-        if new_stop_time:
-            time_entry_builder.stop_time(dt=new_stop_time)
-        entries.append(time_entry_builder.build())
-
     caching = retrieve_cache_from_context(context.obj)
     commands = retrieve_commands_from_context(context.obj)
 
-    try:
-        updated_entries: List[TimeEntry] = []
-        for entry in entries:
-            updated_entry = commands.update_completed_time_entry(entry)
-            updated_entries.append(updated_entry)
+    # Every matching entry gets the same change, so they are all updated
+    # together instead of one request per entry.
+    result = commands.update_time_entries(
+        time_entries,
+        description=new_description or None,
+        project=new_specified_project,
+        start_time=new_start_time,
+        stop_time=new_stop_time,
+        duration=new_duration or None,
+        add_tags=[tag.name for tag in additional_tags] if additional_tags else None,
+        remove_tags=[tag.name for tag in removed_tags] if removed_tags else None)
+
+    # Whatever the server updated goes into the cache, even if some of the
+    # requests failed.
+    if result.updated:
+        caching.update_time_entry_cache(result.updated)
+
+    failed = set(result.failed)
+    for updated_entry in result.updated:
+        if updated_entry.identifier not in failed:
             click.echo(click.style('SUCCESS', fg='green') +
                        f': updated time entry({updated_entry.description}) in '
                        f' workspace({workspace.name})!')
-        caching.update_time_entry_cache(updated_entries)
 
-    except HTTPError as e:
-        logging.getLogger(__name__).error(e)
+    if result.failed:
         click.echo(click.style('ERROR', fg='red') +
-                   f': failed to update the timer(s). An exception has been logged;'
+                   f': failed to update {len(result.failed)} timer(s) '
+                   f'({", ".join(map(str, result.failed))}). An exception has been logged;'
                    ' check the logs for more information.')
 
 
@@ -525,6 +549,7 @@ def timer_update(context: click.Context,
                      'be used. If there are no defaults, an error will be issued.')
 @click.option('--description')
 @click.option('--tags')
+@needs('workspace', 'project', 'tags')
 @click.pass_context
 def timer_start(context: click.Context, description: str, tags: str):
     time_entry_builder = TimeEntryBuilder()
@@ -578,22 +603,45 @@ def timer_start(context: click.Context, description: str, tags: str):
                    ' check the logs for more information.')
 
 
+def stop_running_time_entry(context_obj: dict) -> Optional[TimeEntry]:
+    caching = retrieve_cache_from_context(context_obj)
+    commands = retrieve_commands_from_context(context_obj)
+
+    # The timer we last saw running can be stopped straight away, which is
+    # the only request needed when nothing else has started a timer since.
+    tracked = caching.retrieve_running_time_entry_cache()
+    if tracked:
+        requested = datetime.now(tz=get_localzone())
+        try:
+            entry = commands.stop_time_entry_by_identifier(tracked.identifier)
+            # It was already stopped (or isn't the same entry anymore), so
+            # some other timer may be the one running.
+            stopped_already = entry.stop_time and entry.stop_time < requested - timedelta(minutes=1)
+            if entry.start_time == tracked.start_time and not stopped_already:
+                return entry
+            caching.update_time_entry_cache([entry])
+        except HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+        caching.remove_running_time_entry_from_cache()
+
+    entry = retrieve_downloader_from_context(context_obj).get_current_time_entry()
+    if entry:
+        return commands.stop_time_entry(entry)
+
+
 @timers.command('stop',
                 help='Stop the current running timer, if one exists.')
 @click.pass_context
 def timer_stop(context: click.Context):
-    downloader = retrieve_downloader_from_context(context.obj)
-    entry = downloader.get_current_time_entry()
-
-    if not entry:
-        click.echo('No entry is currently running.')
-        return
-
-    commands = retrieve_commands_from_context(context.obj)
     caching = retrieve_cache_from_context(context.obj)
 
     try:
-        entry = commands.stop_time_entry(entry)
+        entry = stop_running_time_entry(context.obj)
+        if not entry:
+            click.echo('No entry is currently running.')
+            return
+
         caching.update_time_entry_cache([entry])
         click.echo(click.style('SUCCESS', fg='green') +
                    f': stopped the current running timer({entry.description}).')
@@ -607,6 +655,7 @@ def timer_stop(context: click.Context):
 
 @timers.command('current',
                 help='Get the current running timer, if one exists.')
+@needs('workspaces', 'projects')
 @click.pass_context
 def timer_current(context: click.Context):
     downloader = retrieve_downloader_from_context(context.obj)
@@ -635,6 +684,7 @@ def timer_current(context: click.Context):
                 [entry],
                 project,
                 workspace)
+            from tabulate import tabulate
             click.echo_via_pager(tabulate(
                 time_entry_view.values_sorted(),
                 headers=TimeEntryView.headers(),
@@ -651,6 +701,7 @@ def timer_current(context: click.Context):
                 short_help='Resume the most recent timer.',
                 help='Look through the list of timers, and resume the most recent one, '
                      'regardless of project or workspace.')
+@needs('time_entries')
 @click.pass_context
 def timer_resume(context: click.Context):
     time_entries = context.obj['data']['time_entries']
@@ -690,17 +741,16 @@ def timer_resume(context: click.Context):
               is_flag=True,
               default=False,
               show_default=True)
+@needs('workspaces', 'projects', 'time_entry_index')
 @click.pass_context
 def timer_list(context: click.Context, description: str, sort_by: str, noreduce: bool):
     workspaces = context.obj['data']['workspaces']
     projects = context.obj['data']['projects']
-    time_entries = context.obj['data']['time_entries']
+    time_entry_index = context.obj['data']['time_entry_index']
 
     # We can do a quick filter on descriptions, but if none is provided, it is
     # simply ignored.
-    time_entries = TimeEntryFilter.filter_on_description(
-        time_entries, description
-    )
+    time_entries = time_entry_index.query(description=description)
 
     # Since the description is ignored, if there are no time entries at this
     # point, there are no entries in the workspace at all (at least for the
@@ -717,75 +767,25 @@ def timer_list(context: click.Context, description: str, sort_by: str, noreduce:
     # time is spent on each project. Typically, there will be many entries in the time span
     # of 5 days (the default window for entries).
     if not noreduce:
-        for current_workspace in workspaces:
-            # Filter on the current workspace.
-            workspace_entries = TimeEntryFilter.filter_on_workspace(
-                time_entries, current_workspace)
-
-            # If there are no entries in this workspace, skip.
-            if not workspace_entries:
-                continue
-
-            for project in projects:
-                # Get the entries for the current project.
-                project_entries = TimeEntryFilter.filter_on_project(
-                    workspace_entries, project)
-
-                # Skip ahead if there are no entries.
-                if not project_entries:
-                    continue
-
-                # Get any description for the given project, and then remove duplicates.
-                descriptions = [entry.description for entry in project_entries]
-                descriptions = list(dict.fromkeys(descriptions))
-
-                for description in descriptions:
-                    # The entries matching this description for this project:
-                    description_entries = TimeEntryFilter.filter_on_description(
-                        project_entries, description)
-
-                    # Skip ahead if there are no entries.
-                    if not description_entries:
-                        continue
-
-                    # Sort entries according to last update so that we preserve the most recent update timestamp.
-                    sorted_description_entries = sorted(
-                        description_entries,
-                        key=lambda entry: entry.last_updated,
-                        reverse=True)
-
-                    # Reduce the found entries to a single entry with the total duration.
-                    entry = functools.reduce(
-                        lambda x, y: TimeEntryBuilder(x).duration(x.duration + y.duration).build(),
-                        sorted_description_entries)
-
-                    # Add the entry to our output.
-                    rows.extend(
-                        TimeEntryView([entry], project, current_workspace).values()
-                    )
-
-            # Check for time entries without a project, and just list them as-is.
-            # Reducing these might not be helpful; if there is no project context given
-            # when starting timers, there is no context under which to reduce them down
-            # to a single entry (for example, trying to find out how much time was spent
-            # on a project).
-            for entry in TimeEntryFilter.filter_on_workspace(time_entries, current_workspace):
-                if entry.project_identifier is None:
-                    rows.extend(TimeEntryView([entry], None, current_workspace).values())
+        # Entries are added up per workspace, project and description in a
+        # single pass. Entries without a project are listed as they are;
+        # without a project there is no context under which to reduce them
+        # (for example, trying to find out how much time was spent on a project).
+        for entry, project, current_workspace in TimeEntryAggregator.reduce_on_description(
+                time_entries, workspaces, projects):
+            rows.extend(TimeEntryView([entry], project, current_workspace).values())
 
     else:
         # Simple, no reducing.
         for workspace in workspaces:
             for project in projects:
                 rows.extend(TimeEntryView(
-                    TimeEntryFilter.filter_on_project(
-                        TimeEntryFilter.filter_on_workspace(time_entries, workspace),
-                        project),
+                    time_entry_index.query(workspace=workspace, project=project, description=description),
                     project,
                     workspace
                 ).values())
             # Handle cases where project is not defined.
-            for entry in TimeEntryFilter.filter_on_workspace(time_entries, workspace):
+            for entry in time_entry_index.query(workspace=workspace, description=description):
                 if entry.project_identifier is None:
                     rows.extend(TimeEntryView([entry], None, workspace).values())
 
@@ -802,7 +802,49 @@ def timer_list(context: click.Context, description: str, sort_by: str, noreduce:
 
     rows = sorted(rows, key=lambda key: key[sort_by_index], reverse=True)
 
+    from tabulate import tabulate
     click.echo_via_pager(tabulate(
         rows,
         headers=TimeEntryView.headers(),
         tablefmt="grid"))
+
+
+@timers.command(
+    'report',
+    short_help='Summarize time entries by period, project, tag or description.',
+    help='Show the number of time entries and their total and average duration per day, week, month,'
+         ' project, tag or description. Entries with several tags count towards each of them.')
+@click.option('--group-by',
+              type=click.Choice(['day', 'week', 'month', 'project', 'tag', 'description']),
+              default='day',
+              show_default=True)
+@needs('workspaces', 'window', 'project_identifiers')
+@click.pass_context
+def timer_report(context: click.Context, group_by: str):
+    workspaces = context.obj['data']['workspaces']
+    if not workspaces:
+        click.echo(click.style('WARNING', fg='yellow') +
+                   f': no workspaces found to report on.')
+        return
+
+    start, stop = context.obj['data']['window']
+    # The summary is worked out by the cache, so only make sure it is up to date.
+    sync_if_needed(context.obj, 'time_entries', start, stop, since=start)
+
+    rows = retrieve_cache_from_context(context.obj).summarize_time_entries(
+        group_by,
+        [workspace.identifier for workspace in workspaces],
+        start,
+        stop,
+        project_identifiers=context.obj['data']['project_identifiers'])
+    if not rows:
+        click.echo(click.style('WARNING', fg='yellow') +
+                   f': no entries found in the specified workspace(s).')
+        return
+
+    view = SummaryView(rows, group_by)
+    from tabulate import tabulate
+    click.echo_via_pager(tabulate(
+        view.values(),
+        headers=view.headers(),
+        tablefmt="grid"))
@@ -1,29 +1,23 @@
 import click
-from tabulate import tabulate
 from typing import List, Optional
 
 from togglcmder.toggl.cli.helpers import retrieve_cache_from_context
-from togglcmder.toggl.cli.helpers import retrieve_downloader_from_context
+from togglcmder.toggl.cli.helpers import sync_if_needed
 
 from togglcmder.toggl.types.workspace import Workspace
+from togglcmder.toggl.filters.workspaces import Workspaces as WorkspaceFilter
 from togglcmder.toggl.views.workspace import Workspace as WorkspaceView
 
 
 def sync_or_retrieve_workspaces(context_obj: dict) -> List[Workspace]:
     caching = retrieve_cache_from_context(context_obj)
-    downloader = retrieve_downloader_from_context(context_obj)
 
-    # Download any new workspaces added remotely (this is only possible via
-    # the web interface anyway), if remote sync is enabled.
-    if context_obj['sync'] is True:
-        current_workspaces = downloader.download_workspaces()
-        if current_workspaces:
-            caching.update_workspace_cache(current_workspaces)
-    else:
-        # Otherwise we just pull from the local cache.
-        current_workspaces = caching.retrieve_workspace_cache()
+    # Download any workspaces changed remotely (this is only possible via
+    # the web interface anyway), if the cache is too old or sync is forced.
+    sync_if_needed(context_obj, 'workspaces')
 
-    return current_workspaces
+    # Either way the local cache is now the source of truth.
+    return caching.retrieve_workspace_cache()
 
 
 def retrieve_workspace_from_context(context: dict) -> Optional[Workspace]:
@@ -31,6 +25,26 @@ def retrieve_workspace_from_context(context: dict) -> Optional[Workspace]:
     return workspace
 
 
+def register_workspace_loaders(context_obj: dict, workspace_name: Optional[str]) -> None:
+    data = context_obj['data']
+
+    def load_workspaces() -> List[Workspace]:
+        workspaces = sync_or_retrieve_workspaces(context_obj) or []
+        if workspace_name:
+            # If a workspace name is provided, default or otherwise, filter on it.
+            workspaces = WorkspaceFilter.filter_on_name(
+                workspaces,
+                workspace_name)
+        return workspaces
+
+    def load_workspace() -> Optional[Workspace]:
+        # If a single workspace was found we can store it.
+        return data['workspaces'][0] if workspace_name and len(data['workspaces']) == 1 else None
+
+    data.loader('workspaces', load_workspaces)
+    data.loader('workspace', load_workspace)
+
+
 @click.command(
     help='List the currently available workspaces.'
 )
@@ -49,6 +63,7 @@ def workspaces(context: click.Context):
     # so create the view and use the echo functionality click
     # provides so we aren't listing workspaces in the log.
     workspace_view = WorkspaceView(current_workspaces)
+    from tabulate import tabulate
     click.echo_via_pager(tabulate(
         workspace_view.values(),
         headers=WorkspaceView.headers(),
@@ -1,10 +1,11 @@
 import requests
-from requests.auth import HTTPBasicAuth
 import json
 import logging
-from typing import List
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
 
 from togglcmder.toggl.endpoints.api import API
+from togglcmder.toggl.transport import Transport
 
 from togglcmder.toggl.types.project import Project
 from togglcmder.toggl.encoders.project_encoder import ProjectEncoder
@@ -19,9 +20,40 @@ from togglcmder.toggl.encoders.time_entry_encoder import TimeEntryEncoder
 from togglcmder.toggl.decoders.time_entry_decoder import TimeEntryDecoder
 
 
+class UpdateResult(NamedTuple):
+    # The server's copy of every entry any request changed.
+    updated: List[TimeEntry]
+    # Identifiers whose request failed; sending just these again retries them.
+    failed: List[int]
+
+
+class DeleteResult(NamedTuple):
+    deleted: List[int]
+    # Identifiers whose request failed; sending just these again retries them.
+    failed: List[int]
+
+
 class Commands(object):
-    def __init__(self, auth: str):
-        self.__auth = HTTPBasicAuth(auth, 'api_token')
+    # Requests naming many identifiers are split up to keep their URLs
+    # comfortably under what servers and proxies accept.
+    URL_LIMIT = 2000
+
+    def __init__(self, transport: Transport):
+        self.__transport = transport
+
+    @staticmethod
+    def __chunk_identifiers(base_url: str, identifiers: List[int]) -> List[List[int]]:
+        # The identifiers are appended to the base URL as "/1,2,3".
+        chunks = []
+        length = Commands.URL_LIMIT
+        for identifier in identifiers:
+            size = len(str(identifier)) + 1
+            if length + size > Commands.URL_LIMIT:
+                chunks.append([])
+                length = len(base_url)
+            chunks[-1].append(identifier)
+            length += size
+        return chunks
 
     @staticmethod
     def __log_command(logger: logging.Logger, result: requests.Response):
@@ -29,11 +61,10 @@ class Commands(object):
         logger.debug(result.text)
 
     def add_tag(self, tag: Tag) -> Tag:
-        result = requests.post(
+        result = self.__transport.post(
             API().tags,
             data=json.dumps(tag,
-                            cls=TagEncoder),
-            auth=self.__auth)
+                            cls=TagEncoder))
 
         Commands.__log_command(logging.getLogger(__name__), result)
 
@@ -42,9 +73,8 @@ class Commands(object):
                           cls=TagDecoder)
 
     def delete_tag(self, tag: Tag) -> None:
-        result = requests.delete(
-            API().tags.details(tag.identifier),
-            auth=self.__auth
+        result = self.__transport.delete(
+            API().tags.details(tag.identifier)
         )
 
         Commands.__log_command(logging.getLogger(__name__), result)
@@ -52,11 +82,10 @@ class Commands(object):
         result.raise_for_status()
 
     def update_tag(self, tag: Tag) -> Tag:
-        result = requests.put(
+        result = self.__transport.put(
             API().tags.details(tag.identifier),
             data=json.dumps(tag,
-                            cls=TagEncoder),
-            auth=self.__auth
+                            cls=TagEncoder)
         )
 
         Commands.__log_command(logging.getLogger(__name__), result)
@@ -66,11 +95,10 @@ class Commands(object):
                           cls=TagDecoder)
 
     def add_project(self, project: Project) -> Project:
-        result = requests.post(
+        result = self.__transport.post(
             API().projects,
             data=json.dumps(project,
-                            cls=ProjectEncoder),
-            auth=self.__auth)
+                            cls=ProjectEncoder))
 
         Commands.__log_command(logging.getLogger(__name__), result)
 
@@ -79,9 +107,8 @@ class Commands(object):
                           cls=ProjectDecoder)
 
     def delete_project(self, project: Project) -> None:
-        result = requests.delete(
-            API().projects.details(project.identifier),
-            auth=self.__auth
+        result = self.__transport.delete(
+            API().projects.details(project.identifier)
         )
 
         Commands.__log_command(logging.getLogger(__name__), result)
@@ -89,11 +116,10 @@ class Commands(object):
         result.raise_for_status()
 
     def delete_projects(self, projects: List[Project]) -> None:
-        result = requests.delete(
+        result = self.__transport.delete(
             API().projects.details(
                 identifiers=[project.identifier for project in projects]
-            ),
-            auth=self.__auth
+            )
         )
 
         Commands.__log_command(logging.getLogger(__name__), result)
@@ -101,11 +127,10 @@ class Commands(object):
         result.raise_for_status()
 
     def update_project(self, project: Project) -> Project:
-        result = requests.put(
+        result = self.__transport.put(
             API().projects.details(project.identifier),
             data=json.dumps(project,
-                            cls=ProjectEncoder),
-            auth=self.__auth
+                            cls=ProjectEncoder)
         )
 
         Commands.__log_command(logging.getLogger(__name__), result)
@@ -115,11 +140,10 @@ class Commands(object):
                           cls=ProjectDecoder)
 
     def start_time_entry(self, time_entry: TimeEntry) -> TimeEntry:
-        result = requests.post(
+        result = self.__transport.post(
             API().time_entries.start(),
             data=json.dumps(time_entry,
-                            cls=TimeEntryEncoder),
-            auth=self.__auth
+                            cls=TimeEntryEncoder)
         )
 
         Commands.__log_command(logging.getLogger(__name__), result)
@@ -129,9 +153,11 @@ class Commands(object):
                           cls=TimeEntryDecoder)
 
     def stop_time_entry(self, time_entry: TimeEntry) -> TimeEntry:
-        result = requests.put(
-            API().time_entries.stop(time_entry.identifier),
-            auth=self.__auth
+        return self.stop_time_entry_by_identifier(time_entry.identifier)
+
+    def stop_time_entry_by_identifier(self, identifier: int) -> TimeEntry:
+        result = self.__transport.put(
+            API().time_entries.stop(identifier)
         )
 
         Commands.__log_command(logging.getLogger(__name__), result)
@@ -141,11 +167,10 @@ class Commands(object):
                           cls=TimeEntryDecoder)
 
     def add_completed_time_entry(self, time_entry: TimeEntry) -> TimeEntry:
-        result = requests.post(
+        result = self.__transport.post(
             API().time_entries,
             data=json.dumps(time_entry,
-                            cls=TimeEntryEncoder),
-            auth=self.__auth
+                            cls=TimeEntryEncoder)
         )
 
         Commands.__log_command(logging.getLogger(__name__), result)
@@ -155,11 +180,10 @@ class Commands(object):
                           cls=TimeEntryDecoder)
 
     def update_completed_time_entry(self, time_entry: TimeEntry) -> TimeEntry:
-        result = requests.put(
+        result = self.__transport.put(
             API().time_entries.details(time_entry.identifier),
             data=json.dumps(time_entry,
-                            cls=TimeEntryEncoder),
-            auth=self.__auth
+                            cls=TimeEntryEncoder)
         )
 
         Commands.__log_command(logging.getLogger(__name__), result)
@@ -168,19 +192,111 @@ class Commands(object):
         return json.loads(result.text,
                           cls=TimeEntryDecoder)
 
+    def update_time_entries(self, time_entries: List[TimeEntry], *,
+                            description: Optional[str] = None,
+                            project: Optional[Project] = None,
+                            start_time: Optional[datetime] = None,
+                            stop_time: Optional[datetime] = None,
+                            duration: Optional[int] = None,
+                            add_tags: Optional[List[str]] = None,
+                            remove_tags: Optional[List[str]] = None) -> UpdateResult:
+        """
+        Makes the same change to every given time entry, sending as few
+        requests as possible: one per tag action and per chunk of identifiers,
+        rather than one per entry. A failed request doesn't stop the others;
+        its identifiers are reported as failed instead, and left out of any
+        later tag action.
+
+        :return: the updated time entries, as the server returned them.
+        """
+        fields = {}
+        if description is not None:
+            fields['description'] = description
+        if project is not None:
+            fields['pid'] = project.identifier
+        if start_time is not None:
+            fields['start'] = start_time.isoformat()
+        if stop_time is not None:
+            fields['stop'] = stop_time.isoformat()
+        if duration is not None:
+            fields['duration'] = duration
+
+        # The server applies one tag action per request, so adding and
+        # removing tags takes a request each; other fields ride along.
+        changes = []
+        if add_tags:
+            changes.append({**fields, 'tags': add_tags, 'tag_action': 'add'})
+        if remove_tags:
+            changes.append({**({} if changes else fields), 'tags': remove_tags, 'tag_action': 'remove'})
+        if not changes and fields:
+            changes.append(fields)
+
+        updated: Dict[int, TimeEntry] = {}
+        failed: List[int] = []
+        identifiers = [time_entry.identifier for time_entry in time_entries]
+        for change in changes:
+            for chunk in Commands.__chunk_identifiers(API().time_entries.details(), identifiers):
+                try:
+                    result = self.__transport.put(
+                        API().time_entries.details(identifiers=chunk),
+                        data=json.dumps({'time_entry': change})
+                    )
+
+                    Commands.__log_command(logging.getLogger(__name__), result)
+
+                    result.raise_for_status()
+                except requests.RequestException as e:
+                    logging.getLogger(__name__).error("failed to update time entries %s: %s", chunk, e)
+                    failed.extend(chunk)
+                    continue
+
+                reply = json.loads(result.text,
+                                   cls=TimeEntryDecoder)
+                # A single identifier gets a single entry back.
+                for time_entry in reply if isinstance(reply, list) else [reply]:
+                    updated[time_entry.identifier] = time_entry
+            failed_identifiers = set(failed)
+            identifiers = [identifier for identifier in identifiers if identifier not in failed_identifiers]
+
+        return UpdateResult(updated=list(updated.values()), failed=failed)
+
     def delete_time_entry(self, time_entry: TimeEntry) -> None:
-        result = requests.delete(
-            API().time_entries.details(time_entry.identifier),
-            auth=self.__auth
+        result = self.__transport.delete(
+            API().time_entries.details(time_entry.identifier)
         )
 
         Commands.__log_command(logging.getLogger(__name__), result)
 
         result.raise_for_status()
 
+    def delete_time_entries(self, identifiers: List[int]) -> DeleteResult:
+        """
+        Deletes many time entries with as few requests as the URL length
+        allows. A failed request doesn't stop the others; its identifiers are
+        reported as failed instead.
+
+        :param identifiers:
+        :return:
+        """
+        deleted = []
+        failed = []
+        for chunk in Commands.__chunk_identifiers(API().time_entries.details(), identifiers):
+            try:
+                result = self.__transport.delete(
+                    API().time_entries.details(identifiers=chunk)
+                )
+
+                Commands.__log_command(logging.getLogger(__name__), result)
+
+                result.raise_for_status()
+                deleted.extend(chunk)
+            except requests.RequestException as e:
+                logging.getLogger(__name__).error("failed to delete time entries %s: %s", chunk, e)
+                failed.extend(chunk)
+
+        return DeleteResult(deleted=deleted, failed=failed)
+
     def reset_api_token(self) -> str:
-        reply = requests.post(API().users.reset_api_token(),
-                              auth=self.__auth
-                              )
+        reply = self.__transport.post(API().users.reset_api_token())
         reply.raise_for_status()
         return reply.text
@@ -0,0 +1,85 @@
+import json
+import os
+import socket
+from typing import Dict, List, NamedTuple, Optional
+
+
+class Reply(NamedTuple):
+    exit_code: int
+    output: str
+
+
+class DaemonError(Exception):
+    pass
+
+
+# The daemon listens on this socket in the application directory.
+SOCKET_NAME = 'daemon.sock'
+
+# How long to wait for the daemon to accept the connection before running the
+# command in-process instead.
+CONNECT_TIMEOUT = 0.5
+
+
+def socket_path(app_dir: str) -> str:
+    return os.path.join(app_dir, SOCKET_NAME)
+
+
+def encode_netstring(data: bytes) -> bytes:
+    return b'%d:%s,' % (len(data), data)
+
+
+def decode_netstring(data: bytes) -> bytes:
+    length, separator, rest = data.partition(b':')
+    if not separator or not length.isdigit() or len(rest) != int(length) + 1 or rest[-1:] != b',':
+        raise DaemonError('malformed reply from the daemon')
+    return rest[:-1]
+
+
+def send(socket_path: str, args: List[str], env: Dict[str, str], *, color: bool = False) -> Optional[Reply]:
+    """
+    Runs a command in the daemon listening on the given socket. This is kept
+    to the standard library so asking the daemon costs next to nothing.
+
+    :param socket_path:
+    :param args: the command line, without the program name.
+    :param env: the environment variables the command should see.
+    :param color: whether the output should keep its colors.
+    :return: the command's exit code and output, or None if no daemon is
+             listening and the command should run in-process.
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.settimeout(CONNECT_TIMEOUT)
+        try:
+            connection.connect(socket_path)
+        except OSError:
+            # No daemon, or a stale socket left behind by one.
+            return None
+
+        # The command itself may take a while (syncing, say).
+        connection.settimeout(None)
+        try:
+            connection.sendall(encode_netstring(json.dumps({
+                'args': args,
+                'env': env,
+                'color': color
+            }).encode()))
+
+            chunks = []
+            while True:
+                chunk = connection.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        except OSError as e:
+            # The command may already have run, so it isn't tried again.
+            raise DaemonError(f'lost the connection to the daemon: {e}')
+
+        reply = json.loads(decode_netstring(b''.join(chunks)))
+        return Reply(exit_code=reply['exit_code'], output=reply['output'])
+    finally:
+        connection.close()
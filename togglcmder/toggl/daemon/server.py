@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+
+import click
+from click.testing import CliRunner
+
+from twisted.internet import threads
+from twisted.internet.defer import Deferred
+from twisted.internet.protocol import Factory
+from twisted.internet.task import LoopingCall
+from twisted.protocols.basic import NetstringReceiver
+from twisted.python.failure import Failure
+from twisted.python.threadpool import ThreadPool
+
+
+class CommandProtocol(NetstringReceiver):
+    """
+    One connection from the command line: a single netstring holding the
+    command as JSON, answered with a single netstring holding the exit code
+    and everything the command printed.
+    """
+
+    def stringReceived(self, string: bytes) -> None:
+        try:
+            request = json.loads(string)
+            assert(isinstance(request['args'], list))
+        except (ValueError, KeyError, TypeError, AssertionError):
+            self.__reply({'exit_code': 1, 'output': 'malformed request\n'})
+            return
+
+        deferred = self.factory.run(request)
+        deferred.addErrback(self.__failed)
+        deferred.addCallback(self.__reply)
+
+    def __failed(self, failure: Failure) -> dict:
+        logging.getLogger(__name__).error("command failed: %s", failure.getTraceback())
+        return {'exit_code': 1, 'output': f'daemon error: {failure.getErrorMessage()}\n'}
+
+    def __reply(self, reply: dict) -> None:
+        if self.transport.connected:
+            self.sendString(json.dumps(reply).encode())
+            self.transport.loseConnection()
+
+
+class Daemon(Factory):
+    """
+    Runs commands handed over by the command line in this one long lived
+    process, keeping what is expensive to set up (the cache connection, the
+    pooled HTTP session and the rate limit scheduler) warm between them.
+
+    Commands run one at a time on a single worker thread, which is also the
+    only thread that ever touches the cache connection.
+    """
+
+    protocol = CommandProtocol
+
+    # Seconds between checks for anything due a refresh; the refresher itself
+    # decides what is actually synced and when.
+    REFRESH_POLL = 15
+
+    def __init__(self, command: click.Command, reactor=None):
+        if reactor is None:
+            from twisted.internet import reactor
+        self.__command = command
+        self.__reactor = reactor
+        self.__pool = ThreadPool(minthreads=1, maxthreads=1, name='togglcmder')
+        self.__runner = CliRunner()
+        # Filled in by the main command the first time it runs, see warm in __main__.
+        self.__warm = {}
+
+    def startFactory(self) -> None:
+        self.__pool.start()
+
+    def stopFactory(self) -> None:
+        self.__pool.stop()
+        if 'transport' in self.__warm:
+            self.__warm['transport'].close()
+
+    def run(self, request: dict) -> Deferred:
+        return threads.deferToThreadPool(self.__reactor, self.__pool, self.execute, request)
+
+    def refresh(self) -> Deferred:
+        """
+        Syncs whatever is due, on the worker thread like any other command so
+        it never runs alongside one.
+
+        :return:
+        """
+        deferred = self.run({
+            'args': ['sync', '--due'],
+            'env': {key: value for key, value in os.environ.items() if key.startswith('TOGGL_')}
+        })
+
+        def check(reply: dict) -> None:
+            if reply['exit_code']:
+                logging.getLogger(__name__).warning("refresh failed: %s", reply['output'].strip())
+        return deferred.addCallback(check)
+
+    def execute(self, request: dict) -> dict:
+        """
+        Runs a single command the way the command line would have.
+
+        :param request: the command line arguments, the TOGGL_ environment
+                        variables and whether to keep colors.
+        :return: the exit code and output.
+        """
+        # Only the client's settings apply, not whatever the daemon started with.
+        env = {key: None for key in os.environ if key.startswith('TOGGL_')}
+        env.update(request.get('env') or {})
+
+        result = self.__runner.invoke(self.__command, request['args'],
+                                      obj={'warm': self.__warm},
+                                      env=env,
+                                      color=bool(request.get('color')),
+                                      prog_name='togglcmder',
+                                      auto_envvar_prefix='TOGGL')
+
+        if result.exception and not isinstance(result.exception, SystemExit):
+            logging.getLogger(__name__).error(
+                "command %s failed", request['args'], exc_info=result.exc_info)
+            return {'exit_code': 1, 'output': result.output + f'ERROR: {result.exception}\n'}
+
+        return {'exit_code': result.exit_code, 'output': result.output}
+
+
+def serve(socket_path: str, command: click.Command, *, refresh: bool = True) -> None:
+    """
+    Listens on the given UNIX socket until interrupted.
+
+    :param socket_path:
+    :param command: the root command that requests are run against.
+    :param refresh: whether to keep the cache warm in the background too.
+    :return:
+    """
+    from twisted.internet import reactor
+
+    daemon = Daemon(command, reactor)
+
+    # Only this user may hand commands to the daemon, they run with its API key.
+    # The PID lock file refuses a second daemon and cleans up after a dead one.
+    reactor.listenUNIX(socket_path, daemon, mode=0o600, wantPID=True)
+
+    if refresh:
+        # A refresh that is still running delays the next one rather than
+        # overlapping it.
+        refresher = LoopingCall(daemon.refresh)
+        refresher.clock = reactor
+        refresher.start(Daemon.REFRESH_POLL, now=True).addErrback(
+            lambda failure: logging.getLogger(__name__).error(
+                "background refresh stopped: %s", failure.getTraceback()))
+
+    reactor.run()
@@ -1,11 +1,13 @@
-from typing import List
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 
 import requests, json
-from requests.auth import HTTPBasicAuth
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import logging
+import threading
 
 from togglcmder.toggl.endpoints.api import API
+from togglcmder.toggl.transport import Transport
 
 from togglcmder.toggl.types.user import User
 from togglcmder.toggl.decoders.user_decoder import UserDecoder
@@ -22,19 +24,84 @@ from togglcmder.toggl.decoders.project_decoder import ProjectDecoder
 from togglcmder.toggl.types.time_entry import TimeEntry
 from togglcmder.toggl.decoders.time_entry_decoder import TimeEntryDecoder
 
+
+class Changes(NamedTuple):
+    # Records that were added or updated on the server.
+    changed: list
+    # Identifiers of records the server reported as deleted.
+    deleted: List[int]
+
+
 class Downloader(object):
-    def __init__(self, auth: str):
-        self.__auth = HTTPBasicAuth(auth, 'api_token')
+    # The most time entries the server returns for one search; a reply this
+    # big may have been cut short.
+    TIME_ENTRY_LIMIT = 1000
+
+    # Long time entry ranges are downloaded as chunks of this size.
+    WINDOWS = {
+        'day': timedelta(days=1),
+        'week': timedelta(weeks=1),
+        'month': timedelta(days=30)
+    }
+
+    # Windows are never split smaller than this, however full they are.
+    SMALLEST_WINDOW = timedelta(minutes=1)
+
+    def __init__(self, transport: Transport, *, window: str = 'week', workers: int = 4):
+        if window not in Downloader.WINDOWS:
+            raise ValueError(f"'{window}' is not one of {', '.join(Downloader.WINDOWS)}")
+
+        self.__transport = transport
+        self.__window = Downloader.WINDOWS[window]
+        self.__workers = max(workers, 1)
+        # Downloads may run on several threads at once.
+        self.__lock = threading.Lock()
+        self.__requests_made = 0
+        # Time entry windows already downloaded during this invocation.
+        self.__time_entry_windows: Dict[Tuple[datetime, datetime, Optional[datetime]], Changes] = {}
+
+    @property
+    def requests_made(self) -> int:
+        return self.__requests_made
+
+    def __get(self, url: str) -> requests.Response:
+        with self.__lock:
+            self.__requests_made += 1
+        return self.__transport.get(url)
 
     @staticmethod
     def __log_download(logger: logging.Logger, result: requests.Response):
         logger.debug(result.request.body)
         logger.debug(result.text)
 
+    @staticmethod
+    def __decode_changes(text: str, object_hook: Callable[[dict], object]) -> Changes:
+        deleted = []
+
+        def hook(obj: dict):
+            # Deleted records only matter for their identifier.
+            if obj.get('server_deleted_at') and 'id' in obj:
+                deleted.append(obj['id'])
+                return None
+            return object_hook(obj)
+
+        changed = json.loads(text, object_hook=hook) or []
+        return Changes(changed=[item for item in changed if item is not None],
+                       deleted=deleted)
+
+    def __download_changes(self, url: str, object_hook: Callable[[dict], object]) -> Changes:
+        reply = self.__get(
+            url
+        )
+
+        Downloader.__log_download(logging.getLogger(__name__), reply)
+
+        reply.raise_for_status()
+        return Downloader.__decode_changes(reply.text, object_hook)
+
     def download_user_data(self) -> User:
-        reply = requests.get(
-            API().users.details(),
-            auth=self.__auth
+        reply = self.__get(
+            API().users.details()
         )
 
         # Commented this out because it may show sensitive information.
@@ -45,9 +112,8 @@ class Downloader(object):
                           cls=UserDecoder)
 
     def download_workspaces(self) -> List[Workspace]:
-        reply = requests.get(
-            API().workspaces,
-            auth=self.__auth
+        reply = self.__get(
+            API().workspaces
         )
 
         Downloader.__log_download(logging.getLogger(__name__), reply)
@@ -56,10 +122,14 @@ class Downloader(object):
         return json.loads(reply.text,
                           cls=WorkspaceDecoder)
 
+    def download_workspace_changes(self, since: Optional[datetime] = None) -> Changes:
+        return self.__download_changes(
+            API().workspaces.changed(since),
+            WorkspaceDecoder.object_hook)
+
     def download_tags(self, workspace: Workspace) -> List[Tag]:
-        reply = requests.get(
-            API().workspaces.tags(workspace.identifier),
-            auth=self.__auth
+        reply = self.__get(
+            API().workspaces.tags(workspace.identifier)
         )
 
         Downloader.__log_download(logging.getLogger(__name__), reply)
@@ -69,9 +139,8 @@ class Downloader(object):
                           cls=TagDecoder)
 
     def download_projects(self, workspace: Workspace) -> List[Project]:
-        reply = requests.get(
-            API().workspaces.projects(workspace.identifier),
-            auth=self.__auth
+        reply = self.__get(
+            API().workspaces.projects(workspace.identifier)
         )
 
         Downloader.__log_download(logging.getLogger(__name__), reply)
@@ -80,22 +149,78 @@ class Downloader(object):
         return json.loads(reply.text,
                           cls=ProjectDecoder)
 
-    def download_time_entries(self, start: datetime, end: datetime) -> List[TimeEntry]:
-        reply = requests.get(
-            API().time_entries.search(start, end),
-            auth=self.__auth
-        )
+    def download_project_changes(self, workspace: Workspace, since: Optional[datetime] = None) -> Changes:
+        return self.__download_changes(
+            API().workspaces.projects(workspace.identifier, since),
+            ProjectDecoder.object_hook)
 
-        Downloader.__log_download(logging.getLogger(__name__), reply)
+    def __download_time_entry_window(self, start: datetime, end: datetime,
+                                     since: Optional[datetime]) -> List[Changes]:
+        changes = self.__download_changes(
+            API().time_entries.search(start, end, since),
+            TimeEntryDecoder.object_hook)
 
-        reply.raise_for_status()
-        return json.loads(reply.text,
-                          cls=TimeEntryDecoder)
+        # A full reply probably means the server left some entries out, so
+        # ask again for each half of the window.
+        if len(changes.changed) + len(changes.deleted) >= Downloader.TIME_ENTRY_LIMIT \
+                and end - start > Downloader.SMALLEST_WINDOW:
+            middle = start + (end - start) / 2
+            return self.__download_time_entry_window(start, middle, since) + \
+                self.__download_time_entry_window(middle, end, since)
+
+        return [changes]
+
+    def download_time_entries(self, start: datetime, end: datetime) -> List[TimeEntry]:
+        return list(self.download_time_entry_changes(start, end).changed)
+
+    def download_time_entry_changes(self, start: datetime, end: datetime,
+                                    since: Optional[datetime] = None) -> Changes:
+        # The same window is often asked for more than once per invocation,
+        # so only the first request for it actually goes out.
+        key = (start, end, since)
+        if key in self.__time_entry_windows:
+            return self.__time_entry_windows[key]
+
+        # Only a full download is chunked into fixed windows; what changed
+        # since a mark is usually little, so it is asked for in one request
+        # and only split if the reply comes back full.
+        windows = [(start, end)]
+        if since is None:
+            windows = []
+            window_start = start
+            while window_start < end:
+                windows.append((window_start, min(window_start + self.__window, end)))
+                window_start = windows[-1][1]
+
+        if len(windows) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.__workers, len(windows))) as executor:
+                results = [changes
+                           for chunk in executor.map(
+                               lambda window: self.__download_time_entry_window(*window, since), windows)
+                           for changes in chunk]
+        else:
+            results = self.__download_time_entry_window(start, end, since)
+
+        # Entries on the edge of two windows can come back twice; keep the
+        # most recently updated copy of each.
+        changed = {}
+        deleted = set()
+        for changes in results:
+            for time_entry in changes.changed:
+                previous = changed.get(time_entry.identifier)
+                if not previous or (time_entry.last_updated and previous.last_updated
+                                    and time_entry.last_updated > previous.last_updated):
+                    changed[time_entry.identifier] = time_entry
+            deleted.update(changes.deleted)
+
+        self.__time_entry_windows[key] = Changes(
+            changed=sorted(changed.values(), key=lambda time_entry: time_entry.start_time),
+            deleted=sorted(deleted - changed.keys()))
+        return self.__time_entry_windows[key]
 
     def get_current_time_entry(self) -> TimeEntry:
-        result = requests.get(
-            API().time_entries.current(),
-            auth=self.__auth
+        result = self.__get(
+            API().time_entries.current()
         )
 
         Downloader.__log_download(logging.getLogger(__name__), result)
@@ -62,8 +62,12 @@ class TimeEntries(object):
         else:
             return self.__url
 
-    # Used to search for time entries with a GET request.
-    def search(self, start: datetime, end: datetime) -> str:
-        return self.__url + "?start_date={}&end_date={}".format(
+    # Used to search for time entries with a GET request. When since is given
+    # only entries changed (or deleted) after that time are returned.
+    def search(self, start: datetime, end: datetime, since: Optional[datetime] = None) -> str:
+        url = self.__url + "?start_date={}&end_date={}".format(
             urllib.parse.quote(start.isoformat()),
             urllib.parse.quote(end.isoformat()))
+        if since:
+            url += "&since={}".format(int(since.timestamp()))
+        return url
@@ -1,6 +1,8 @@
 """
 
 """
+from datetime import datetime
+from typing import Optional
 
 
 class Workspaces(object):
@@ -26,7 +28,20 @@ class Workspaces(object):
         """
         return self.__url + "/{}".format(id_)
 
-    def projects(self, id_: int) -> str:
+    def changed(self, since: Optional[datetime] = None) -> str:
+        """
+        All workspaces, or only those changed (or deleted) since the given time.
+
+        :param since:
+        :return:
+        """
+        if since:
+            return self.__url + "?since={}".format(int(since.timestamp()))
+        return self.__url
+
+    def projects(self, id_: int, since: Optional[datetime] = None) -> str:
+        if since:
+            return self.__url + "/{}/projects?since={}".format(id_, int(since.timestamp()))
         return self.__url + "/{}/projects".format(id_)
 
     def tags(self, id_: int) -> str:
@@ -0,0 +1,81 @@
+import functools
+import logging
+import reprlib
+import time
+from typing import Any, Callable, Optional, Sequence
+
+# Filters report what they did to this logger, at debug level; nothing is
+# measured unless it is enabled (see --trace-filters).
+TRACE_LOGGER = 'togglcmder.trace.filters'
+
+# How many items of a filter's input are shown in its log messages.
+SUMMARY_LIMIT = 10
+
+
+class Summary(object):
+    """
+    Stands in for a filter's input in a log message: how many items there
+    are and the first few of them. Nothing is worked out unless the message
+    is actually logged.
+    """
+
+    def __init__(self, items: Sequence, key: Optional[Callable[[Any], Any]] = None, limit: int = SUMMARY_LIMIT):
+        self.__items = items
+        self.__key = key
+        self.__limit = limit
+
+    def __str__(self) -> str:
+        shown = [self.__key(item) if self.__key else item for item in self.__items[:self.__limit]]
+        if len(self.__items) <= self.__limit:
+            return '{} item(s) {}'.format(len(self.__items), shown)
+        return '{} item(s) {} and {} more'.format(len(self.__items), shown, len(self.__items) - self.__limit)
+
+
+class _Criteria(reprlib.Repr):
+    """
+    Shortens a filter's criteria for its trace message. Types without a
+    useful repr (tags, projects, workspaces) are shown as they print.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.maxlist = 3
+        self.maxstring = 40
+        self.maxother = 40
+
+    def repr_instance(self, obj: Any, level: int) -> str:
+        text = str(obj)
+        if len(text) > self.maxother:
+            return text[:self.maxother - 3] + '...'
+        return text
+
+
+_criteria = _Criteria()
+
+
+def summarize(items: Sequence, key: Optional[Callable[[Any], Any]] = None) -> Summary:
+    return Summary(items, key)
+
+
+def traced(function: Callable) -> Callable:
+    """
+    Logs what a filter was asked for, how many items it was given, how many
+    it returned and how long it took, when the trace logger is enabled. The
+    filter is given its input as its first argument; the arguments after it
+    and the keyword arguments that were set are its criteria.
+    """
+    logger = logging.getLogger(TRACE_LOGGER)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not logger.isEnabledFor(logging.DEBUG):
+            return function(*args, **kwargs)
+
+        started = time.perf_counter()
+        result = function(*args, **kwargs)
+        criteria = [_criteria.repr(value) for value in args[1:]]
+        criteria.extend('{}={}'.format(name, _criteria.repr(value)) for name, value in kwargs.items() if value)
+        logger.debug('%s(%s): %d -> %d in %.3fms', function.__qualname__, ', '.join(criteria),
+                     len(args[0]), len(result), (time.perf_counter() - started) * 1000)
+        return result
+    return wrapper
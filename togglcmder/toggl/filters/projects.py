@@ -1,9 +1,10 @@
 from typing import List
-import re as regex
 import logging
 
 from togglcmder.toggl.types.project import Project
 from togglcmder.toggl.types.workspace import Workspace
+from togglcmder.toggl.matcher import Matcher
+from togglcmder.toggl.filters.diagnostics import summarize, traced
 
 
 class Projects(object):
@@ -20,41 +21,34 @@ class Projects(object):
         return projects[0]
 
     @staticmethod
+    @traced
     def filter_on_name(
             projects: List[Project],
             name: str
     ) -> List[Project]:
         logger = logging.getLogger(__name__)
         if not name:
-            logger.debug('no name provided for filter_on_name(projects) with input = {}'.format(
-                    [project.name for project in projects]
-                ))
+            logger.debug('no name provided for filter_on_name(projects) with input = %s',
+                         summarize(projects, lambda project: project.name))
             return projects
 
-        result = list(filter(
-            lambda project:
-                regex.match("^{}$".format(name),
-                            project.name,
-                            regex.IGNORECASE),
-            projects
-        ))
+        result = Matcher.compile(name).filter(projects, lambda project: project.name)
 
         if not result:
-            logger.warning('no projects found with name = {} and with input = {}'.format(
-                name, [project.name for project in projects]
-            ))
+            logger.warning('no projects found with name = %s and with input = %s',
+                           name, summarize(projects, lambda project: project.name))
         return result
 
     @staticmethod
+    @traced
     def filter_on_workspace(
             projects: List[Project],
             workspace: Workspace
     ) -> List[Project]:
         logger = logging.getLogger(__name__)
         if not workspace:
-            logger.debug('no workspace provided for filter_on_workspace(projects) with input = {}'.format(
-                [(project.name, project.workspace_identifier) for project in projects]
-            ))
+            logger.debug('no workspace provided for filter_on_workspace(projects) with input = %s',
+                         summarize(projects, lambda project: (project.name, project.workspace_identifier)))
             return projects
 
         result = list(filter(
@@ -63,22 +57,21 @@ class Projects(object):
         ))
 
         if not result:
-            logger.warning('no projects found with workspace = {} and with input = {}'.format(
-                (workspace.name, workspace.identifier),
-                [(project.name, project.workspace_identifier) for project in projects]
-            ))
+            logger.warning('no projects found with workspace = %s and with input = %s',
+                           (workspace.name, workspace.identifier),
+                           summarize(projects, lambda project: (project.name, project.workspace_identifier)))
         return result
 
     @staticmethod
+    @traced
     def filter_on_color(
             projects: List[Project],
             color: Project.Color
     ) -> List[Project]:
         logger = logging.getLogger(__name__)
         if not color:
-            logger.debug('no color provided for filter_on_color(projects) with input = {}'.format(
-                [(project.name, project.color.name) for project in projects]
-            ))
+            logger.debug('no color provided for filter_on_color(projects) with input = %s',
+                         summarize(projects, lambda project: (project.name, project.color.name)))
             return projects
 
         result = list(filter(
@@ -87,21 +80,20 @@ class Projects(object):
         ))
 
         if not result:
-            logger.warning('no projects found with color = {} and with input = {}'.format(
-                color.name, [(project.name, project.color.name) for project in projects]
-            ))
+            logger.warning('no projects found with color = %s and with input = %s',
+                           color.name, summarize(projects, lambda project: (project.name, project.color.name)))
         return result
 
     @staticmethod
+    @traced
     def filter_on_identifier(
             projects: List[Project],
             identifier: int
     ) -> List[Project]:
         logger = logging.getLogger(__name__)
         if not identifier:
-            logger.debug('no identifier provided for filter_on_identifier(projects) with input = {}'.format(
-                [(project.name, project.identifier) for project in projects]
-            ))
+            logger.debug('no identifier provided for filter_on_identifier(projects) with input = %s',
+                         summarize(projects, lambda project: (project.name, project.identifier)))
             return projects
 
         result = list(filter(
@@ -110,7 +102,6 @@ class Projects(object):
         ))
 
         if not result:
-            logger.warning('no projects found with identifier = {} and with input = {}'.format(
-                identifier, [(project.name, project.identifier) for project in projects]
-            ))
+            logger.warning('no projects found with identifier = %s and with input = %s',
+                           identifier, summarize(projects, lambda project: (project.name, project.identifier)))
         return result
@@ -1,9 +1,10 @@
 from typing import List
-import re as regex
 import logging
 
 from togglcmder.toggl.types.workspace import Workspace
 from togglcmder.toggl.types.tag import Tag
+from togglcmder.toggl.matcher import Matcher
+from togglcmder.toggl.filters.diagnostics import summarize, traced
 
 
 class Tags(object):
@@ -20,41 +21,34 @@ class Tags(object):
         return tags[0]
 
     @staticmethod
+    @traced
     def filter_on_name(
             tags: List[Tag],
             name: str
     ) -> List[Tag]:
         logger = logging.getLogger(__name__)
         if not name:
-            logger.debug('no name provided for filter_on_name(tags) with input = {}'.format(
-                [tag.name for tag in tags]
-            ))
+            logger.debug('no name provided for filter_on_name(tags) with input = %s',
+                         summarize(tags, lambda tag: tag.name))
             return tags
 
-        result = list(filter(
-            lambda tag:
-                regex.match("^{}$".format(name),
-                            tag.name,
-                            regex.IGNORECASE),
-            tags
-        ))
+        result = Matcher.compile(name).filter(tags, lambda tag: tag.name)
 
         if not result:
-            logger.warning('no tags found with name = {} and with input = {}'.format(
-                name, [tag.name for tag in tags]
-            ))
+            logger.warning('no tags found with name = %s and with input = %s',
+                           name, summarize(tags, lambda tag: tag.name))
         return result
 
     @staticmethod
+    @traced
     def filter_on_names(
             tags: List[Tag],
             names: List[str]
     ) -> List[Tag]:
         logger = logging.getLogger(__name__)
         if not names:
-            logger.debug('no names provided for filter_on_names(tags) with input = {}'.format(
-                [tag.name for tag in tags]
-            ))
+            logger.debug('no names provided for filter_on_names(tags) with input = %s',
+                         summarize(tags, lambda tag: tag.name))
             return tags
 
         result = list(filter(
@@ -63,21 +57,20 @@ class Tags(object):
         ))
 
         if not result:
-            logger.warning('no tags found with names = {} and with input = {}'.format(
-                names, [tag.name for tag in tags]
-            ))
+            logger.warning('no tags found with names = %s and with input = %s',
+                           names, summarize(tags, lambda tag: tag.name))
         return result
 
     @staticmethod
+    @traced
     def filter_on_workspace(
             tags: List[Tag],
             workspace: Workspace
     ) -> List[Tag]:
         logger = logging.getLogger(__name__)
         if not workspace:
-            logger.debug('no workspace provided for filter_on_workspace(tags) with input = {}'.format(
-                [(tag.name, tag.workspace_identifier) for tag in tags]
-            ))
+            logger.debug('no workspace provided for filter_on_workspace(tags) with input = %s',
+                         summarize(tags, lambda tag: (tag.name, tag.workspace_identifier)))
             return tags
 
         result = list(filter(
@@ -86,21 +79,21 @@ class Tags(object):
         ))
 
         if not result:
-            logger.warning('no tags found with workspace = {} and with input = {}'.format(
-                (workspace.name, workspace.identifier), [(tag.name, tag.workspace_identifier) for tag in tags]
-            ))
+            logger.warning('no tags found with workspace = %s and with input = %s',
+                           (workspace.name, workspace.identifier),
+                           summarize(tags, lambda tag: (tag.name, tag.workspace_identifier)))
         return result
 
     @staticmethod
+    @traced
     def filter_on_identifier(
             tags: List[Tag],
             identifier: int
     ) -> List[Tag]:
         logger = logging.getLogger(__name__)
         if not identifier:
-            logger.debug('no identifier provided for filter_on_identifier(tags) with input = {}'.format(
-                [(tag.name, tag.identifier) for tag in tags]
-            ))
+            logger.debug('no identifier provided for filter_on_identifier(tags) with input = %s',
+                         summarize(tags, lambda tag: (tag.name, tag.identifier)))
             return tags
 
         result = list(filter(
@@ -109,7 +102,6 @@ class Tags(object):
         ))
 
         if not result:
-            logger.warning('no tags found with identifier = {} and with input = {}'.format(
-                identifier, [(tag.name, tag.identifier) for tag in tags]
-            ))
+            logger.warning('no tags found with identifier = %s and with input = %s',
+                           identifier, summarize(tags, lambda tag: (tag.name, tag.identifier)))
         return result
@@ -1,5 +1,4 @@
 from datetime import datetime
-import re as regex
 from typing import List
 import logging
 
@@ -7,6 +6,8 @@ from togglcmder.toggl.types.workspace import Workspace
 from togglcmder.toggl.types.project import Project
 from togglcmder.toggl.types.tag import Tag
 from togglcmder.toggl.types.time_entry import TimeEntry
+from togglcmder.toggl.indexes.time_entries import TimeEntryIndex
+from togglcmder.toggl.filters.diagnostics import summarize, traced
 
 
 class TimeEntries(object):
@@ -23,129 +24,104 @@ class TimeEntries(object):
         return time_entries[0]
 
     @staticmethod
+    @traced
     def filter_on_description(
             time_entries: List[TimeEntry],
             description: str
     ) -> List[TimeEntry]:
         logger = logging.getLogger(__name__)
         if not description:
-            logger.debug('no description provided for filter_on_description(time_entries) with input = {}'.format(
-                [entry.description for entry in time_entries]
-            ))
+            logger.debug('no description provided for filter_on_description(time_entries) with input = %s',
+                         summarize(time_entries, lambda entry: entry.description))
             return time_entries
 
-        result = list(filter(
-            lambda time_entry:
-                regex.match("^{}$".format(description),
-                            time_entry.description if time_entry.description else "",
-                            regex.IGNORECASE),
-            time_entries
-        ))
+        result = TimeEntryIndex(time_entries).query(description=description)
 
         if not result:
-            logger.warning('no time entries found with description = {} and with input = {}'.format(
-                description, [entry.description for entry in time_entries]
-            ))
+            logger.warning('no time entries found with description = %s and with input = %s',
+                           description, summarize(time_entries, lambda entry: entry.description))
         return result
 
     @staticmethod
+    @traced
     def filter_on_workspace(
             time_entries: List[TimeEntry],
             workspace: Workspace
     ) -> List[TimeEntry]:
         logger = logging.getLogger(__name__)
         if not workspace:
-            logger.debug('no workspace provided for filter_on_workspace(time_entries) with input = {}'.format(
-                [(entry.description, entry.workspace_identifier) for entry in time_entries]
-            ))
+            logger.debug('no workspace provided for filter_on_workspace(time_entries) with input = %s',
+                         summarize(time_entries, lambda entry: (entry.description, entry.workspace_identifier)))
             return time_entries
 
-        result = list(filter(
-            lambda time_entry: workspace.identifier == time_entry.workspace_identifier,
-            time_entries
-        ))
+        result = TimeEntryIndex(time_entries).query(workspace=workspace)
 
         if not result:
-            logger.warning('no time entries found with workspace = {} and with input = {}'.format(
-                (workspace.name, workspace.identifier),
-                [(entry.description, entry.workspace_identifier) for entry in time_entries]
-            ))
+            logger.warning('no time entries found with workspace = %s and with input = %s',
+                           (workspace.name, workspace.identifier),
+                           summarize(time_entries, lambda entry: (entry.description, entry.workspace_identifier)))
         return result
 
     @staticmethod
+    @traced
     def filter_on_project(
             time_entries: List[TimeEntry],
             project: Project
     ) -> List[TimeEntry]:
         logger = logging.getLogger(__name__)
         if not project:
-            logger.debug('no project provided for filter_on_project(time_entries) with input = {}'.format(
-                [(entry.description, entry.project_identifier) for entry in time_entries]
-            ))
+            logger.debug('no project provided for filter_on_project(time_entries) with input = %s',
+                         summarize(time_entries, lambda entry: (entry.description, entry.project_identifier)))
             return time_entries
 
-        result = list(filter(
-            lambda time_entry: project.identifier == time_entry.project_identifier,
-            time_entries
-        ))
+        result = TimeEntryIndex(time_entries).query(project=project)
 
         if not result:
-            logger.warning('no time entries found with project = {} and with input = {}'.format(
-                (project.name, project.identifier),
-                [(entry.description, entry.project_identifier) for entry in time_entries]
-            ))
+            logger.warning('no time entries found with project = %s and with input = %s',
+                           (project.name, project.identifier),
+                           summarize(time_entries, lambda entry: (entry.description, entry.project_identifier)))
         return result
 
     @staticmethod
+    @traced
     def filter_on_all_tags(
             time_entries: List[TimeEntry],
             tags: List[Tag]
     ) -> List[TimeEntry]:
         logger = logging.getLogger(__name__)
         if not tags:
-            logger.debug('no tags provided for filter_on_all_tags(time_entries) with input = {}'.format(
-                [entry.tags for entry in time_entries]
-            ))
+            logger.debug('no tags provided for filter_on_all_tags(time_entries) with input = %s',
+                         summarize(time_entries, lambda entry: entry.tags))
             return time_entries
 
-        result = list(filter(
-            lambda time_entry: set(
-                [tag.name for tag in tags]
-            ).issubset(time_entry.tags),
-            time_entries
-        ))
+        result = TimeEntryIndex(time_entries).query(all_tags=tags)
 
         if not result:
-            logger.warning('no time entries found with tags = {} and with input = {}'.format(
-                [tag.name for tag in tags], [entry.tags for entry in time_entries]
-            ))
+            logger.warning('no time entries found with tags = %s and with input = %s',
+                           summarize(tags, lambda tag: tag.name), summarize(time_entries, lambda entry: entry.tags))
         return result
 
     @staticmethod
+    @traced
     def filter_on_any_tags(
             time_entries: List[TimeEntry],
             tags: List[Tag]
     ) -> List[TimeEntry]:
         logger = logging.getLogger(__name__)
         if not tags:
-            logger.debug('no tags provided for filter_on_any_tags(time_entries) with input = {}'.format(
-                [entry.tags for entry in time_entries]
-            ))
+            logger.debug('no tags provided for filter_on_any_tags(time_entries) with input = %s',
+                         summarize(time_entries, lambda entry: entry.tags))
             return time_entries
 
-        result = list(filter(
-            lambda time_entry:
-                not set([tag.name for tag in tags]).isdisjoint(time_entry.tags),
-            time_entries
-        ))
+        result = TimeEntryIndex(time_entries).query(any_tags=tags)
 
         if not result:
-            logger.warning('no time entries found with tags = {} and with input = {}'.format(
-                [tag.name for tag in tags], [entry.tags for entry in time_entries]
-            ))
+            logger.warning('no time entries found with tags = %s and with input = %s',
+                           summarize(tags, lambda tag: tag.name), summarize(time_entries, lambda entry: entry.tags))
         return result
 
     @staticmethod
+    @traced
     def filter_on_date_range(
             time_entries: List[TimeEntry],
             start: datetime,
@@ -153,41 +129,28 @@ class TimeEntries(object):
     ) -> List[TimeEntry]:
         logger = logging.getLogger(__name__)
         if not start and not end:
-            logger.debug('neither start nor end provided for filter_on_date_range(time_entries) with input = {}'.format(
-                [(entry.start_time.isoformat(), entry.stop_time.isoformat()) for entry in time_entries]
-            ))
+            logger.debug('neither start nor end provided for filter_on_date_range(time_entries) with input = %s',
+                         summarize(time_entries, lambda entry: (
+                             entry.start_time.isoformat(),
+                             entry.stop_time.isoformat() if entry.stop_time else None)))
             return time_entries
 
-        result = None
+        result = TimeEntryIndex(time_entries).query(start=start, end=end)
         if start and end:
-            result = list(filter(
-                lambda time_entry: start < time_entry.start_time < end,
-                time_entries
-            ))
             if not result:
-                logger.warning('no time entries found for start = {} and end = {} and with input = {}'.format(
-                    start.isoformat(), end.isoformat(),
-                    [entry.start_time.isoformat() for entry in time_entries]
-                ))
+                logger.warning('no time entries found for start = %s and end = %s and with input = %s',
+                               start.isoformat(),
+                               end.isoformat(),
+                               summarize(time_entries, lambda entry: entry.start_time.isoformat()))
 
         elif start:
-            result = list(filter(
-                lambda time_entry: start < time_entry.start_time,
-                time_entries
-            ))
             if not result:
-                logger.warning('no time entries found with start = {} and with input = {}'.format(
-                    start.isoformat(), [entry.start_time.isoformat() for entry in time_entries]
-                ))
+                logger.warning('no time entries found with start = %s and with input = %s',
+                               start.isoformat(), summarize(time_entries, lambda entry: entry.start_time.isoformat()))
 
         elif end:
-            result = list(filter(
-                lambda time_entry: time_entry.start_time < end,
-                time_entries
-            ))
             if not result:
-                logger.warning('no time entries found with end = {} and with input = {}'.format(
-                    end.isoformat(), [entry.stop_time.isoformat() for entry in time_entries]
-                ))
+                logger.warning('no time entries found with end = %s and with input = %s',
+                               end.isoformat(), summarize(time_entries, lambda entry: entry.start_time.isoformat()))
 
         return result
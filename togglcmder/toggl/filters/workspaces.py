@@ -1,8 +1,9 @@
 from typing import List
-import re as regex
 import logging
 
 from togglcmder.toggl.types.workspace import Workspace
+from togglcmder.toggl.matcher import Matcher
+from togglcmder.toggl.filters.diagnostics import summarize, traced
 
 
 class Workspaces(object):
@@ -19,41 +20,34 @@ class Workspaces(object):
         return workspaces[0]
 
     @staticmethod
+    @traced
     def filter_on_name(
             workspaces: List[Workspace],
             name: str
     ) -> List[Workspace]:
         logger = logging.getLogger(__name__)
         if not name:
-            logger.debug('no name provided for filter_on_name(workspaces) with input = {}'.format(
-                [workspace.name for workspace in workspaces]
-            ))
+            logger.debug('no name provided for filter_on_name(workspaces) with input = %s',
+                         summarize(workspaces, lambda workspace: workspace.name))
             return workspaces
 
-        result = list(filter(
-            lambda workspace:
-                regex.match("^{}$".format(name),
-                            workspace.name,
-                            regex.IGNORECASE),
-            workspaces
-        ))
+        result = Matcher.compile(name).filter(workspaces, lambda workspace: workspace.name)
 
         if not result:
-            logger.warning('no workspaces found with name = {} and with input = {}'.format(
-                name, [workspace.name for workspace in workspaces]
-            ))
+            logger.warning('no workspaces found with name = %s and with input = %s',
+                           name, summarize(workspaces, lambda workspace: workspace.name))
         return result
 
     @staticmethod
+    @traced
     def filter_on_identifier(
             workspaces: List[Workspace],
             identifier: int
     ) -> List[Workspace]:
         logger = logging.getLogger(__name__)
         if not identifier:
-            logger.debug('no identifier provided for filter_on_identifier(workspaces) with input = {}'.format(
-                [workspace.name for workspace in workspaces]
-            ))
+            logger.debug('no identifier provided for filter_on_identifier(workspaces) with input = %s',
+                         summarize(workspaces, lambda workspace: workspace.name))
             return workspaces
 
         result = list(filter(
@@ -62,7 +56,6 @@ class Workspaces(object):
         ))
 
         if not result:
-            logger.warning('no workspaces found with identifier = {} and with input = {}'.format(
-                identifier, [workspace.name for workspace in workspaces]
-            ))
+            logger.warning('no workspaces found with identifier = %s and with input = %s',
+                           identifier, summarize(workspaces, lambda workspace: workspace.name))
         return result
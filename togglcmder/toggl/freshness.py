@@ -0,0 +1,118 @@
+import logging
+import queue
+import threading
+from datetime import datetime, timedelta, timezone
+from enum import Enum, unique
+from typing import Callable, Optional, Set, Tuple
+
+from togglcmder.toggl.caching import Caching
+from togglcmder.toggl.synchronizer import Synchronizer
+
+
+@unique
+class Freshness(Enum):
+    # Served from the cache as is.
+    FRESH = 1
+    # Served from the cache, and refreshed in the background.
+    STALE = 2
+    # Synced before it is served.
+    EXPIRED = 3
+
+
+class FreshnessPolicy(object):
+    """
+    Decides how much a cached resource can be trusted from when it was last
+    synced. Within its time to live it is fresh; for a grace period after
+    that it is stale, still good enough to show while it is brought up to
+    date; after that, or if it was never synced, it has expired.
+    """
+
+    # These can be overridden from the "freshness" section of the configuration.
+    # Both are in seconds; grace starts once ttl is over.
+    SETTINGS = {
+        'workspaces': {'ttl': 86400, 'grace': 604800},
+        'projects': {'ttl': 3600, 'grace': 604800},
+        'tags': {'ttl': 3600, 'grace': 604800},
+        'time_entries': {'ttl': 300, 'grace': 86400}
+    }
+
+    def __init__(self, settings: Optional[dict] = None):
+        settings = settings or {}
+        for key in settings.keys() - FreshnessPolicy.SETTINGS.keys():
+            logging.getLogger(__name__).warning("ignoring unknown freshness setting '%s'", key)
+
+        self.__ttl = {}
+        self.__grace = {}
+        for resource, defaults in FreshnessPolicy.SETTINGS.items():
+            resource_settings = {**defaults, **(settings.get(resource) or {})}
+            self.__ttl[resource] = timedelta(seconds=resource_settings['ttl'])
+            self.__grace[resource] = timedelta(seconds=resource_settings['grace'])
+
+    def freshness(self, resource: str, last_sync: Optional[datetime],
+                  now: Optional[datetime] = None) -> Freshness:
+        if not last_sync:
+            return Freshness.EXPIRED
+
+        age = (now or datetime.now(tz=timezone.utc)) - last_sync
+        if age <= self.__ttl[resource]:
+            return Freshness.FRESH
+        if age <= self.__ttl[resource] + self.__grace[resource]:
+            return Freshness.STALE
+        return Freshness.EXPIRED
+
+
+class Revalidator(object):
+    """
+    Syncs stale resources on a background thread while the command goes on
+    with what is cached. The thread has its own cache connection and
+    synchronizer, and is started by the first request; join waits for
+    everything requested to be synced.
+    """
+
+    def __init__(self, synchronizer: Callable[[Caching], Synchronizer], caching: Callable[[], Caching]):
+        self.__synchronizer = synchronizer
+        self.__caching = caching
+        self.__queue: queue.Queue = queue.Queue()
+        self.__requested: Set[Tuple] = set()
+        self.__thread: Optional[threading.Thread] = None
+        self.__logger = logging.getLogger(__name__)
+
+    def request(self, resource: str, *args, key: Tuple = ()) -> None:
+        """
+        Asks for a resource to be synced in the background, once.
+
+        :param resource: what to sync; sync_<resource> is called on the synchronizer.
+        :param args: what to pass to it.
+        :param key: tells requests for the same resource apart (a workspace, say).
+        :return:
+        """
+        if (resource,) + key in self.__requested:
+            return
+        self.__requested.add((resource,) + key)
+
+        self.__queue.put((resource, args))
+        if not self.__thread:
+            self.__thread = threading.Thread(target=self.__run, name='revalidator', daemon=True)
+            self.__thread.start()
+
+    def __run(self) -> None:
+        caching = self.__caching()
+        synchronizer = self.__synchronizer(caching)
+        while True:
+            request = self.__queue.get()
+            if request is None:
+                break
+
+            resource, args = request
+            try:
+                changed = getattr(synchronizer, f'sync_{resource}')(*args)
+                self.__logger.debug("revalidated %s: %d changed", resource, changed)
+            except Exception as e:
+                # What was served stays in the cache; the next command tries again.
+                self.__logger.warning("revalidating %s failed: %s", resource, e)
+
+    def join(self) -> None:
+        if self.__thread:
+            self.__queue.put(None)
+            self.__thread.join()
+            self.__thread = None
@@ -0,0 +1,64 @@
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from togglcmder.toggl.matcher import Matcher
+
+
+class NameIndex(object):
+    """
+    Indexes names (or descriptions) by position for repeated matching: a
+    casefolded hash table answers literal patterns and a sorted array of the
+    casefolded names answers prefixes. Both are built the first time they are
+    needed; other patterns are matched against every name.
+    """
+
+    # Sorts after any character a prefix can be followed by.
+    LAST_CHARACTER = '\U0010ffff'
+
+    def __init__(self, names: List[Optional[str]]):
+        self.__names = [name or "" for name in names]
+        self.__folded: Optional[Dict[str, List[int]]] = None
+        self.__sorted_names: Optional[List[str]] = None
+        self.__sorted_positions: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.__names)
+
+    def __folded_names(self) -> Dict[str, List[int]]:
+        if self.__folded is None:
+            self.__folded = {}
+            for position, name in enumerate(self.__names):
+                self.__folded.setdefault(name.casefold(), []).append(position)
+        return self.__folded
+
+    def __prefix_range(self, prefix: str) -> range:
+        if self.__sorted_names is None:
+            folded = [name.casefold() for name in self.__names]
+            self.__sorted_positions = sorted(range(len(folded)), key=folded.__getitem__)
+            self.__sorted_names = [folded[position] for position in self.__sorted_positions]
+
+        return range(bisect_left(self.__sorted_names, prefix),
+                     bisect_left(self.__sorted_names, prefix + NameIndex.LAST_CHARACTER))
+
+    def count(self, matcher: Matcher) -> Optional[int]:
+        """
+        :param matcher:
+        :return: how many names match, or None if that takes matching every name.
+        """
+        if matcher.kind == Matcher.LITERAL:
+            return len(self.__folded_names().get(matcher.text, []))
+        if matcher.kind == Matcher.PREFIX:
+            return len(self.__prefix_range(matcher.text))
+        return None
+
+    def lookup(self, matcher: Matcher) -> List[int]:
+        """
+        :param matcher:
+        :return: the positions of the matching names, in order.
+        """
+        if matcher.kind == Matcher.LITERAL:
+            return list(self.__folded_names().get(matcher.text, []))
+        if matcher.kind == Matcher.PREFIX:
+            found = self.__prefix_range(matcher.text)
+            return sorted(self.__sorted_positions[index] for index in found)
+        return [position for position, name in enumerate(self.__names) if matcher.matches(name)]
@@ -0,0 +1,169 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+import itertools
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from togglcmder.toggl.types.workspace import Workspace
+from togglcmder.toggl.types.project import Project
+from togglcmder.toggl.types.tag import Tag
+from togglcmder.toggl.types.time_entry import TimeEntry
+from togglcmder.toggl.indexes.names import NameIndex
+from togglcmder.toggl.matcher import Matcher
+from togglcmder.toggl.filters.diagnostics import traced
+
+
+class TimeEntryIndex(object):
+    """
+    Indexes a list of time entries for repeated queries: by workspace,
+    project and tag name in hash tables, by start time in a sorted array for
+    range lookups, and by description for the patterns a NameIndex can look
+    up. Each of those is built the first time a query needs it, so an index
+    made for a single query costs a single pass.
+
+    A query starts from whichever of its indexed criteria matches the fewest
+    entries and checks the rest against those alone. Entries come back in
+    the order they were given, as the filters would return them.
+    """
+
+    # What each hash index is keyed on; tags are keyed on each of an entry's tags.
+    KEYS: Dict[str, Callable[[TimeEntry], Hashable]] = {
+        'workspace': lambda time_entry: time_entry.workspace_identifier,
+        'project': lambda time_entry: time_entry.project_identifier,
+        'tag': lambda time_entry: frozenset(time_entry.tags or ()),
+    }
+
+    def __init__(self, time_entries: List[TimeEntry]):
+        self.__time_entries = list(time_entries)
+        # Per index, the positions of the entries under each key, and the key
+        # of the entry at each position.
+        self.__hashes: Dict[str, Tuple[Dict[Hashable, List[int]], List[Hashable]]] = {}
+        # The positions of the entries in start time order, their start times
+        # in that order, and the start time of the entry at each position.
+        self.__by_start: Optional[List[int]] = None
+        self.__sorted_start_times: Optional[List[float]] = None
+        self.__start_times: Optional[List[float]] = None
+        self.__descriptions: Optional[NameIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.__time_entries)
+
+    @property
+    def time_entries(self) -> List[TimeEntry]:
+        return list(self.__time_entries)
+
+    def __hashed(self, name: str) -> Tuple[Dict[Hashable, List[int]], List[Hashable]]:
+        if name not in self.__hashes:
+            keys = list(map(TimeEntryIndex.KEYS[name], self.__time_entries))
+            positions: Dict[Hashable, List[int]] = {}
+            for position, key in enumerate(keys):
+                for member in key if name == 'tag' else (key,):
+                    positions.setdefault(member, []).append(position)
+            self.__hashes[name] = positions, keys
+        return self.__hashes[name]
+
+    def __range(self, start: Optional[datetime], end: Optional[datetime]) -> Tuple[int, int]:
+        if self.__by_start is None:
+            self.__start_times = [time_entry.start_time.timestamp() for time_entry in self.__time_entries]
+            self.__by_start = sorted(range(len(self.__start_times)), key=self.__start_times.__getitem__)
+            self.__sorted_start_times = [self.__start_times[position] for position in self.__by_start]
+
+        # Both ends are exclusive.
+        low = bisect_right(self.__sorted_start_times, start.timestamp()) if start else 0
+        high = bisect_left(self.__sorted_start_times, end.timestamp()) if end else len(self.__by_start)
+        return low, max(low, high)
+
+    def __described(self) -> NameIndex:
+        if self.__descriptions is None:
+            self.__descriptions = NameIndex([time_entry.description for time_entry in self.__time_entries])
+        return self.__descriptions
+
+    @traced
+    def query(self, *,
+              workspace: Optional[Workspace] = None,
+              project: Optional[Project] = None,
+              all_tags: Optional[List[Tag]] = None,
+              any_tags: Optional[List[Tag]] = None,
+              start: Optional[datetime] = None,
+              end: Optional[datetime] = None,
+              description: Optional[str] = None) -> List[TimeEntry]:
+        """
+        Find the time entries matching all of the given criteria, with the
+        same meaning as the filter of the same name; any left out are not
+        filtered on.
+
+        :param workspace:
+        :param project:
+        :param all_tags: entries with every one of these tags.
+        :param any_tags: entries with at least one of these tags.
+        :param start: entries starting strictly after this time.
+        :param end: entries starting strictly before this time.
+        :param description: a regular expression the whole description
+                            matches, ignoring case.
+        :return:
+        """
+        # Each indexed criterion is the number of entries it matches, how to
+        # get their positions (in order) and how to narrow down positions
+        # found some other way to the ones it matches.
+        criteria: List[Tuple[int, Callable[[], List[int]], Callable[[List[int]], List[int]]]] = []
+
+        if workspace:
+            workspace_positions, workspace_keys = self.__hashed('workspace')
+            workspace_found = workspace_positions.get(workspace.identifier, [])
+            criteria.append((len(workspace_found), lambda: workspace_found,
+                             lambda positions: [position for position in positions
+                                                if workspace_keys[position] == workspace.identifier]))
+
+        if project:
+            project_positions, project_keys = self.__hashed('project')
+            project_found = project_positions.get(project.identifier, [])
+            criteria.append((len(project_found), lambda: project_found,
+                             lambda positions: [position for position in positions
+                                                if project_keys[position] == project.identifier]))
+
+        if all_tags or any_tags:
+            tag_positions, tag_keys = self.__hashed('tag')
+
+        if all_tags:
+            all_names = frozenset(tag.name for tag in all_tags)
+
+            def with_all_tags(positions: List[int]) -> List[int]:
+                return [position for position in positions if all_names <= tag_keys[position]]
+            # Every match has the rarest of the tags.
+            rarest = min((tag_positions.get(name, []) for name in all_names), key=len)
+            criteria.append((len(rarest), lambda: with_all_tags(rarest), with_all_tags))
+
+        if any_tags:
+            any_names = frozenset(tag.name for tag in any_tags)
+            tagged = [tag_positions.get(name, []) for name in any_names]
+            criteria.append((sum(map(len, tagged)), lambda: sorted(set(itertools.chain(*tagged))),
+                             lambda positions: [position for position in positions
+                                                if not any_names.isdisjoint(tag_keys[position])]))
+
+        if start or end:
+            low, high = self.__range(start, end)
+            start_times = self.__start_times
+            after = start.timestamp() if start else float('-inf')
+            before = end.timestamp() if end else float('inf')
+            criteria.append((high - low, lambda: sorted(self.__by_start[low:high]),
+                             lambda positions: [position for position in positions
+                                                if after < start_times[position] < before]))
+
+        matcher = Matcher.compile(description) if description else None
+        if matcher and matcher.kind != Matcher.REGEX:
+            descriptions = self.__described()
+            criteria.append((descriptions.count(matcher), lambda: descriptions.lookup(matcher),
+                             lambda positions: [position for position in positions
+                                                if matcher.matches(self.__time_entries[position].description)]))
+
+        # Start from the most selective index and narrow that down by the rest.
+        criteria.sort(key=lambda criterion: criterion[0])
+        positions = criteria[0][1]() if criteria else range(len(self.__time_entries))
+        for _, _, narrow in criteria[1:]:
+            positions = narrow(positions)
+
+        result = [self.__time_entries[position] for position in positions]
+        if matcher and matcher.kind == Matcher.REGEX:
+            # Only a regular expression has to be tried on each entry, so it
+            # is tried last, against the fewest entries.
+            result = matcher.filter(result, lambda time_entry: time_entry.description)
+        return result
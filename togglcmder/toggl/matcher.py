@@ -0,0 +1,79 @@
+import functools
+import re as regex
+from typing import Callable, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class Matcher(object):
+    """
+    Matches names and descriptions against a pattern given on the command
+    line: a regular expression the whole value has to match, ignoring case.
+
+    Most patterns are plain names, and those are compared case insensitively
+    without any regular expression; so are names followed by ".*", as a
+    prefix. Only patterns that need it are compiled into a regular expression.
+    """
+
+    LITERAL = 'literal'
+    PREFIX = 'prefix'
+    REGEX = 'regex'
+
+    # Any of these makes a pattern more than a plain name.
+    METACHARACTERS = frozenset('.^$*+?{}[]\\|()')
+
+    # The most patterns kept compiled at once.
+    CACHE_SIZE = 256
+
+    def __init__(self, pattern: str):
+        self.__pattern = pattern
+        self.__regex: Optional[regex.Pattern] = None
+        if Matcher.__is_literal(pattern):
+            self.__kind = Matcher.LITERAL
+            self.__text = pattern.casefold()
+        elif pattern.endswith('.*') and Matcher.__is_literal(pattern[:-2]):
+            self.__kind = Matcher.PREFIX
+            self.__text = pattern[:-2].casefold()
+        else:
+            self.__kind = Matcher.REGEX
+            self.__text = None
+            self.__regex = regex.compile("^{}$".format(pattern), regex.IGNORECASE)
+
+    @staticmethod
+    def __is_literal(pattern: str) -> bool:
+        return Matcher.METACHARACTERS.isdisjoint(pattern)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=CACHE_SIZE)
+    def compile(pattern: str) -> 'Matcher':
+        """
+        :param pattern:
+        :return: the matcher for the pattern, made once and reused after that.
+        """
+        return Matcher(pattern)
+
+    @property
+    def pattern(self) -> str:
+        return self.__pattern
+
+    @property
+    def kind(self) -> str:
+        return self.__kind
+
+    @property
+    def text(self) -> Optional[str]:
+        """
+        :return: the casefolded name, or prefix, a literal or prefix pattern stands for.
+        """
+        return self.__text
+
+    def matches(self, value: Optional[str]) -> bool:
+        value = value or ""
+        if self.__kind == Matcher.LITERAL:
+            return value.casefold() == self.__text
+        if self.__kind == Matcher.PREFIX:
+            return value.casefold().startswith(self.__text)
+        return self.__regex.match(value) is not None
+
+    def filter(self, items: List[T], key: Callable[[T], Optional[str]]) -> List[T]:
+        return [item for item in items if self.matches(key(item))]
@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from togglcmder.toggl.caching import Caching
+from togglcmder.toggl.synchronizer import Synchronizer
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; only refreshes within this process are kept apart.
+    fcntl = None
+
+
+class Refresher(object):
+    """
+    Keeps the cache warm by syncing each resource on its own interval, so
+    commands can read the cache instead of waiting on the network.
+
+    A resource whose sync changed nothing waits twice as long before the next
+    one, up to max_backoff times its interval, and goes back to its interval
+    as soon as something changes. Only one refresh runs at a time, within
+    this process and, when a lock file is given, across processes.
+    """
+
+    # Refreshed in this order, since projects and tags are synced per workspace.
+    RESOURCES = ('workspaces', 'projects', 'tags', 'time_entries')
+
+    # These can be overridden from the "refresh" section of the configuration.
+    SETTINGS = {
+        # Seconds between refreshes of each resource.
+        'workspaces': 3600,
+        'projects': 900,
+        'tags': 900,
+        'time_entries': 120,
+        # How many times its interval a resource may wait when nothing changes.
+        'max_backoff': 8
+    }
+
+    def __init__(self, *, lock_path: Optional[str] = None, settings: Optional[dict] = None,
+                 clock: Callable[[], float] = time.time):
+        settings = {**Refresher.SETTINGS, **(settings or {})}
+        for key in settings.keys() - Refresher.SETTINGS.keys():
+            logging.getLogger(__name__).warning("ignoring unknown refresh setting '%s'", key)
+
+        self.__intervals = {resource: float(settings[resource]) for resource in Refresher.RESOURCES}
+        self.__max_backoff = max(float(settings['max_backoff']), 1.0)
+        self.__lock_path = lock_path if fcntl else None
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__logger = logging.getLogger(__name__)
+
+        # Everything is due straight away the first time round.
+        self.__due = {resource: 0.0 for resource in Refresher.RESOURCES}
+        self.__backoff = {resource: 1.0 for resource in Refresher.RESOURCES}
+        self.__failed: List[str] = []
+
+    @property
+    def failed(self) -> List[str]:
+        """
+        :return: the resources that failed to sync during the last refresh.
+        """
+        return list(self.__failed)
+
+    def due(self) -> List[str]:
+        now = self.__clock()
+        return [resource for resource in Refresher.RESOURCES if self.__due[resource] <= now]
+
+    def next_due(self) -> float:
+        """
+        :return: the seconds until the next resource is due, zero if one already is.
+        """
+        return max(min(self.__due.values()) - self.__clock(), 0.0)
+
+    def __reschedule(self, resource: str, changed: int) -> None:
+        if changed:
+            self.__backoff[resource] = 1.0
+        else:
+            self.__backoff[resource] = min(self.__backoff[resource] * 2, self.__max_backoff)
+        self.__due[resource] = self.__clock() + self.__intervals[resource] * self.__backoff[resource]
+
+    def __sync(self, resource: str, caching: Caching, synchronizer: Synchronizer,
+               start: datetime, stop: datetime) -> int:
+        if resource == 'workspaces':
+            return synchronizer.sync_workspaces()
+        if resource == 'time_entries':
+            return synchronizer.sync_time_entries(start, stop)
+
+        workspaces = caching.retrieve_workspace_cache() or []
+        synchronizer.prefetch(workspaces, projects=resource == 'projects', tags=resource == 'tags')
+        sync = synchronizer.sync_projects if resource == 'projects' else synchronizer.sync_tags
+        return sum(sync(workspace) for workspace in workspaces)
+
+    def refresh(self, caching: Caching, synchronizer: Synchronizer, start: datetime, stop: datetime, *,
+                resources: Optional[List[str]] = None) -> Optional[Dict[str, int]]:
+        """
+        Syncs the given resources, or else the ones that are due, and
+        schedules their next refresh.
+
+        :param caching:
+        :param synchronizer: a synchronizer for this refresh alone.
+        :param start: the start of the recent time entry window.
+        :param stop: the stop of the recent time entry window.
+        :param resources:
+        :return: the cache rows changed per resource synced, or None if
+                 another refresh was already running.
+        """
+        if not self.__lock.acquire(blocking=False):
+            return None
+        try:
+            handle = open(self.__lock_path, 'a') if self.__lock_path else None
+            try:
+                if handle:
+                    try:
+                        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        self.__logger.debug("another process is refreshing, skipping this round")
+                        return None
+
+                changed = {}
+                self.__failed = []
+                for resource in Refresher.RESOURCES:
+                    if resource not in (resources if resources is not None else self.due()):
+                        continue
+                    try:
+                        changed[resource] = self.__sync(resource, caching, synchronizer, start, stop)
+                    except Exception as e:
+                        # Try again later like any other round where nothing changed.
+                        self.__logger.warning("refreshing %s failed: %s", resource, e)
+                        self.__failed.append(resource)
+                        changed[resource] = 0
+                    self.__reschedule(resource, changed[resource])
+                    self.__logger.debug("refreshed %s: %d changed, next in %.0fs", resource, changed[resource],
+                                        self.__due[resource] - self.__clock())
+                return changed
+            finally:
+                if handle:
+                    handle.close()
+        finally:
+            self.__lock.release()
@@ -0,0 +1,181 @@
+import json
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, NamedTuple, Optional
+
+import requests
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; the bucket is then only shared in-process.
+    fcntl = None
+
+
+class SchedulerStats(NamedTuple):
+    requests: int
+    retries: int
+    # Seconds spent waiting before requests could be sent.
+    waited: float
+    # Of those, the seconds asked for by retries after the server said to slow down.
+    backed_off: float
+
+
+class Scheduler(object):
+    """
+    Paces every request made to the Toggl API so we stay under its rate limit
+    (roughly one request per second per API token).
+
+    Requests take a token from a token bucket before they are sent. When a
+    state file is given, the bucket lives in that file and is locked while it
+    is updated, so several togglcmder processes (a scheduled sync and an
+    interactive command, say) share the same limit. Requests the server still
+    rejects with a 429 are retried after its Retry-After, or else after a
+    jittered exponential backoff, and every process waits that out.
+    """
+
+    # These can be overridden from the "rate_limit" section of the configuration.
+    SETTINGS = {
+        # Tokens added to the bucket per second.
+        'rate': 1.0,
+        # How many requests may go out back to back when the bucket is full.
+        'burst': 2,
+        'max_retries': 5,
+        # Backoff is backoff_base * 2 ** attempt seconds, at most backoff_cap.
+        'backoff_base': 1.0,
+        'backoff_cap': 30.0
+    }
+
+    RETRY_STATUSES = (429,)
+
+    def __init__(self, *, state_path: Optional[str] = None, settings: Optional[dict] = None,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], None] = time.sleep):
+        settings = {**Scheduler.SETTINGS, **(settings or {})}
+        for key in settings.keys() - Scheduler.SETTINGS.keys():
+            logging.getLogger(__name__).warning("ignoring unknown rate limit setting '%s'", key)
+
+        self.__rate = float(settings['rate'])
+        self.__burst = float(settings['burst'])
+        self.__max_retries = int(settings['max_retries'])
+        self.__backoff_base = float(settings['backoff_base'])
+        self.__backoff_cap = float(settings['backoff_cap'])
+
+        self.__state_path = state_path if fcntl else None
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__lock = threading.Lock()
+        # The bucket: how many tokens it held at the "updated" time. While
+        # backing off, "updated" lies in the future and nothing refills until then.
+        self.__state = {'tokens': self.__burst, 'updated': clock()}
+
+        self.__requests = 0
+        self.__retries = 0
+        self.__waited = 0.0
+        self.__backed_off = 0.0
+
+    @property
+    def stats(self) -> SchedulerStats:
+        return SchedulerStats(requests=self.__requests,
+                              retries=self.__retries,
+                              waited=self.__waited,
+                              backed_off=self.__backed_off)
+
+    def __update_state(self, update: Callable[[dict, float], float]) -> float:
+        # Runs update against the current bucket while holding the lock(s)
+        # and stores the result, returning whatever update returned.
+        with self.__lock:
+            if not self.__state_path:
+                return update(self.__state, self.__clock())
+
+            with open(self.__state_path, 'a+') as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    handle.seek(0)
+                    try:
+                        state = {**self.__state, **json.loads(handle.read())}
+                    except ValueError:
+                        # A new or damaged file starts over with a full bucket.
+                        state = dict(self.__state)
+
+                    result = update(state, self.__clock())
+
+                    handle.seek(0)
+                    handle.truncate()
+                    json.dump(state, handle)
+                    handle.flush()
+                    return result
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def __take_token(self, state: dict, now: float) -> float:
+        base = max(now, state['updated'])
+        state['tokens'] = min(self.__burst, state['tokens'] + (base - state['updated']) * self.__rate)
+        state['updated'] = base
+
+        # The token is taken even if the bucket is empty; the debt is what
+        # makes the next caller wait its turn after this one.
+        state['tokens'] -= 1
+        return (base - now) + max(-state['tokens'] / self.__rate, 0.0)
+
+    def acquire(self) -> None:
+        wait = self.__update_state(self.__take_token)
+        if wait > 0:
+            with self.__lock:
+                self.__waited += wait
+            self.__sleep(wait)
+
+    def __retry_delay(self, reply: requests.Response, attempt: int) -> float:
+        retry_after = reply.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                try:
+                    return max(parsedate_to_datetime(retry_after).timestamp() - self.__clock(), 0.0)
+                except (TypeError, ValueError):
+                    pass
+
+        # Full jitter keeps concurrent clients from retrying in lock step.
+        return random.uniform(0, min(self.__backoff_cap, self.__backoff_base * 2 ** attempt))
+
+    def __block(self, delay: float) -> None:
+        def update(state: dict, now: float) -> float:
+            # Hold off refilling the bucket until the delay is over, leaving
+            # a single token for whoever goes first once it is.
+            state['tokens'] = min(state['tokens'], 1.0)
+            state['updated'] = max(state['updated'], now + delay)
+            return delay
+        self.__update_state(update)
+
+    def call(self, send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        Sends a request when the rate limit allows, retrying it while the
+        server answers that we are going too fast.
+
+        :param send: makes the request and returns the reply.
+        :return: the final reply, which may still be a 429 once out of retries.
+        """
+        attempt = 0
+        while True:
+            self.acquire()
+            with self.__lock:
+                self.__requests += 1
+            reply = send()
+
+            if reply.status_code not in Scheduler.RETRY_STATUSES or attempt >= self.__max_retries:
+                return reply
+
+            delay = self.__retry_delay(reply, attempt)
+            logging.getLogger(__name__).info(
+                "rate limited (%d), retrying in %.1fs", reply.status_code, delay)
+
+            # Everyone sharing the bucket waits this out, not just us.
+            self.__block(delay)
+            with self.__lock:
+                self.__retries += 1
+                self.__backed_off += delay
+            attempt += 1
@@ -0,0 +1,222 @@
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from togglcmder.toggl.caching import Caching
+from togglcmder.toggl.downloader import Changes, Downloader
+
+from togglcmder.toggl.types.workspace import Workspace
+
+
+class Synchronizer(object):
+    """
+    Brings the local cache up to date with the Toggl servers while downloading
+    as little as possible.
+
+    Each resource keeps a high water mark (the newest "at" timestamp seen) in
+    the cache's sync_state table. Once a resource has been fully downloaded,
+    later syncs only ask the server for what changed since that mark, and
+    nothing is written to the cache unless something actually changed.
+    """
+
+    # A time entry window whose stop is at least this recent is treated as
+    # reaching the present, so it can be kept current incrementally.
+    PRESENT_TOLERANCE = timedelta(minutes=1)
+
+    # How many per-workspace downloads may be in flight at once.
+    WORKERS = 4
+
+    def __init__(self, caching: Caching, downloader: Downloader, *, workers: int = WORKERS):
+        self.__caching = caching
+        self.__downloader = downloader
+        self.__workers = max(workers, 1)
+        self.__logger = logging.getLogger(__name__)
+        # Downloads made ahead of time by prefetch, keyed by resource and workspace.
+        self.__prefetched: Dict[Tuple[str, int], object] = {}
+        # Time entry windows already synced during this invocation.
+        self.__synced_windows: Set[Tuple[datetime, datetime]] = set()
+
+    @staticmethod
+    def __newer_than(items: Iterable, high_water_mark: Optional[datetime]) -> list:
+        # The server may hand back more than what changed since the mark, so
+        # only keep what is actually newer.
+        if not high_water_mark:
+            return list(items)
+        return [item for item in items if item.last_updated and item.last_updated > high_water_mark]
+
+    @staticmethod
+    def __high_water_mark(items: Iterable, previous: Optional[datetime]) -> Optional[datetime]:
+        marks = [item.last_updated for item in items if item.last_updated]
+        if previous:
+            marks.append(previous)
+        return max(marks) if marks else None
+
+    def __apply(self, resource: str, workspace_identifier: int, changes: Changes,
+                high_water_mark: Optional[datetime], update, remove, *,
+                coverage_start: Optional[datetime] = None) -> int:
+        with self.__caching.transaction():
+            changed = update(changes.changed) if changes.changed else 0
+            changed += remove(changes.deleted) if changes.deleted else 0
+            self.__caching.update_sync_state(resource, workspace_identifier,
+                                             high_water_mark=high_water_mark,
+                                             coverage_start=coverage_start)
+
+        self.__logger.debug("synced %s (workspace %d): %d changed, %d deleted",
+                            resource, workspace_identifier, len(changes.changed), len(changes.deleted))
+        return changed
+
+    def prefetch(self, workspaces: List[Workspace], *, projects: bool = True, tags: bool = True) -> None:
+        """
+        Downloads the projects and/or tags of every workspace concurrently so
+        the following sync_projects and sync_tags calls don't wait on the
+        network one workspace at a time. Only the downloads run on the worker
+        threads; the cache is read and written from the calling thread alone.
+
+        :param workspaces:
+        :param projects:
+        :param tags:
+        :return:
+        """
+        tasks = {}
+        for workspace in workspaces:
+            if projects:
+                state = self.__caching.retrieve_sync_state('projects', workspace.identifier)
+                tasks[('projects', workspace.identifier)] = (
+                    self.__downloader.download_project_changes,
+                    workspace, state.high_water_mark if state else None)
+            if tags:
+                tasks[('tags', workspace.identifier)] = (self.__downloader.download_tags, workspace)
+
+        if not tasks:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.__workers, len(tasks))) as executor:
+            futures = {key: executor.submit(*task) for key, task in tasks.items()}
+            for key, future in futures.items():
+                self.__prefetched[key] = future.result()
+
+    def sync_workspaces(self) -> int:
+        state = self.__caching.retrieve_sync_state('workspaces')
+        since = state.high_water_mark if state else None
+
+        changes = self.__downloader.download_workspace_changes(since)
+        changed = Synchronizer.__newer_than(changes.changed, since)
+
+        deleted = list(changes.deleted)
+        if not since:
+            # Without a mark this was a full download, so anything cached that
+            # wasn't sent back has been deleted remotely.
+            present = {workspace.identifier for workspace in changes.changed}
+            deleted += [workspace.identifier for workspace in self.__caching.retrieve_workspace_cache() or []
+                        if workspace.identifier not in present]
+
+        return self.__apply('workspaces', 0, Changes(changed, deleted),
+                            Synchronizer.__high_water_mark(changed, since),
+                            self.__caching.update_workspace_cache,
+                            self.__caching.remove_workspaces_from_cache)
+
+    def sync_projects(self, workspace: Workspace) -> int:
+        state = self.__caching.retrieve_sync_state('projects', workspace.identifier)
+        since = state.high_water_mark if state else None
+
+        if ('projects', workspace.identifier) in self.__prefetched:
+            changes = self.__prefetched.pop(('projects', workspace.identifier))
+        else:
+            changes = self.__downloader.download_project_changes(workspace, since)
+        changed = Synchronizer.__newer_than(changes.changed, since)
+
+        deleted = list(changes.deleted)
+        if not since:
+            present = {project.identifier for project in changes.changed}
+            deleted += [project.identifier for project in self.__caching.retrieve_project_cache() or []
+                        if project.workspace_identifier == workspace.identifier
+                        and project.identifier not in present]
+
+        return self.__apply('projects', workspace.identifier, Changes(changed, deleted),
+                            Synchronizer.__high_water_mark(changed, since),
+                            self.__caching.update_project_cache,
+                            self.__caching.remove_projects_from_cache)
+
+    def sync_tags(self, workspace: Workspace) -> int:
+        # Tags carry no "at" timestamp and the server can't filter them, so
+        # they are always downloaded in full and diffed against the cache.
+        if ('tags', workspace.identifier) in self.__prefetched:
+            tags = self.__prefetched.pop(('tags', workspace.identifier)) or []
+        else:
+            tags = self.__downloader.download_tags(workspace) or []
+
+        present = {tag.identifier for tag in tags}
+        deleted = [tag.identifier for tag in self.__caching.retrieve_tag_cache() or []
+                   if tag.workspace_identifier == workspace.identifier
+                   and tag.identifier not in present]
+
+        return self.__apply('tags', workspace.identifier, Changes(tags, deleted), None,
+                            self.__caching.update_tag_cache,
+                            self.__caching.remove_tags_from_cache)
+
+    def sync_time_entries(self, start: datetime, stop: datetime) -> int:
+        # Callers ask for the same window once per workspace; the cache
+        # already holds it after the first time.
+        if (start, stop) in self.__synced_windows:
+            return 0
+        self.__synced_windows.add((start, stop))
+
+        state = self.__caching.retrieve_sync_state('time_entries')
+        reaches_present = stop >= datetime.now(tz=stop.tzinfo) - Synchronizer.PRESENT_TOLERANCE
+
+        if reaches_present and state and state.high_water_mark \
+                and state.coverage_start and state.coverage_start <= start:
+            # Everything from the coverage start up to now is already cached,
+            # so only ask for what changed in this window since the last sync.
+            # The watermark moves past changes made before the window, so from
+            # now on only the window is covered; anything earlier is fully
+            # downloaded again when it is next asked for.
+            since = state.high_water_mark
+            changes = self.__downloader.download_time_entry_changes(start, stop, since)
+            changed = Synchronizer.__newer_than(changes.changed, since)
+
+            return self.__apply('time_entries', 0, Changes(changed, changes.deleted),
+                                Synchronizer.__high_water_mark(changed, since),
+                                self.__caching.update_time_entry_cache,
+                                self.__caching.remove_time_entries_from_cache,
+                                coverage_start=start)
+
+        changes = self.__downloader.download_time_entry_changes(start, stop)
+
+        present = {time_entry.identifier for time_entry in changes.changed}
+        deleted = list(changes.deleted) + [
+            time_entry.identifier for time_entry in self.__caching.query_time_entries(None, start, stop)
+            if time_entry.identifier not in present
+        ]
+
+        if not reaches_present:
+            # A window in the past says nothing about what changed elsewhere,
+            # so the watermark is left alone.
+            with self.__caching.transaction():
+                changed = self.__caching.update_time_entry_cache(changes.changed) if changes.changed else 0
+                changed += self.__caching.remove_time_entries_from_cache(deleted) if deleted else 0
+            return changed
+
+        # A full download up to the present becomes the new covered range.
+        return self.__apply('time_entries', 0, Changes(changes.changed, deleted),
+                            Synchronizer.__high_water_mark(changes.changed, None),
+                            self.__caching.update_time_entry_cache,
+                            self.__caching.remove_time_entries_from_cache,
+                            coverage_start=start)
+
+    def sync(self, workspaces: List[Workspace], start: datetime, stop: datetime) -> int:
+        """
+        Synchronizes every resource for the given workspaces and time entry window.
+
+        :param workspaces:
+        :param start:
+        :param stop:
+        :return: the number of cache rows that changed.
+        """
+        changed = self.sync_workspaces()
+        for workspace in workspaces:
+            changed += self.sync_projects(workspace)
+            changed += self.sync_tags(workspace)
+        return changed + self.sync_time_entries(start, stop)
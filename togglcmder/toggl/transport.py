@@ -0,0 +1,103 @@
+import logging
+from typing import NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
+
+from togglcmder.toggl.scheduler import Scheduler
+
+
+class TransportStats(NamedTuple):
+    requests: int
+    opened: int
+    reused: int
+
+
+class Transport(object):
+    """
+    A single pooled HTTP session shared by everything that talks to Toggl, so
+    connections (and their TLS handshakes) are kept alive and reused across
+    calls instead of being set up again for every request.
+    """
+
+    # These can be overridden from the "transport" section of the configuration.
+    SETTINGS = {
+        # Number of connections kept alive per host.
+        'pool_size': 10,
+        # Retries for connection errors and failing replies.
+        'retries': 3,
+        'backoff_factor': 0.5
+    }
+
+    # Being rate limited (429) is left to the scheduler.
+    RETRY_STATUSES = (500, 502, 503, 504)
+
+    def __init__(self, auth: str, *, settings: Optional[dict] = None,
+                 scheduler: Optional[Scheduler] = None):
+        settings = {**Transport.SETTINGS, **(settings or {})}
+        for key in settings.keys() - Transport.SETTINGS.keys():
+            logging.getLogger(__name__).warning("ignoring unknown transport setting '%s'", key)
+
+        self.__session = requests.Session()
+        self.__session.auth = HTTPBasicAuth(auth, 'api_token')
+        self.__session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        })
+
+        adapter = HTTPAdapter(
+            pool_connections=settings['pool_size'],
+            pool_maxsize=settings['pool_size'],
+            max_retries=Retry(
+                total=settings['retries'],
+                backoff_factor=settings['backoff_factor'],
+                status_forcelist=Transport.RETRY_STATUSES,
+                raise_on_status=False))
+        self.__session.mount('https://', adapter)
+        self.__session.mount('http://', adapter)
+        self.__adapter = adapter
+        self.__scheduler = scheduler
+
+    def __del__(self):
+        self.close()
+
+    def close(self) -> None:
+        self.__session.close()
+
+    @property
+    def stats(self) -> TransportStats:
+        # Every pool knows how many connections it opened and how many
+        # requests went through it; the difference is what was reused.
+        pools = self.__adapter.poolmanager.pools
+        opened = 0
+        requests_made = 0
+        for key in pools.keys():
+            pool = pools[key]
+            opened += pool.num_connections
+            requests_made += pool.num_requests
+        return TransportStats(requests=requests_made,
+                              opened=opened,
+                              reused=max(requests_made - opened, 0))
+
+    @property
+    def scheduler(self) -> Optional[Scheduler]:
+        return self.__scheduler
+
+    def __request(self, method: str, url: str, **kwargs) -> requests.Response:
+        if not self.__scheduler:
+            return self.__session.request(method, url, **kwargs)
+        return self.__scheduler.call(lambda: self.__session.request(method, url, **kwargs))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.__request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.__request('POST', url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.__request('PUT', url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.__request('DELETE', url, **kwargs)
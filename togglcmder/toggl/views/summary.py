@@ -0,0 +1,32 @@
+from typing import List, Tuple
+
+from datetime import timedelta
+
+from togglcmder.toggl.caching import SummaryRow
+
+
+class Summary(object):
+    """
+    A composition of the data we want to show in a view
+    of a time entry summary.
+    """
+
+    def __init__(self, rows: List[SummaryRow], group_by: str):
+        self.__rows = rows
+        self.__group_by = group_by
+
+    def headers(self) -> Tuple:
+        return (
+            self.__group_by.capitalize(),
+            "Entries",
+            "Total Duration",
+            "Average Duration"
+        )
+
+    def values(self) -> List[Tuple]:
+        return [(
+            row.group if row.group is not None else "",
+            row.count,
+            str(timedelta(seconds=row.total)),
+            str(timedelta(seconds=round(row.average)))
+        ) for row in self.__rows]